@@ -1,16 +1,55 @@
 import sys
 import sqlite3
+from datetime import date
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-    QTableWidget, QTableWidgetItem, QMessageBox, QInputDialog
+    QTableView, QMessageBox, QInputDialog, QComboBox, QLineEdit, QLabel, QAbstractItemView, QCheckBox
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QPalette, QColor
 
+from archive import attach_archive
+from background import BackgroundWorker, background_pool
+from changes import ChangeFeed
+from client_search import search_clients
+from database import cancel_bookings_batch
+from listings import (
+    ALL_BOOKINGS_FROM, BOOKING_COLUMNS, BOOKING_FROM, BOOKING_HEADERS, BOOKING_STATUSES, CLIENT_COLUMNS, CLIENT_HEADERS,
+    PAYMENT_STATUSES, ROOM_HEADERS, booking_filters
+)
+from metrics import timer
+from migrations import migrate
+from properties import property_from_args
+from reports import PERIODS, REPORT_FORMATS, REPORT_HEADERS, occupancy_report
+from room_catalog import catalog, room_status
+from snapshots import format_age, from_snapshot, snapshot_age
+from summaries import dashboard_counts
+from service_client import ServiceError, service_from_args
+from table_models import RowsTableModel, SqlTableModel
+from validation import is_row_id
+
+
+# How often the shown table is brought up to date with writes made elsewhere
+LIVE_REFRESH_MS = 1000
+
+# Change-log table whose rows a SqlTableModel shows, by the model's key
+LIVE_TABLES = {'b.booking_id': 'bookings', 'client_id': 'clients'}
+
+# Pause in typing before the client search runs, so a burst of keystrokes costs one query
+SEARCH_DEBOUNCE_MS = 250
+
+# How often the age of the reporting snapshot shown next to the report settings is updated
+SNAPSHOT_AGE_MS = 10000
+
+# Most booking IDs one reset may name, ranges included, so a mistyped range cannot freeze the window
+MAX_RESET_IDS = 10000
+
 
 class AdminApp(QWidget):
-    def __init__(self):
+    def __init__(self, service=None):
         super().__init__()
+        # In client mode cancellations go through booking_service; the read-only tables still read the file
+        self.service = service
         self.setWindowTitle('Hotel Management - Admin')
         self.setGeometry(100, 100, 800, 600)
 
@@ -33,13 +72,13 @@ class AdminApp(QWidget):
             QPushButton:pressed {
                 background-color: #388e3c;
             }
-            QTableWidget {
+            QTableView {
                 background-color: white;
                 gridline-color: #ddd;
                 selection-background-color: #cce7ff;
                 font-size: 12px;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
                 height: 30px;
             }
@@ -65,107 +104,341 @@ class AdminApp(QWidget):
         self.reset_booking_button.clicked.connect(self.reset_booking)
         self.action_layout.addWidget(self.reset_booking_button)
 
+        self.reports_button = QPushButton('Reports', self)
+        self.reports_button.clicked.connect(self.view_reports)
+        self.action_layout.addWidget(self.reports_button)
+
         self.layout.addLayout(self.action_layout)
 
-        # Table to display data
-        self.table = QTableWidget(self)
+        # Client search as you type; runs on a pool thread once typing pauses
+        self.search_box = QLineEdit(self)
+        self.search_box.setPlaceholderText('Search clients by name, email or phone')
+        self.layout.addWidget(self.search_box)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.run_client_search)
+        self.search_box.textChanged.connect(lambda text: self.search_timer.start())
+        # Searches started so far and the text of the results shown; replies to older searches are dropped
+        self.search_count = 0
+        self.search_text = None
+
+        # Booking filters; applied in SQL and paged, so they stay fast on large tables
+        self.filter_layout = QHBoxLayout()
+        self.status_filter = QComboBox(self)
+        self.status_filter.addItems(['Any status'] + BOOKING_STATUSES)
+        self.payment_filter = QComboBox(self)
+        self.payment_filter.addItems(['Any payment'] + PAYMENT_STATUSES)
+        self.date_from_filter = QLineEdit(self)
+        self.date_from_filter.setPlaceholderText('From YYYY-MM-DD')
+        self.date_to_filter = QLineEdit(self)
+        self.date_to_filter.setPlaceholderText('To YYYY-MM-DD')
+        self.client_filter = QLineEdit(self)
+        self.client_filter.setPlaceholderText('Client ID')
+        for combo in (self.status_filter, self.payment_filter):
+            combo.currentIndexChanged.connect(self.apply_booking_filters)
+            self.filter_layout.addWidget(combo)
+        for line_edit in (self.date_from_filter, self.date_to_filter, self.client_filter):
+            line_edit.editingFinished.connect(self.apply_booking_filters)
+            self.filter_layout.addWidget(line_edit)
+        # Also list the bookings archive.py has moved to the archive database
+        self.archived_filter = QCheckBox('Include archived', self)
+        self.archived_filter.toggled.connect(self.apply_booking_filters)
+        self.filter_layout.addWidget(self.archived_filter)
+        self.layout.addLayout(self.filter_layout)
+
+        # Report settings: occupancy, ADR, RevPAR and unpaid revenue per period and room group
+        self.report_layout = QHBoxLayout()
+        self.report_group = QComboBox(self)
+        self.report_group.addItems(['By room type', 'By category'])
+        self.report_period = QComboBox(self)
+        self.report_period.addItems([f'Per {period}' for period in PERIODS])
+        self.report_period.setCurrentIndex(PERIODS.index('month'))
+        self.report_from = QLineEdit(self)
+        self.report_from.setPlaceholderText(f'Nights from {date.today().year}-01-01')
+        self.report_to = QLineEdit(self)
+        self.report_to.setPlaceholderText(f'Nights to {date.today().year + 1}-01-01')
+        # Reports read a snapshot of the database (snapshots.py), not the live file; show how old it is
+        self.snapshot_label = QLabel(self)
+        for widget in (self.report_group, self.report_period, self.report_from, self.report_to, self.snapshot_label):
+            self.report_layout.addWidget(widget)
+        self.layout.addLayout(self.report_layout)
+        self.refresh_snapshot_age()
+        self.snapshot_timer = QTimer(self)
+        self.snapshot_timer.timeout.connect(self.refresh_snapshot_age)
+        self.snapshot_timer.start(SNAPSHOT_AGE_MS)
+
+        # Dashboard counters, read from trigger-maintained summary tables
+        self.dashboard_label = QLabel(self)
+        self.layout.addWidget(self.dashboard_label)
+        self.refresh_dashboard()
+
+        # Table to display data; rows come from a SqlTableModel and are fetched as the user scrolls
+        self.table = QTableView(self)
+        self.table.setSortingEnabled(True)
         self.layout.addWidget(self.table)
 
         self.setLayout(self.layout)
 
-    def configure_table(self, column_count):
-        """Configures table for equal column and row sizes."""
-        self.table.setColumnCount(column_count)
-        self.table.setRowCount(0)  # Reset the table
+        # Live refresh: poll the change log and patch only the rows other desks (or we) wrote
+        self.change_feed = ChangeFeed()
+        self.live_timer = QTimer(self)
+        self.live_timer.timeout.connect(self.poll_changes)
+        self.live_timer.start(LIVE_REFRESH_MS)
+
+    def poll_changes(self):
+        """Apply writes since the last poll to the shown table, keeping its scroll position and selection."""
+        try:
+            changes = self.change_feed.poll()
+            if changes is None:
+                return
+            model = self.table.model()
+            top = self.table.rowAt(0)
+            anchor = model.key_at(top) if model is not None and top >= 0 else None
+
+            if isinstance(model, SqlTableModel):
+                if changes.reload:
+                    model.refresh()
+                elif LIVE_TABLES.get(model.key) in changes.rows:
+                    model.apply_changes(changes.rows[LIVE_TABLES[model.key]])
+            elif isinstance(model, RowsTableModel) and model.headers is ROOM_HEADERS:
+                if changes.reload or 'rooms' in changes.rows or 'bookings' in changes.rows:
+                    model.update_rows(self.room_rows())
+            elif isinstance(model, RowsTableModel) and model.headers is CLIENT_HEADERS:
+                if changes.reload or 'clients' in changes.rows:
+                    self.run_client_search()
+
+            # Keep the row that was at the top of the viewport there, even if rows were added above it
+            if anchor is not None:
+                position = model.find(anchor)
+                if position is not None and position != top:
+                    self.table.scrollTo(model.index(position, 0), QAbstractItemView.PositionAtTop)
+            self.refresh_dashboard()
+        except sqlite3.Error as e:
+            print(f"Live refresh failed: {e}")
+
+    def refresh_dashboard(self):
+        """Update the counters line: a few primary-key reads and one pass over the in-memory night index."""
+        try:
+            counts = dashboard_counts()
+        except sqlite3.Error as e:
+            self.dashboard_label.setText(f'Counters unavailable: {e}')
+            return
+        rooms = '  '.join(f'{room_type}: {free}/{total}' for room_type, (total, free) in counts['room_types'].items())
+        bookings = '  '.join(f'{status}: {count}' for status, count in counts['statuses'].items())
+        self.dashboard_label.setText(f'Free tonight  {rooms}    |    Bookings  {bookings or "none"}    |    '
+                                     f'Awaiting payment: {counts["pending_payments"]}')
+
+    def refresh_snapshot_age(self):
+        try:
+            age = snapshot_age()
+        except OSError as e:
+            self.snapshot_label.setText(f'Snapshot unavailable: {e}')
+            return
+        self.snapshot_label.setText('Reports: no snapshot yet' if age is None else
+                                    f'Reports as of {format_age(age)} ago')
+
+    def configure_table(self, model, sort=True):
+        """Shows a model in the table with equal column and row sizes."""
+        self.refresh_dashboard()
+        self.table.setModel(model)
         self.table.horizontalHeader().setStretchLastSection(False)
-        for col in range(column_count):
+        for col in range(model.columnCount()):
             self.table.horizontalHeader().setSectionResizeMode(col, 1)
         self.table.verticalHeader().setDefaultSectionSize(30)  # Row height
         self.table.horizontalHeader().setDefaultSectionSize(100)  # Column width
+        if sort:
+            self.table.sortByColumn(0, Qt.AscendingOrder)  # ORDER BY the first column in SQL
 
     # View rooms function
     def view_rooms(self):
-        conn = sqlite3.connect('hotel_management.db')
-        cursor = conn.cursor()
-        cursor.execute('''SELECT * FROM rooms''')
-        rooms = cursor.fetchall()
-        conn.close()
-
-        column_count = 6
-        self.configure_table(column_count)
-        self.table.setHorizontalHeaderLabels(['Room ID', 'Type', 'Price', 'Category', 'Description', 'Availability'])
-
-        self.table.setRowCount(len(rooms))
-        for row, room in enumerate(rooms):
-            for col, value in enumerate(room):
-                self.table.setItem(row, col, QTableWidgetItem(str(value)))
-
-    # View bookings function
+        with timer('admin.view_rooms'):
+            self.change_feed.catch_up()
+            model = RowsTableModel(self.room_rows(), ROOM_HEADERS, parent=self)
+            self.configure_table(model)
+
+    @staticmethod
+    def room_rows():
+        # Room details come from the catalog cache; only tonight's availability is looked up
+        status = room_status()
+        return [(room[0], room[1], room[2], room[5], room[6], status[room[0]]) for room in catalog.rooms().values()]
+
+    # View bookings function, narrowed by the filter bar
     def view_bookings(self):
         try:
-            conn = sqlite3.connect('hotel_management.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT bookings.booking_id, clients.name, rooms.room_type, bookings.booking_date, bookings.status, bookings.payment_status, bookings.room_id
-                FROM bookings
-                JOIN clients ON bookings.client_id = clients.client_id
-                JOIN rooms ON bookings.room_id = rooms.room_id
-            ''')
-            bookings = cursor.fetchall()
-            conn.close()
-
-            column_count = 7
-            self.configure_table(column_count)
-            self.table.setHorizontalHeaderLabels(['Booking ID', 'Client', 'Room Type', 'Date', 'Status', 'Payment', 'Room ID'])
-
-            self.table.setRowCount(len(bookings))
-            for row, booking in enumerate(bookings):
-                for col, value in enumerate(booking):
-                    self.table.setItem(row, col, QTableWidgetItem(str(value)))
-                    
+            with timer('admin.view_bookings'):
+                self.change_feed.catch_up()
+                where, params = booking_filters(**self.booking_filter_values())
+                model = SqlTableModel(BOOKING_COLUMNS, self.booking_from(), BOOKING_HEADERS, 'b.booking_id',
+                                      where, params, parent=self)
+                self.configure_table(model)
+
         except sqlite3.Error as e:
             print(f"An error occurred while accessing the database: {e}")
 
+    # Current values of the booking filter bar, in the form listings.booking_filters() takes
+    def booking_filter_values(self):
+        client_id = self.client_filter.text().strip()
+        return {
+            'status': self.status_filter.currentText().strip() if self.status_filter.currentIndex() != 0 else None,
+            'payment_status': self.payment_filter.currentText().strip() if self.payment_filter.currentIndex() != 0 else None,
+            'date_from': self.date_from_filter.text().strip() or None,
+            'date_to': self.date_to_filter.text().strip() or None,
+            'client_id': int(client_id) if client_id.isdigit() else None,
+        }
+
+    # What the booking listing selects from, live bookings only unless archived ones are asked for
+    def booking_from(self):
+        if not self.archived_filter.isChecked():
+            return BOOKING_FROM
+        attach_archive()
+        return ALL_BOOKINGS_FROM
+
+    # Re-apply the filters when they change while bookings are shown
+    def apply_booking_filters(self):
+        model = self.table.model()
+        if isinstance(model, SqlTableModel) and model.key == 'b.booking_id':
+            try:
+                if model.from_clause != self.booking_from():
+                    self.view_bookings()
+                    return
+                where, params = booking_filters(**self.booking_filter_values())
+                model.set_filters(where, params)
+            except sqlite3.Error as e:
+                print(f"An error occurred while accessing the database: {e}")
+
     # View clients function
     def view_clients(self):
-        conn = sqlite3.connect('hotel_management.db')
-        cursor = conn.cursor()
-        cursor.execute('''SELECT * FROM clients''')
-        clients = cursor.fetchall()
-        conn.close()
+        with timer('admin.view_clients'):
+            self.change_feed.catch_up()
+            self.search_text = None
+            model = SqlTableModel(CLIENT_COLUMNS, 'clients', CLIENT_HEADERS, 'client_id', parent=self)
+            self.configure_table(model)
+
+    # Client search from the search box; an empty box goes back to the full client list
+    def run_client_search(self):
+        text = self.search_box.text().strip()
+        if not text:
+            if self.search_text is not None:
+                self.view_clients()
+            return
+        self.search_count += 1
+        worker = BackgroundWorker(search_clients, text)
+        worker.signals.finished.connect(lambda rows, count=self.search_count: self.show_search_results(count, text, rows))
+        worker.signals.failed.connect(lambda error: print(f"Client search failed: {error}"))
+        background_pool().start(worker)
+
+    def show_search_results(self, count, text, rows):
+        if count != self.search_count:
+            return  # a later search is on its way
+        model = self.table.model()
+        if text == self.search_text and isinstance(model, RowsTableModel) and model.headers is CLIENT_HEADERS:
+            model.update_rows(rows)  # live refresh of the same search: keep selection and scroll position
+            return
+        self.change_feed.catch_up()
+        self.search_text = text
+        # Rows arrive best match first, so the table is not re-sorted by client ID
+        self.configure_table(RowsTableModel(rows, CLIENT_HEADERS, parent=self), sort=False)
+
+    # Reports function; the report runs on a worker thread against a snapshot, so large tables neither freeze the
+    # window nor hold up bookings
+    def view_reports(self):
+        try:
+            start = date.fromisoformat(self.report_from.text().strip() or f'{date.today().year}-01-01')
+            end = date.fromisoformat(self.report_to.text().strip() or f'{date.today().year + 1}-01-01')
+        except ValueError:
+            self.show_message('Error', 'Enter report dates as YYYY-MM-DD.')
+            return
+        if end <= start:
+            self.show_message('Error', 'The report end date must be after its start date.')
+            return
 
-        column_count = 4
-        self.configure_table(column_count)
-        self.table.setHorizontalHeaderLabels(['Client ID', 'Name', 'Email', 'Phone'])
+        group_by = ['room_type', 'category'][self.report_group.currentIndex()]
+        period = PERIODS[self.report_period.currentIndex()]
+        self.reports_button.setEnabled(False)
+        worker = BackgroundWorker(from_snapshot, occupancy_report, start, end, group_by, period)
+        worker.signals.finished.connect(self.show_report)
+        worker.signals.failed.connect(lambda error: self.show_message('Error', error))
+        worker.signals.failed.connect(lambda error: self.reports_button.setEnabled(True))
+        background_pool().start(worker)
 
-        self.table.setRowCount(len(clients))
-        for row, client in enumerate(clients):
-            for col, value in enumerate(client):
-                self.table.setItem(row, col, QTableWidgetItem(str(value)))
+    def show_report(self, report):
+        self.reports_button.setEnabled(True)
+        self.refresh_snapshot_age()
+        model = RowsTableModel(report, REPORT_HEADERS, parent=self, formats=REPORT_FORMATS)
+        self.configure_table(model)
 
     # Reset booking function
     def reset_booking(self):
-        booking_id, ok = self.get_booking_id()
+        text, ok = self.get_booking_ids()
         if ok:
-            conn = sqlite3.connect('hotel_management.db')
-            cursor = conn.cursor()
-            cursor.execute('''SELECT room_id FROM bookings WHERE booking_id = ?''', (booking_id,))
-            room = cursor.fetchone()
-
-            if room:
-                room_id = room[0]
-                cursor.execute('''DELETE FROM bookings WHERE booking_id = ?''', (booking_id,))
-                cursor.execute('''UPDATE rooms SET availability = 1 WHERE room_id = ?''', (room_id,))
-                conn.commit()
-                conn.close()
-                self.show_message('Success', f"Booking {booking_id} has been reset.")
+            try:
+                booking_ids = self.parse_booking_ids(text)
+            except ValueError as e:
+                self.show_message('Error', str(e))
+                return
+
+            # Deleting the bookings frees their nights, all in one transaction
+            try:
+                with timer('admin.reset_booking'):
+                    freed = self.service.cancel_bookings(booking_ids) if self.service else cancel_bookings_batch(booking_ids)
+            except ServiceError as e:
+                self.show_message('Error', str(e))
+                return
+            except sqlite3.Error as e:
+                self.show_message('Database Error', f'The bookings were not reset: {e}')
+                return
+            reset = [booking_id for booking_id, room_id in zip(booking_ids, freed) if room_id is not None]
+            missing = [booking_id for booking_id, room_id in zip(booking_ids, freed) if room_id is None]
+
+            if reset:
+                self.poll_changes()
+                message = f"Booking {self.format_booking_ids(reset)} has been reset." if len(reset) == 1 \
+                    else f"{len(reset)} bookings have been reset: {self.format_booking_ids(reset)}."
+                if missing:
+                    message += f" Not found: {self.format_booking_ids(missing)}."
+                self.show_message('Success', message)
             else:
                 self.show_message('Error', 'No booking found with this ID.')
 
-    # Helper method to get booking ID input
-    def get_booking_id(self):
-        booking_id, ok = QInputDialog.getInt(self, 'Reset Booking', 'Enter booking ID to reset:')
-        return booking_id, ok
+    # Helper method to get booking IDs input: single IDs, comma-separated lists and ranges
+    def get_booking_ids(self):
+        return QInputDialog.getText(self, 'Reset Booking', 'Enter booking IDs to reset (e.g. 12, 15, 20-30):')
+
+    @staticmethod
+    def parse_booking_ids(text, limit=MAX_RESET_IDS):
+        """Booking IDs named by '12, 15, 20-30', without duplicates; ValueError with a message for the user."""
+        malformed = 'Enter booking IDs such as "12", "12, 15" or "20-30".'
+        too_many = f'At most {limit} booking IDs can be reset at once.'
+        booking_ids = {}  # dict as an ordered set
+        for part in text.replace(' ', '').split(','):
+            if not part:
+                continue
+            start, dash, end = part.partition('-')
+            if not start.isdecimal() or (dash and not end.isdecimal()):
+                raise ValueError(malformed)
+            start = int(start)
+            end = int(end) if dash else start
+            # IDs past SQLite's 64-bit integers would overflow when bound
+            if not (is_row_id(start) and is_row_id(end)):
+                raise ValueError(malformed)
+            if end < start:
+                raise ValueError(f'The range {part} runs backwards; write it as {end}-{start}.')
+            # Checked before expanding, so a range like 1-100000000 is never built
+            if end - start + 1 > limit:
+                raise ValueError(too_many)
+            booking_ids.update(dict.fromkeys(range(start, end + 1)))
+            # Counted after de-duplicating, so '1-6000, 1-6000' names 6000 IDs
+            if len(booking_ids) > limit:
+                raise ValueError(too_many)
+        if not booking_ids:
+            raise ValueError(malformed)
+        return list(booking_ids)
+
+    @staticmethod
+    def format_booking_ids(booking_ids):
+        shown = ', '.join(str(booking_id) for booking_id in booking_ids[:20])
+        return shown + (f" and {len(booking_ids) - 20} more" if len(booking_ids) > 20 else '')
 
     # Function to show messages
     def show_message(self, title, message):
@@ -177,8 +450,10 @@ class AdminApp(QWidget):
 
 
 if __name__ == '__main__':
+    property_from_args(sys.argv)  # --property CODE to open one property's database
+    migrate()
     app = QApplication(sys.argv)
-    admin_window = AdminApp()
+    admin_window = AdminApp(service_from_args(sys.argv))  # --connect HOST:PORT for client mode
     admin_window.showMaximized()  # Start maximized
     sys.exit(app.exec_())
  
\ No newline at end of file
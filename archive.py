@@ -0,0 +1,261 @@
+"""Archival of finished bookings to a cold database, and routine database maintenance.
+
+Bookings whose stay ended more than ARCHIVE_AFTER_DAYS ago are moved in
+batches to an archive database next to the live one (hotel_management_archive.db
+for hotel_management.db), unless payment is still pending on them. The live
+bookings and room_nights tables then only hold current business, so
+listings, joins and the night index stay fast as the years pile up.
+
+attach_archive() attaches the archive to a connection as `archive` and
+defines the all_bookings temp view over both tables. Listings read it when
+asked (listings.bookings_page(archived=True), the admin's "Include
+archived" box) and occupancy reports read it by themselves when their
+window reaches back into archived stays.
+
+Each batch is copied in one transaction and deleted from the live database
+in a second one. In WAL mode a transaction over attached files is not
+atomic across them, so a crash in between can only leave a booking in both
+files; all_bookings and the reports skip those copies, and the next run
+finishes the move.
+
+run_maintenance() archives, then returns the freed pages to the
+filesystem (incremental vacuum), refreshes the planner statistics (ANALYZE,
+or PRAGMA optimize when nothing moved) and reports the bytes reclaimed and
+the time each step took.
+
+    python archive.py [--days N] [--batch-size N] [--every SECONDS]
+"""
+import argparse
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+import metrics
+from repository import get_connection, get_database_path, run_with_retry, transaction
+
+
+# Stays that ended longer ago than this are archived
+ARCHIVE_AFTER_DAYS = 180
+BATCH_SIZE = 5000
+
+# Bookings moved to the archive: the stay ended before the cutoff and there is no payment left to collect
+ARCHIVE_WHERE = "check_out < ? AND (payment_status != 'Pending' OR status = 'Cancelled')"
+
+# Pages freed per PRAGMA incremental_vacuum call, so writers get the lock back in between
+VACUUM_PAGES = 2000
+
+ARCHIVE_INDEXES = {
+    'idx_archive_client_id': 'client_id',
+    'idx_archive_booking_date': 'booking_date',
+    'idx_archive_check_out': 'check_out',
+}
+
+# `steps` is a list of (step, seconds); the byte counts are the size of the live database's pages
+MaintenanceReport = namedtuple('MaintenanceReport', ['archived', 'bytes_before', 'bytes_after', 'steps'])
+
+
+def archive_path(path=None):
+    """The archive file that goes with a live database file (default: the one in use)."""
+    root, extension = os.path.splitext(path or get_database_path())
+    return f'{root}_archive{extension or ".db"}'
+
+
+def has_archive():
+    return os.path.exists(archive_path())
+
+
+def _booking_columns(conn):
+    # (name, declared type) of the live bookings table
+    return [(row[1], row[2]) for row in conn.execute('PRAGMA main.table_info(bookings)')]
+
+
+def attach_archive(conn=None):
+    """Attach the archive database to a connection (default: the calling thread's) and return the connection.
+
+    The archive file and its bookings table are created on first use and
+    follow columns added to the live table. Must not be called inside a
+    transaction.
+    """
+    conn = conn or get_connection()
+    if any(row[1] == 'archive' for row in conn.execute('PRAGMA database_list')):
+        return conn
+
+    conn.execute('ATTACH DATABASE ? AS archive', (archive_path(),))
+    # auto_vacuum only takes effect before the first table is created
+    conn.execute('PRAGMA archive.auto_vacuum = INCREMENTAL')
+    conn.execute('PRAGMA archive.journal_mode = WAL')
+    columns = _booking_columns(conn)
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS archive.bookings (
+            booking_id INTEGER PRIMARY KEY,
+            {', '.join(f'{name} {kind}' for name, kind in columns if name != 'booking_id')},
+            archived_at TEXT NOT NULL
+        )
+    ''')
+    archived = {row[1] for row in conn.execute('PRAGMA archive.table_info(bookings)')}
+    for name, kind in columns:
+        if name not in archived:
+            conn.execute(f'ALTER TABLE archive.bookings ADD COLUMN {name} {kind}')
+    for name, column in ARCHIVE_INDEXES.items():
+        conn.execute(f'CREATE INDEX IF NOT EXISTS archive.{name} ON bookings ({column})')
+
+    # Live and archived bookings together; a booking caught between the two steps of a move is read from the
+    # live table only
+    names = ', '.join(name for name, _ in columns)
+    conn.execute(f'''
+        CREATE TEMP VIEW IF NOT EXISTS all_bookings AS
+        SELECT {names} FROM main.bookings
+        UNION ALL
+        SELECT {names} FROM archive.bookings a
+        WHERE NOT EXISTS (SELECT 1 FROM main.bookings h WHERE h.booking_id = a.booking_id)
+    ''')
+    return conn
+
+
+def archived_through():
+    """Check-out date of the latest archived stay ('YYYY-MM-DD'), or None when nothing is archived."""
+    if not has_archive():
+        return None
+    return attach_archive().execute('SELECT MAX(check_out) FROM archive.bookings').fetchone()[0]
+
+
+def archive_bookings(days=ARCHIVE_AFTER_DAYS, batch_size=BATCH_SIZE):
+    """Move the bookings matching ARCHIVE_WHERE to the archive, `batch_size` at a time; returns how many moved.
+
+    Their room_nights rows go too: the nights are long past, so no
+    availability changes. Live writers only wait for one batch at a time.
+    """
+    cutoff = (date.today() - timedelta(days=days)).isoformat()
+    conn = attach_archive()
+    names = ', '.join(name for name, _ in _booking_columns(conn))
+    # The batch is kept in a temp table rather than bound as a list: with HOTEL_SQL_TRACE on, SQLite expands the
+    # bound values again for every trigger statement the deletes fire
+    conn.execute('CREATE TEMP TABLE IF NOT EXISTS archive_batch (booking_id INTEGER PRIMARY KEY)')
+    batch = 'SELECT booking_id FROM temp.archive_batch'
+
+    def copy():
+        # Only writes the archive, so the live database stays open to writers meanwhile
+        with transaction() as cursor:
+            cursor.execute(f'''
+                INSERT OR REPLACE INTO archive.bookings ({names}, archived_at)
+                SELECT {names}, datetime('now') FROM main.bookings WHERE booking_id IN ({batch})
+            ''')
+
+    def remove():
+        with transaction(immediate=True) as cursor:
+            # Keep bookings changed since they were copied; they stay live and go with a later run
+            cursor.execute(f'''
+                DELETE FROM temp.archive_batch WHERE booking_id NOT IN (
+                    SELECT booking_id FROM (
+                        SELECT {names} FROM main.bookings WHERE booking_id IN ({batch})
+                        INTERSECT
+                        SELECT {names} FROM archive.bookings WHERE booking_id IN ({batch})))
+            ''')
+            cursor.execute(f'DELETE FROM main.room_nights WHERE booking_id IN ({batch})')
+            cursor.execute(f'DELETE FROM main.bookings WHERE booking_id IN ({batch})')
+            return cursor.rowcount
+
+    moved, last = 0, 0
+    while True:
+        conn.execute('DELETE FROM temp.archive_batch')
+        conn.execute(f'''
+            INSERT INTO temp.archive_batch
+            SELECT booking_id FROM main.bookings WHERE booking_id > ? AND {ARCHIVE_WHERE} ORDER BY booking_id LIMIT ?
+        ''', (last, cutoff, batch_size))
+        end = conn.execute('SELECT MAX(booking_id) FROM temp.archive_batch').fetchone()[0]
+        if end is None:
+            return moved
+        run_with_retry(copy)
+        moved += run_with_retry(remove)
+        last = end
+
+
+def _database_bytes(conn, schema='main'):
+    page_size = conn.execute(f'PRAGMA {schema}.page_size').fetchone()[0]
+    return conn.execute(f'PRAGMA {schema}.page_count').fetchone()[0] * page_size
+
+
+def reclaim_space(conn=None):
+    """Give the live database's free pages back to the filesystem.
+
+    A database created before auto_vacuum was turned on (repository.PRAGMAS)
+    needs one full VACUUM to switch over; that is done here the first time.
+    After that, PRAGMA incremental_vacuum frees VACUUM_PAGES pages per call.
+    """
+    conn = conn or get_connection()
+    if conn.execute('PRAGMA main.auto_vacuum').fetchone()[0] != 2:
+        conn.execute('PRAGMA main.auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM main')
+    else:
+        while conn.execute('PRAGMA main.freelist_count').fetchone()[0]:
+            # The pragma frees one page per row stepped, so read it to the end
+            conn.execute(f'PRAGMA main.incremental_vacuum({VACUUM_PAGES})').fetchall()
+    # Move the WAL into the database file so its size on disk drops too
+    conn.execute('PRAGMA main.wal_checkpoint(TRUNCATE)').fetchall()
+
+
+def refresh_statistics(conn=None, analyze=True):
+    """Refresh the planner statistics of the live and archive databases.
+
+    With `analyze` (after an archive run changed the table sizes) every
+    table is analyzed; otherwise PRAGMA optimize re-analyzes only the tables
+    that grew a lot since their last ANALYZE. PRAGMA analysis_limit is left
+    off: sampling the first rows of an index like idx_bookings_status sees a
+    single status and makes the planner sort instead of walking booking_id.
+    """
+    conn = conn or get_connection()
+    if analyze:
+        conn.execute('ANALYZE')
+    else:
+        # 0x10002: consider every table, not only the ones this connection has queried
+        conn.execute('PRAGMA optimize(0x10002)').fetchall()
+
+
+def run_maintenance(days=ARCHIVE_AFTER_DAYS, batch_size=BATCH_SIZE):
+    """Archive old bookings, reclaim the freed space and refresh statistics; returns a MaintenanceReport."""
+    conn = attach_archive()
+    bytes_before = _database_bytes(conn)
+    steps = []
+    archived = 0
+    for step in ('archive', 'vacuum', 'analyze'):
+        started = time.perf_counter()
+        if step == 'archive':
+            archived = archive_bookings(days, batch_size)
+        elif step == 'vacuum':
+            reclaim_space(conn)
+        else:
+            refresh_statistics(conn, analyze=archived > 0)
+        seconds = time.perf_counter() - started
+        metrics.observe('hotel_maintenance_seconds', step, seconds)
+        steps.append((step, seconds))
+    bytes_after = _database_bytes(conn)
+    metrics.count('hotel_maintenance_reclaimed_bytes_total', '', max(bytes_before - bytes_after, 0))
+    return MaintenanceReport(archived, bytes_before, bytes_after, steps)
+
+
+def format_report(report):
+    """One line summing up a MaintenanceReport."""
+    mb = 1024 * 1024
+    steps = ', '.join(f'{step} {seconds:.2f}s' for step, seconds in report.steps)
+    return (f"Archived {report.archived} bookings; reclaimed {(report.bytes_before - report.bytes_after) / mb:.1f} MB "
+            f"({report.bytes_before / mb:.1f} MB -> {report.bytes_after / mb:.1f} MB); {steps}")
+
+
+if __name__ == '__main__':
+    from migrations import migrate
+    parser = argparse.ArgumentParser(description='Archive old bookings and reclaim database space.')
+    parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS, help='archive stays that ended this long ago')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--every', type=float, help='keep running, once every this many seconds')
+    args = parser.parse_args()
+    migrate()
+    while True:
+        try:
+            print(format_report(run_maintenance(args.days, args.batch_size)), flush=True)
+        except sqlite3.Error as e:
+            print(f"Maintenance failed: {e}", flush=True)
+        if not args.every:
+            break
+        time.sleep(args.every)
@@ -0,0 +1,48 @@
+import sqlite3
+
+from PyQt5.QtCore import QThreadPool
+
+from background import BackgroundWorker
+from database import upgrade_password_hash
+from metrics import timed
+from passwords import hash_password, verify_password
+from repository import get_connection, transaction
+
+
+class AuthWorker(BackgroundWorker):
+    """A BackgroundWorker for bcrypt-heavy sign-up and login work; start it on auth_pool()."""
+
+
+def auth_pool():
+    """Thread pool for password work; bcrypt releases the GIL, so logins run in parallel."""
+    return QThreadPool.globalInstance()
+
+
+@timed('user.sign_up')
+def register_client(name, email, phone, password):
+    """Create a client. Returns the new client_id, or None if the email or phone is already registered."""
+    cursor = get_connection().cursor()
+    cursor.execute('''SELECT client_id FROM clients WHERE email = ?''', (email,))
+    if cursor.fetchone():
+        return None
+
+    hashed_password = hash_password(password)
+    try:
+        with transaction() as cursor:
+            cursor.execute('''INSERT INTO clients (name, email, phone, password) VALUES (?, ?, ?, ?)''',
+                           (name, email, phone, hashed_password))
+            return cursor.lastrowid
+    except sqlite3.IntegrityError:
+        return None  # the phone is taken, or the email was registered since the check above
+
+
+@timed('user.login')
+def check_login(email, password):
+    """Verify a login. Returns (client_id, name), or None when the email or password is wrong."""
+    cursor = get_connection().cursor()
+    cursor.execute('''SELECT client_id, name, password FROM clients WHERE email = ?''', (email,))
+    client = cursor.fetchone()
+    if not client or not verify_password(password, client[2]):
+        return None
+    upgrade_password_hash(client[0], password, client[2])
+    return client[0], client[1]
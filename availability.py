@@ -0,0 +1,334 @@
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import date, timedelta
+
+from repository import get_connection, get_database_path, run_with_retry, transaction
+
+
+# Outcomes of reserve_stay()
+BOOKED = 'booked'
+CONFLICT = 'conflict'
+ROOM_NOT_FOUND = 'room_not_found'
+ROOM_CLOSED = 'room_closed'
+INVALID_DATES = 'invalid_dates'
+
+# `amount` is the price stored on the booking (see pricing.py), None when nothing was booked
+BookingResult = namedtuple('BookingResult', ['status', 'booking_id', 'room_id', 'amount'], defaults=[None])
+
+# Database files whose night index (and room catalog, see room_catalog.py) stay in memory at once. Each costs
+# its rooms' bitsets; one per property a process serves avoids rebuilding them as threads alternate files
+CACHED_DATABASES = 8
+
+# One database's bitsets: {room_id: booked-night bits}, the date ordinal of bit 0 (the earliest booked night
+# at load time) and the inventory version they reflect
+_Bitsets = namedtuple('_Bitsets', ['bits', 'base', 'version'])
+
+
+def parse_date(value):
+    """Accept a date, datetime or 'YYYY-MM-DD' string and return a date."""
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if hasattr(value, 'date'):
+        return value.date()
+    return value
+
+
+def default_stay():
+    """Tonight only: check in today, check out tomorrow."""
+    today = date.today()
+    return today, today + timedelta(days=1)
+
+
+def stay_nights(check_in, check_out):
+    """Return the nights of a stay as ISO date strings (check-out day excluded)."""
+    check_in, check_out = parse_date(check_in), parse_date(check_out)
+    if check_out <= check_in:
+        raise ValueError("Check-out date must be after check-in date.")
+    return [(check_in + timedelta(days=n)).isoformat() for n in range((check_out - check_in).days)]
+
+
+def night_mask(check_in, check_out, base):
+    """Bitmask covering the nights from check_in up to, not including, check_out.
+
+    Bit N stands for the night base + N days, where base is a date ordinal.
+    Nights before base are left out of the mask.
+    """
+    check_in, check_out = parse_date(check_in), parse_date(check_out)
+    if check_out <= check_in:
+        raise ValueError("Check-out date must be after check-in date.")
+    first = check_in.toordinal() - base
+    last = check_out.toordinal() - base
+    if last <= 0:
+        return 0
+    first = max(first, 0)
+    return ((1 << (last - first)) - 1) << first
+
+
+def claim_nights(cursor, booking_id, room_id, check_in, check_out):
+    """Insert one room_nights row per night; raises IntegrityError if any night is taken."""
+    cursor.executemany('''
+        INSERT INTO room_nights (room_id, night, booking_id) VALUES (?, ?, ?)
+    ''', [(room_id, night, booking_id) for night in stay_nights(check_in, check_out)])
+
+
+def release_nights(cursor, booking_id):
+    """Free every night held by a booking."""
+    cursor.execute('DELETE FROM room_nights WHERE booking_id = ?', (booking_id,))
+
+
+def inventory_version(cursor):
+    """Current value of the counter the room_nights/rooms triggers bump on every write."""
+    cursor.execute('SELECT version FROM inventory_meta')
+    return cursor.fetchone()[0]
+
+
+class AvailabilityIndex:
+    """In-memory per-room bitsets of booked nights.
+
+    The room_nights table is the source of truth. The index remembers the
+    inventory version it was built from and rebuilds itself whenever the
+    database reports a different one, so writes from other processes are
+    picked up on the next query. Our own write paths call note_write() after
+    committing, which patches the bitsets in place instead of reloading.
+
+    Bitsets are kept per database file, for the CACHED_DATABASES files used
+    most recently, so threads working on different properties (see
+    properties.fan_out) do not keep evicting each other's.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shards = OrderedDict()  # database path -> _Bitsets, least recently used first
+
+    def _load(self, cursor, version):
+        # Starting the bitsets at the earliest booked night keeps the integers short
+        cursor.execute('SELECT MIN(night) FROM room_nights')
+        earliest = cursor.fetchone()[0]
+        base = date.today().toordinal()
+        if earliest is not None:
+            base = min(base, date.fromisoformat(earliest).toordinal())
+
+        bits = {}
+        cursor.execute('SELECT room_id FROM rooms WHERE availability = 1 ORDER BY room_id')
+        for (room_id,) in cursor.fetchall():
+            bits[room_id] = 0
+
+        night_bits = {}
+        cursor.execute('SELECT room_id, night FROM room_nights')
+        for room_id, night in cursor:
+            if room_id in bits:
+                bit = night_bits.get(night)
+                if bit is None:
+                    bit = night_bits[night] = 1 << (date.fromisoformat(night).toordinal() - base)
+                bits[room_id] |= bit
+        return _Bitsets(bits, base, version)
+
+    def _current(self):
+        # Must be called with self._lock held; returns the up-to-date _Bitsets of the calling thread's database
+        path = get_database_path()
+        cursor = get_connection().cursor()
+        shard = self._shards.get(path)
+        if shard is None or shard.version != inventory_version(cursor):
+            with transaction() as cursor:
+                shard = self._load(cursor, inventory_version(cursor))
+            self._shards[path] = shard
+            while len(self._shards) > CACHED_DATABASES:
+                self._shards.popitem(last=False)
+        self._shards.move_to_end(path)
+        return shard
+
+    def free_rooms(self, check_in, check_out):
+        """Room IDs of bookable rooms with every night of the stay free, in room order."""
+        with self._lock:
+            shard = self._current()
+            mask = night_mask(check_in, check_out, shard.base)
+            return [room_id for room_id, bits in shard.bits.items() if not bits & mask]
+
+    def booked_rooms(self, check_in, check_out):
+        """Room IDs of bookable rooms with any night of the stay taken, in room order."""
+        with self._lock:
+            shard = self._current()
+            mask = night_mask(check_in, check_out, shard.base)
+            return [room_id for room_id, bits in shard.bits.items() if bits & mask]
+
+    def night_windows(self, check_in, check_out):
+        """{room_id: bits} for the bookable rooms, in room order; bit N is set when night check_in + N days is taken."""
+        check_in, check_out = parse_date(check_in), parse_date(check_out)
+        if check_out <= check_in:
+            raise ValueError("Check-out date must be after check-in date.")
+        mask = (1 << (check_out - check_in).days) - 1
+        with self._lock:
+            shard = self._current()
+            shift = check_in.toordinal() - shard.base
+            if shift >= 0:
+                return {room_id: (bits >> shift) & mask for room_id, bits in shard.bits.items()}
+            return {room_id: (bits << -shift) & mask for room_id, bits in shard.bits.items()}
+
+    def open_count(self):
+        """Number of rooms open for sale."""
+        with self._lock:
+            return len(self._current().bits)
+
+    def is_free(self, room_id, check_in, check_out):
+        with self._lock:
+            shard = self._current()
+            bits = shard.bits.get(room_id)
+            mask = night_mask(check_in, check_out, shard.base)
+        return bits is not None and not bits & mask
+
+    def open_rooms(self):
+        """IDs of rooms open for sale (rooms.availability = 1)."""
+        with self._lock:
+            return set(self._current().bits)
+
+    def note_write(self, version_before, version_after, room_id, check_in, check_out, booked):
+        """Apply a committed booking or release without reloading, if nothing else changed in between."""
+        self.note_writes(version_before, version_after, [(room_id, check_in, check_out, booked)])
+
+    def note_writes(self, version_before, version_after, changes):
+        """Apply a committed batch of (room_id, check_in, check_out, booked) changes in order."""
+        path = get_database_path()
+        with self._lock:
+            shard = self._shards.get(path)
+            if shard is None:
+                return
+            if shard.version != version_before:
+                del self._shards[path]
+                return
+            for room_id, check_in, check_out, booked in changes:
+                if (check_in is None or room_id not in shard.bits
+                        or parse_date(check_in).toordinal() < shard.base):
+                    del self._shards[path]
+                    return
+                mask = night_mask(check_in, check_out, shard.base)
+                if booked:
+                    shard.bits[room_id] |= mask
+                else:
+                    shard.bits[room_id] &= ~mask
+            self._shards[path] = shard._replace(version=version_after)
+
+    def invalidate(self):
+        with self._lock:
+            self._shards.clear()
+
+
+index = AvailabilityIndex()
+
+
+def free_room_ids(check_in=None, check_out=None):
+    """Room IDs free for every night between check_in and check_out (default: tonight)."""
+    if check_in is None or check_out is None:
+        check_in, check_out = default_stay()
+    return index.free_rooms(check_in, check_out)
+
+
+def booked_room_ids(check_in=None, check_out=None):
+    """Open room IDs with at least one night between check_in and check_out taken (default: tonight)."""
+    if check_in is None or check_out is None:
+        check_in, check_out = default_stay()
+    return index.booked_rooms(check_in, check_out)
+
+
+def is_room_free(room_id, check_in, check_out):
+    return index.is_free(room_id, check_in, check_out)
+
+
+def claim_stay(cursor, client_id, room_id, check_in, check_out, booking_date, status='Booked', payment_status='Pending',
+               amount=None):
+    """Conditionally insert a booking and claim its nights inside the caller's write transaction.
+
+    The INSERT only writes a row when the room is open for sale and none of
+    the stay's nights are taken, so checking and claiming is a single
+    statement. `amount` is the price of the stay (pricing.quote_stay()).
+    Returns the new booking_id, or None when nothing was written.
+    """
+    check_in, check_out = parse_date(check_in).isoformat(), parse_date(check_out).isoformat()
+    cursor.execute('''
+        INSERT INTO bookings (client_id, room_id, booking_date, check_in, check_out, status, payment_status, amount)
+        SELECT ?, room_id, ?, ?, ?, ?, ?, ?
+        FROM rooms
+        WHERE room_id = ? AND availability = 1
+          AND NOT EXISTS (
+              SELECT 1 FROM room_nights WHERE room_id = ? AND night >= ? AND night < ?
+          )
+    ''', (client_id, booking_date, check_in, check_out, status, payment_status, amount,
+          room_id, room_id, check_in, check_out))
+    if cursor.rowcount == 0:
+        return None
+    booking_id = cursor.lastrowid
+    claim_nights(cursor, booking_id, room_id, check_in, check_out)
+    return booking_id
+
+
+def conflict_reason(room_id):
+    """After a failed claim, tell a taken room (CONFLICT) from a missing or closed one."""
+    cursor = get_connection().cursor()
+    cursor.execute('SELECT availability FROM rooms WHERE room_id = ?', (room_id,))
+    room = cursor.fetchone()
+    if room is None:
+        return ROOM_NOT_FOUND
+    if room[0] != 1:
+        return ROOM_CLOSED
+    return CONFLICT
+
+
+def reserve_stay(client_id, room_id, check_in, check_out, booking_date, status='Booked', payment_status='Pending',
+                 amount=None):
+    """Book a room for a stay in one BEGIN IMMEDIATE transaction.
+
+    Retries with backoff while the database is locked by another writer and
+    returns a BookingResult whose status is BOOKED, CONFLICT, ROOM_NOT_FOUND
+    or ROOM_CLOSED. `amount`, the price of the stay, is stored on the booking.
+    """
+    stay_nights(check_in, check_out)  # reject an empty or inverted stay before taking the lock
+
+    def attempt():
+        with transaction(immediate=True) as cursor:
+            before = inventory_version(cursor)
+            booking_id = claim_stay(cursor, client_id, room_id, check_in, check_out,
+                                    booking_date, status, payment_status, amount)
+            after = inventory_version(cursor) if booking_id is not None else before
+        return booking_id, before, after
+
+    booking_id, before, after = run_with_retry(attempt)
+    if booking_id is None:
+        return BookingResult(conflict_reason(room_id), None, room_id)
+    index.note_write(before, after, room_id, check_in, check_out, booked=True)
+    return BookingResult(BOOKED, booking_id, room_id, amount)
+
+
+def release_stay(cursor, booking_id, client_id=None):
+    """Delete a booking and free its nights inside the caller's write transaction.
+
+    Returns the deleted (room_id, check_in, check_out), or None if there was no such booking
+    (or, with client_id, none of that client's).
+    """
+    if client_id is None:
+        cursor.execute('SELECT room_id, check_in, check_out FROM bookings WHERE booking_id = ?', (booking_id,))
+    else:
+        cursor.execute('SELECT room_id, check_in, check_out FROM bookings WHERE booking_id = ? AND client_id = ?',
+                       (booking_id, client_id))
+    booking = cursor.fetchone()
+    if booking is None:
+        return None
+    cursor.execute('DELETE FROM bookings WHERE booking_id = ?', (booking_id,))
+    release_nights(cursor, booking_id)
+    return booking
+
+
+def release_booking(booking_id):
+    """Delete a booking and free its nights. Returns the room_id, or None if there was no such booking."""
+    def attempt():
+        with transaction(immediate=True) as cursor:
+            before = inventory_version(cursor)
+            booking = release_stay(cursor, booking_id)
+            after = inventory_version(cursor)
+        return booking, before, after
+
+    booking, before, after = run_with_retry(attempt)
+    if booking is None:
+        return None
+
+    room_id, check_in, check_out = booking
+    index.note_write(before, after, room_id, check_in, check_out, booked=False)
+    return room_id
@@ -0,0 +1,54 @@
+"""Slow reads (reports, client searches) run off the GUI thread on a thread pool of their own.
+
+Password hashing keeps QThreadPool.globalInstance() (auth_worker.auth_pool()),
+so a long report or snapshot copy never holds up a login, and a burst of
+logins never delays a report.
+"""
+import sqlite3
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from service_client import ServiceError
+
+
+# Threads for background reads: one for a long report, one for the searches typed meanwhile
+BACKGROUND_THREADS = 2
+
+_pool = None
+
+
+class WorkerSignals(QObject):
+    """Signals a worker uses to hand its result back to the GUI thread."""
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class BackgroundWorker(QRunnable):
+    """Run a slow function on a pool thread and report back through signals.
+
+    The signals object is created in the GUI thread, so connected slots run
+    there and may touch widgets.
+    """
+
+    def __init__(self, function, *args):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            result = self.function(*self.args)
+        except (sqlite3.Error, OSError, ServiceError) as e:
+            self.signals.failed.emit(f'Error: {e}')
+        else:
+            self.signals.finished.emit(result)
+
+
+def background_pool():
+    """Thread pool for reports and searches, created on first use."""
+    global _pool
+    if _pool is None:
+        _pool = QThreadPool()
+        _pool.setMaxThreadCount(BACKGROUND_THREADS)
+    return _pool
@@ -0,0 +1,75 @@
+"""Hot-table query times before and after archive.run_maintenance().
+
+Generates (or copies, with --db) a database of the given --scale into a
+temporary directory, times a few booking listings and this quarter's
+occupancy report, runs the archival and maintenance job and times them
+again. The --db file itself is never modified.
+
+Usage: python benchmarks/bench_archive.py [--scale 10k|1m|10m] [--db PATH] [--days N]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import repository  # noqa: E402
+from archive import ARCHIVE_AFTER_DAYS, format_report, run_maintenance  # noqa: E402
+from generate_data import SCALES, generate  # noqa: E402
+from listings import bookings_page  # noqa: E402
+from reports import occupancy_report  # noqa: E402
+
+REPEATS = 5
+
+QUERIES = {
+    'newest bookings': lambda: bookings_page(limit=256, descending=True),
+    'by booking date': lambda: bookings_page(limit=256, sort='booking_date', descending=True),
+    'pending payments': lambda: bookings_page(limit=256, payment_status='Pending'),
+    'one client': lambda: bookings_page(limit=256, client_id=77),
+    'this quarter report': lambda: occupancy_report(date.today() - timedelta(days=91), date.today()),
+}
+
+
+def measure():
+    for name, query in QUERIES.items():
+        times = []
+        for _ in range(REPEATS):
+            started = time.perf_counter()
+            query()
+            times.append(time.perf_counter() - started)
+        times.sort()
+        print(f"  {name:<20} median {times[len(times) // 2] * 1000:8.2f} ms")
+    rows = repository.get_connection().execute('SELECT COUNT(*) FROM bookings').fetchone()[0]
+    print(f"  {rows} live bookings, file {os.path.getsize(repository.get_database_path()) / 1024 / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1m')
+    parser.add_argument('--db', help='database to copy instead of generating one')
+    parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        if args.db:
+            shutil.copyfile(args.db, path)
+        else:
+            print(f"Generating {args.scale} database ...")
+            generate(path, rounds=4, **SCALES[args.scale])
+        repository.set_database_path(path)
+
+        print('Before archiving:')
+        measure()
+        print(format_report(run_maintenance(args.days)))
+        print('After archiving:')
+        measure()
+        repository.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
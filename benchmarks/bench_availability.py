@@ -0,0 +1,95 @@
+"""Latency of "all rooms free for these nights" over a large inventory.
+
+Builds a throwaway database with --rooms rooms and random stays spread over
+--days nights, then times free_room_ids() for random date ranges.
+
+Usage: python benchmarks/bench_availability.py [--rooms N] [--days N] [--queries N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import availability  # noqa: E402
+import database  # noqa: E402
+import repository  # noqa: E402
+
+
+def populate(rooms, days, occupancy, rng):
+    start = date.today()
+    with repository.transaction() as cursor:
+        cursor.execute('DELETE FROM rooms')
+        cursor.executemany('''
+            INSERT INTO rooms (room_id, room_type, price, bed_count, level, availability, category, description)
+            VALUES (?, 'Standard', 50, 1, 1, 1, 'Standard Room', 'Basic room with 1 bed')
+        ''', [(room_id,) for room_id in range(1, rooms + 1)])
+
+        booking_id = 0
+        for room_id in range(1, rooms + 1):
+            night = 0
+            while night < days:
+                length = rng.randint(1, 7)
+                if rng.random() < occupancy:
+                    booking_id += 1
+                    check_in = start + timedelta(days=night)
+                    check_out = check_in + timedelta(days=length)
+                    cursor.execute('''
+                        INSERT INTO bookings (booking_id, client_id, room_id, booking_date, check_in, check_out, status, payment_status)
+                        VALUES (?, 1, ?, ?, ?, ?, 'Booked', 'Pending')
+                    ''', (booking_id, room_id, check_in.isoformat(), check_in.isoformat(), check_out.isoformat()))
+                    availability.claim_nights(cursor, booking_id, room_id, check_in, check_out)
+                night += length
+    return start, booking_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rooms', type=int, default=5000)
+    parser.add_argument('--days', type=int, default=450)
+    parser.add_argument('--occupancy', type=float, default=0.6)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repository.set_database_path(os.path.join(tmp, 'bench.db'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.create_database()
+
+        started = time.perf_counter()
+        start, bookings = populate(args.rooms, args.days, args.occupancy, rng)
+        print(f"Built {args.rooms} rooms, {bookings} bookings over {args.days} nights "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        availability.free_room_ids(start, start + timedelta(days=1))
+        print(f"Index load: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        timings = []
+        for _ in range(args.queries):
+            check_in = start + timedelta(days=rng.randrange(args.days - 14))
+            check_out = check_in + timedelta(days=rng.randint(1, 14))
+            t0 = time.perf_counter()
+            availability.free_room_ids(check_in, check_out)
+            timings.append((time.perf_counter() - t0) * 1000)
+
+        timings.sort()
+        print(f"free_room_ids over {args.queries} queries: "
+              f"mean {statistics.mean(timings):.3f} ms, "
+              f"p50 {timings[len(timings) // 2]:.3f} ms, "
+              f"p99 {timings[int(len(timings) * 0.99)]:.3f} ms")
+
+        repository.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
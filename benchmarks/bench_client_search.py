@@ -0,0 +1,55 @@
+"""Client search latency: typical admin search-box queries against the clients_fts index.
+
+Usage: python benchmarks/bench_client_search.py [--clients N] [--db PATH] [--runs N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# From one broad letter to a full email, as typed into the search box
+QUERIES = ['a', 'pri', 'priya', 'priya men', 'priya mensah', 'mensah', 'exampl', 'example', '555000',
+           'olga khan 17', 'priya.mensah.1996', 'nobody here']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=1_000_000)
+    parser.add_argument('--db', help='existing database (default: a generated one with --clients clients)')
+    parser.add_argument('--runs', type=int, default=20, help='timed runs per query')
+    args = parser.parse_args()
+
+    import repository
+    from client_search import search_clients
+    from migrations import migrate
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db
+        if path is None:
+            sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+            from generate_data import generate
+            path = os.path.join(tmp, 'bench.db')
+            print(f"Generating {args.clients} clients...")
+            generate(path, clients=args.clients, rooms=10, bookings=0, rounds=4)
+        repository.set_database_path(path)
+        migrate()
+
+        print(f"{'query':<20} {'matches':>7} {'median':>9} {'worst':>9}")
+        for query in QUERIES:
+            matches = len(search_clients(query))
+            timings = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                search_clients(query)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            print(f"{query:<20} {matches:>7} {timings[len(timings) // 2]:>7.2f}ms {timings[-1]:>7.2f}ms")
+        repository.close_connection()
+
+
+if __name__ == '__main__':
+    main()
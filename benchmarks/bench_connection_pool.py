@@ -0,0 +1,83 @@
+"""Calls per second with a fresh sqlite3.connect per call versus the shared connection.
+
+Usage: python benchmarks/bench_connection_pool.py [--calls N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import repository  # noqa: E402
+
+
+def per_call_view_available_rooms(path):
+    # The query pattern every view_* function used before the shared repository
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute('''SELECT room_id, room_type, price, description FROM rooms WHERE availability = 1''')
+    rooms = cursor.fetchall()
+    conn.close()
+    return rooms
+
+
+def per_call_view_bookings(path, client_id):
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT b.booking_id, r.room_type, b.booking_date, b.status, b.payment_status
+        FROM bookings b JOIN rooms r ON b.room_id = r.room_id
+        WHERE b.client_id = ?
+    ''', (client_id,))
+    bookings = cursor.fetchall()
+    conn.close()
+    return bookings
+
+
+def measure(label, func, calls):
+    # database.py reports through print(), so keep the output out of the timing
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = time.perf_counter() - start
+    rate = calls / elapsed
+    print(f"{label:<45} {rate:>12,.0f} calls/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        repository.set_database_path(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.create_database()
+
+        print(f"Database: {path}, {args.calls} calls per case\n")
+        before = measure('view_available_rooms, connect per call',
+                         lambda: per_call_view_available_rooms(path), args.calls)
+        after = measure('view_available_rooms, shared connection',
+                        database.view_available_rooms, args.calls)
+        print(f"{'speedup':<45} {after / before:>12.1f}x\n")
+
+        before = measure('view_bookings, connect per call',
+                         lambda: per_call_view_bookings(path, 1), args.calls)
+        after = measure('view_bookings, shared connection',
+                        lambda: database.view_bookings(1), args.calls)
+        print(f"{'speedup':<45} {after / before:>12.1f}x")
+
+        repository.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""End-to-end latency and throughput of the client and admin operations.
+
+For each --scale (see generate_data.SCALES) a seeded database is generated
+(or reused from --data-dir), then every operation below runs --iterations
+times and its p50/p99 latency and throughput are recorded:
+
+    sign_up_client, authenticate_client, view_available_rooms, book_room,
+    view_bookings, and the admin listing queries (first page, deep page,
+    filtered by status and date, clients)
+
+bcrypt dominates sign-up and login, so those run --auth-iterations times at
+--rounds. Results are written as JSON to --output so runs from different
+versions can be compared; --compare prints the change against an earlier file.
+
+Usage: python benchmarks/bench_end_to_end.py [--scale 10k 1m 10m] [--iterations N] [--output FILE]
+                                             [--compare FILE] [--data-dir DIR]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import passwords  # noqa: E402
+import repository  # noqa: E402
+from generate_data import GENERATED_PASSWORD, SCALES, generate  # noqa: E402
+from listings import bookings_page, clients_page  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Rows per admin listing fetch, the batch size of the admin tables (table_models.SqlTableModel)
+ADMIN_BATCH = 256
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def measure(operation, iterations):
+    """Call operation(n) for n in range(iterations) and summarise the latencies in milliseconds."""
+    samples = []
+    started = time.perf_counter()
+    for n in range(iterations):
+        begin = time.perf_counter()
+        operation(n)
+        samples.append((time.perf_counter() - begin) * 1000)
+    elapsed = time.perf_counter() - started
+    samples.sort()
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(samples, 0.50), 4),
+        'p99_ms': round(percentile(samples, 0.99), 4),
+        'mean_ms': round(sum(samples) / len(samples), 4),
+        'max_ms': round(samples[-1], 4),
+        'ops_per_sec': round(iterations / elapsed, 1) if elapsed else None,
+    }
+
+
+def operations(rng, counts):
+    """(name, operation, uses bcrypt) for every benchmarked operation."""
+    cursor = repository.get_connection().cursor()
+    cursor.execute('SELECT (SELECT MAX(client_id) FROM clients), (SELECT MAX(booking_id) FROM bookings)')
+    max_client, max_booking = cursor.fetchone()
+    run_id = int(time.time())
+    today = date.today()
+
+    def email(client_id):
+        cursor.execute('SELECT email FROM clients WHERE client_id = ?', (client_id,))
+        return cursor.fetchone()[0]
+
+    def future_stay():
+        check_in = today + timedelta(days=rng.randrange(1, 300))
+        return check_in, check_in + timedelta(days=rng.randint(1, 7))
+
+    def sign_up(n):
+        database.sign_up_client('Bench Guest', f'bench.{run_id}.{n}@example.com', f'9{run_id % 10**6:06d}{n:05d}',
+                                GENERATED_PASSWORD)
+
+    def authenticate(n):
+        database.authenticate_client(email(rng.randint(1, max_client)), GENERATED_PASSWORD)
+
+    def available(n):
+        database.view_available_rooms(*future_stay())
+
+    def book(n):
+        database.book_room(rng.randint(1, max_client), rng.randint(1, counts['rooms']), *future_stay())
+
+    def client_bookings(n):
+        database.view_bookings(rng.randint(1, max_client))
+
+    def admin_first_page(n):
+        bookings_page(limit=ADMIN_BATCH, descending=n % 2 == 1)
+
+    def admin_deep_page(n):
+        booking_id = rng.randint(1, max_booking)
+        bookings_page((booking_id, booking_id), limit=ADMIN_BATCH)
+
+    def admin_filtered(n):
+        date_from = today - timedelta(days=rng.randrange(365))
+        bookings_page(limit=ADMIN_BATCH, sort='booking_date', status='Booked', payment_status='Pending',
+                      date_from=date_from, date_to=date_from + timedelta(days=30))
+
+    def admin_clients(n):
+        client_id = rng.randint(1, max_client)
+        clients_page((client_id, client_id), limit=ADMIN_BATCH)
+
+    return [
+        ('sign_up_client', sign_up, True),
+        ('authenticate_client', authenticate, True),
+        ('view_available_rooms', available, False),
+        ('book_room', book, False),
+        ('view_bookings', client_bookings, False),
+        ('admin bookings first page', admin_first_page, False),
+        ('admin bookings deep page', admin_deep_page, False),
+        ('admin bookings filtered', admin_filtered, False),
+        ('admin clients page', admin_clients, False),
+    ]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scale(scale, args, data_dir):
+    path = os.path.join(data_dir, f'hotel-{scale}-seed{args.seed}-r{args.rounds}.db')
+    generated = None
+    if not os.path.exists(path):
+        print(f"Generating {scale} database at {path} ...")
+        started = time.perf_counter()
+        generate(path, seed=args.seed, rounds=args.rounds, **SCALES[scale])
+        generated = round(time.perf_counter() - started, 1)
+    repository.set_database_path(path)
+    # Drop the generator's connection state so every scale starts from a fresh connection
+    repository.close_all_connections()
+
+    cursor = repository.get_connection().cursor()
+    counts = {}
+    for table in ('clients', 'rooms', 'bookings', 'room_nights'):
+        cursor.execute(f'SELECT COUNT(*) FROM {table}')
+        counts[table] = cursor.fetchone()[0]
+
+    rng = random.Random(args.seed)
+    results = {}
+    with open(os.devnull, 'w') as sink:
+        for name, operation, uses_bcrypt in operations(rng, counts):
+            iterations = args.auth_iterations if uses_bcrypt else args.iterations
+            with contextlib.redirect_stdout(sink):
+                results[name] = measure(operation, iterations)
+            stats = results[name]
+            print(f"  {name:<28} p50 {stats['p50_ms']:9.3f} ms  p99 {stats['p99_ms']:9.3f} ms  "
+                  f"{stats['ops_per_sec']:>9} ops/s")
+    repository.close_all_connections()
+    return {'rows': counts, 'generate_seconds': generated, 'operations': results}
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nChange in p50 / p99 against {baseline_path} ({baseline.get('label')}):")
+    for scale, result in current['scales'].items():
+        before = baseline.get('scales', {}).get(scale)
+        if not before:
+            continue
+        for name, stats in result['operations'].items():
+            old = before['operations'].get(name)
+            if not old or not old['p50_ms'] or not old['p99_ms']:
+                continue
+            print(f"  {scale:>4} {name:<28} p50 {stats['p50_ms'] / old['p50_ms'] - 1:+7.1%}  "
+                  f"p99 {stats['p99_ms'] / old['p99_ms'] - 1:+7.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', nargs='+', choices=sorted(SCALES), default=['10k'])
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--auth-iterations', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=passwords.BCRYPT_ROUNDS, help='bcrypt cost factor')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', help='keep generated databases here and reuse them (default: temporary)')
+    parser.add_argument('--label', help='name of this run in the results (default: git commit)')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<label>.json)')
+    parser.add_argument('--compare', metavar='FILE', help='earlier results file to compare against')
+    args = parser.parse_args()
+    passwords.BCRYPT_ROUNDS = args.rounds
+
+    label = args.label or git_commit() or 'unversioned'
+    results = {
+        'label': label,
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'settings': {'iterations': args.iterations, 'auth_iterations': args.auth_iterations,
+                     'bcrypt_rounds': args.rounds, 'seed': args.seed},
+        'scales': {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data_dir or tmp
+        os.makedirs(data_dir, exist_ok=True)
+        for scale in args.scale:
+            print(f"Scale {scale}:")
+            results['scales'][scale] = run_scale(scale, args, data_dir)
+
+    output = args.output or os.path.join(REPO_ROOT, 'benchmarks', 'results', f'{label}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
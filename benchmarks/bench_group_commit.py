@@ -0,0 +1,103 @@
+"""Commits and bookings per second: per-call commit versus the group-commit booking writer.
+
+Several threads each book a run of non-overlapping stays, first by calling
+reserve_stay() directly (one transaction per booking), then by queueing the
+same work on a BookingWriter.
+
+Usage: python benchmarks/bench_group_commit.py [--threads N] [--bookings N] [--synchronous FULL]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import availability  # noqa: E402
+import database  # noqa: E402
+import repository  # noqa: E402
+from booking_writer import BookingWriter  # noqa: E402
+
+
+def stays(worker_id, count, rooms):
+    # Each worker gets its own room and walks forward one night at a time, so nothing conflicts
+    start = date.today()
+    room_id = (worker_id - 1) % rooms + 1
+    offset = (worker_id - 1) // rooms * count
+    for n in range(count):
+        check_in = start + timedelta(days=offset + n)
+        yield room_id, check_in, check_in + timedelta(days=1)
+
+
+def run_threads(threads, work):
+    workers = [threading.Thread(target=work, args=(n + 1,)) for n in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def per_call(args, rooms):
+    def work(worker_id):
+        for room_id, check_in, check_out in stays(worker_id, args.bookings, rooms):
+            availability.reserve_stay(worker_id, room_id, check_in, check_out, check_in.isoformat())
+        repository.close_connection()
+
+    elapsed = run_threads(args.threads, work)
+    total = args.threads * args.bookings
+    return total, total, elapsed
+
+
+def group_commit(args, rooms):
+    with BookingWriter(args.batch_size, args.batch_wait) as writer:
+        def work(worker_id):
+            futures = [writer.book_room(worker_id, room_id, check_in, check_out)
+                       for room_id, check_in, check_out in stays(worker_id, args.bookings, rooms)]
+            for future in futures:
+                assert future.result().status == availability.BOOKED
+
+        elapsed = run_threads(args.threads, work)
+    return writer.operations, writer.commits, elapsed
+
+
+def fresh_database(path):
+    repository.close_all_connections()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    repository.set_database_path(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.create_database()
+    return repository.get_connection().execute('SELECT COUNT(*) FROM rooms').fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--bookings', type=int, default=250, help='bookings per thread')
+    parser.add_argument('--batch-size', type=int, default=128)
+    parser.add_argument('--batch-wait', type=float, default=0.005)
+    parser.add_argument('--synchronous', default='FULL', help='PRAGMA synchronous for the run (FULL fsyncs every commit)')
+    args = parser.parse_args()
+    repository.PRAGMAS['synchronous'] = args.synchronous
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        print(f"{args.threads} threads x {args.bookings} bookings, synchronous={args.synchronous}\n")
+        for label, run in (('per-call commit', per_call), ('group commit', group_commit)):
+            rooms = fresh_database(path)
+            bookings, commits, elapsed = run(args, rooms)
+            print(f"{label:<16} {bookings / elapsed:>9,.0f} bookings/s {commits / elapsed:>9,.0f} commits/s "
+                  f"{bookings / commits:>6.1f} bookings/commit")
+        repository.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
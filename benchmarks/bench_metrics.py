@@ -0,0 +1,97 @@
+"""Cost of the metrics layer: the same hot calls with HOTEL_METRICS=0 and with metrics on.
+
+metrics.ENABLED is read at import time, so each setting runs in its own
+child processes against the same generated database, alternating.
+
+Usage: python benchmarks/bench_metrics.py [--calls N] [--db PATH]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+REPEATS = 3
+
+
+def run_calls(path, calls):
+    # Child process: time a point query, view_bookings and book_room with whatever HOTEL_METRICS says
+    import database
+    import repository
+    repository.set_database_path(path)
+    cursor = repository.get_connection().cursor()
+    cursor.execute('SELECT MAX(client_id), MAX(room_id) FROM clients, rooms')
+    clients, rooms = cursor.fetchone()
+    cursor.execute('SELECT MAX(check_out) FROM bookings')
+    first_night = date.fromisoformat(cursor.fetchone()[0] or '2040-01-01')
+
+    def point_query(i):
+        cursor.execute('SELECT name, email FROM clients WHERE client_id = ?', (i % clients + 1,))
+        cursor.fetchone()
+
+    def view_bookings(i):
+        database.view_bookings(i % clients + 1)
+
+    def book_room(i):
+        # A night after every existing booking, so each call makes a real booking
+        night = first_night + timedelta(days=i // rooms)
+        database.book_room(i % clients + 1, i % rooms + 1, night, night + timedelta(days=1))
+
+    # Best of REPEATS runs per call, in microseconds; single runs vary by more than the overhead measured
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, function, count in [('point query', point_query, calls), ('view_bookings', view_bookings, calls),
+                                      ('book_room', book_room, calls // 10)]:
+            best = float('inf')
+            for repeat in range(REPEATS):
+                started = time.perf_counter()
+                for i in range(repeat * count, (repeat + 1) * count):
+                    function(i)
+                best = min(best, (time.perf_counter() - started) / count * 1e6)
+            results[name] = best
+    print(json.dumps(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=10000)
+    parser.add_argument('--db', help='existing database (default: a generated 10k database)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_calls(args.db, args.calls)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db
+        if path is None:
+            sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+            from generate_data import SCALES, generate
+            path = os.path.join(tmp, 'bench.db')
+            generate(path, rounds=4, **SCALES['10k'])
+        # Alternate the two settings so drift in machine load hits both alike; keep the best of each
+        timings = {'0': {}, '1': {}}
+        for _ in range(REPEATS):
+            for setting in ('0', '1'):
+                environment = dict(os.environ, HOTEL_METRICS=setting)
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', '--db', path,
+                                         '--calls', str(args.calls)], env=environment, check=True,
+                                        capture_output=True, text=True).stdout
+                for name, micros in json.loads(output.strip().splitlines()[-1]).items():
+                    timings[setting][name] = min(micros, timings[setting].get(name, float('inf')))
+        print(f"{'call':<15} {'metrics off':>12} {'metrics on':>12} {'overhead':>10}")
+        for name, off in timings['0'].items():
+            on = timings['1'][name]
+            print(f"{name:<15} {off:>10.1f}us {on:>10.1f}us {on - off:>8.1f}us")
+
+
+if __name__ == '__main__':
+    main()
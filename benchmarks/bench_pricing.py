@@ -0,0 +1,72 @@
+"""Quote latency: every room priced for every night of a stay in one pass.
+
+Times quote_matrix() (the rooms x nights price matrix, with weekday, season
+and occupancy multipliers) for stays of a few lengths, and quote_stay() for
+one room. The night index and room arrays are loaded before timing.
+
+Usage: python benchmarks/bench_pricing.py [--rooms N] [--bookings N] [--db PATH] [--runs N]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Stay lengths quoted, in nights
+STAYS = (1, 3, 7, 14, 30, 90)
+
+
+def best_of(runs, function):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=40_000)
+    parser.add_argument('--bookings', type=int, default=400_000)
+    parser.add_argument('--db', help='database to copy instead of generating one with --rooms and --bookings')
+    parser.add_argument('--runs', type=int, default=10, help='timed runs per stay; the best is shown')
+    args = parser.parse_args()
+
+    import repository
+    from migrations import migrate
+    from pricing import quote_matrix, quote_stay
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        if args.db:
+            # migrate() adds the pricing tables, so work on a copy
+            shutil.copyfile(args.db, path)
+        else:
+            sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+            from generate_data import generate
+            print(f"Generating {args.rooms} rooms and {args.bookings} bookings...")
+            generate(path, clients=1000, rooms=args.rooms, bookings=args.bookings, rounds=4)
+        repository.set_database_path(path)
+        migrate()
+
+        check_in = date.today() + timedelta(days=30)
+        quote_matrix(check_in, check_in + timedelta(days=1))  # load the night index and room arrays first
+        print(f"{'nights':>6} {'rooms':>7} {'free':>7} {'matrix':>10} {'one room':>10}")
+        for nights in STAYS:
+            check_out = check_in + timedelta(days=nights)
+            found = quote_matrix(check_in, check_out)
+            room_id = int(found.room_ids[0])
+            matrix = best_of(args.runs, lambda: quote_matrix(check_in, check_out))
+            single = best_of(args.runs, lambda: quote_stay(room_id, check_in, check_out))
+            print(f"{nights:>6} {len(found.room_ids):>7} {int(found.free.sum()):>7} {matrix:>8.2f}ms {single:>8.2f}ms")
+        repository.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Time and memory of reports.occupancy_report on a generated database.
+
+Generates (or reuses, with --db) a database of the given --scale, then
+runs the report over the whole booking horizon and over one quarter, and
+prints the run time and the growth in peak resident memory.
+
+Usage: python benchmarks/bench_reports.py [--scale 10k|1m|10m] [--db PATH] [--period week|month|quarter]
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import repository  # noqa: E402
+from generate_data import SCALES, generate  # noqa: E402
+from reports import PERIODS, occupancy_report  # noqa: E402
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1m')
+    parser.add_argument('--db', help='existing database to report on (generated there if missing)')
+    parser.add_argument('--period', choices=PERIODS, default='month')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db or os.path.join(tmp, 'bench.db')
+        if not os.path.exists(path):
+            print(f"Generating {args.scale} database ...")
+            generate(path, rounds=4, **SCALES[args.scale])
+        repository.set_database_path(path)
+
+        today = date.today()
+        windows = {
+            'whole horizon': (today - timedelta(days=3 * 365), today + timedelta(days=365)),
+            'one quarter': (today - timedelta(days=91), today),
+        }
+        for name, (start, end) in windows.items():
+            before = peak_rss_mb()
+            started = time.perf_counter()
+            report = occupancy_report(start, end, period=args.period)
+            elapsed = time.perf_counter() - started
+            nights = sum(row.sold_nights for row in report)
+            print(f"{name:<14} {len(report):>4} rows, {nights:>10} sold nights in {elapsed:6.2f}s, "
+                  f"peak RSS +{peak_rss_mb() - before:.0f} MB")
+        repository.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
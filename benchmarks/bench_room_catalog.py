@@ -0,0 +1,80 @@
+"""Room view latency with the SQL room query versus the cached room catalog.
+
+Repeats the available-rooms lookup --views times against a database with
+--rooms rooms, first with the old per-view SELECT on rooms, then through
+room_catalog.available_rooms, and prints the catalog hit/miss counts. A
+booking is made every --book-every views to show that inventory writes do
+not evict the catalog.
+
+Usage: python benchmarks/bench_room_catalog.py [--rooms N] [--views N] [--book-every N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import repository  # noqa: E402
+from availability import reserve_stay  # noqa: E402
+from room_catalog import available_rooms, catalog  # noqa: E402
+
+
+def sql_view():
+    cursor = repository.get_connection().cursor()
+    cursor.execute('SELECT room_id, room_type, price, bed_count, level, category, description '
+                   'FROM rooms WHERE availability = 1')
+    return cursor.fetchall()
+
+
+def timed(view, views, book_every, book):
+    samples = []
+    for n in range(views):
+        if book_every and n and n % book_every == 0:
+            book(n)
+        start = time.perf_counter()
+        view()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return f"p50 {samples[len(samples) // 2]:.3f} ms, p99 {samples[int(len(samples) * 0.99)]:.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rooms', type=int, default=2000)
+    parser.add_argument('--views', type=int, default=2000)
+    parser.add_argument('--book-every', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repository.set_database_path(os.path.join(tmp, 'bench.db'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.create_database()
+            database.sign_up_client('Bench Guest', 'guest@example.com', '0123456789', 'secret123')
+        with repository.transaction() as cursor:
+            cursor.executemany(
+                'INSERT INTO rooms (room_type, price, bed_count, level, availability, category, description) '
+                'VALUES (?, ?, ?, ?, 1, ?, ?)',
+                [('Single', 50 + n % 200, 1 + n % 3, n % 10, 'Standard', f'Room {n}') for n in range(args.rooms)])
+
+        check_in, check_out = '2030-01-01', '2030-01-02'
+        room_ids = sorted(catalog.rooms())
+
+        def book(n):
+            reserve_stay(1, room_ids[n % len(room_ids)], check_in, check_out, check_in)
+
+        print(f"{args.views} room views over {len(room_ids)} rooms, a booking every {args.book_every} views\n")
+        print(f"SQL query:    {timed(sql_view, args.views, args.book_every, book)}")
+        catalog.hits = catalog.misses = 0
+        view = lambda: available_rooms(check_in, check_out)  # noqa: E731
+        print(f"Room catalog: {timed(view, args.views, args.book_every, lambda n: book(n + args.views))}")
+        print(f"Catalog stats: {catalog.stats()}")
+        repository.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
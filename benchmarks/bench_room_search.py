@@ -0,0 +1,76 @@
+"""Room search latency: filtered, sorted pages and facet counts over a large inventory.
+
+Every search is for a stay, so it also pays for working out which rooms are
+free (the in-memory night index) and excluding the others in SQL.
+
+Usage: python benchmarks/bench_room_search.py [--rooms N] [--bookings N] [--db PATH] [--runs N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (label, filters), from no filter to several at once
+SEARCHES = [
+    ('no filters', {}),
+    ('category', {'category': 'Luxury Room'}),
+    ('price band', {'min_price': 75, 'max_price': 125}),
+    ('2+ beds, level', {'min_beds': 2, 'level': 3}),
+    ('category, level, price', {'category': 'Standard Room', 'level': 1, 'min_price': 0, 'max_price': 75}),
+]
+
+
+def best_of(runs, function):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=40_000)
+    parser.add_argument('--bookings', type=int, default=400_000)
+    parser.add_argument('--db', help='existing database (default: a generated one with --rooms and --bookings)')
+    parser.add_argument('--runs', type=int, default=10, help='timed runs per search; the best is shown')
+    args = parser.parse_args()
+
+    import repository
+    from migrations import migrate
+    from room_search import SORTS, search_rooms
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.db
+        if path is None:
+            sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+            from generate_data import generate
+            path = os.path.join(tmp, 'bench.db')
+            print(f"Generating {args.rooms} rooms and {args.bookings} bookings...")
+            generate(path, clients=1000, rooms=args.rooms, bookings=args.bookings, rounds=4)
+        repository.set_database_path(path)
+        migrate()
+
+        check_in = date.today() + timedelta(days=30)
+        check_out = check_in + timedelta(days=3)
+        search_rooms(check_in, check_out)  # load the night index and catalog first
+        print(f"{'search':<24} {'sort':<11} {'matches':>7} {'page':>9} {'page+facets':>12}")
+        for label, filters in SEARCHES:
+            for sort in SORTS:
+                found = search_rooms(check_in, check_out, sort, facets=True, **filters)
+                categories = found.facets['category']
+                matches = categories.get(filters['category'], 0) if 'category' in filters else sum(categories.values())
+                page = best_of(args.runs, lambda: search_rooms(check_in, check_out, sort, **filters))
+                both = best_of(args.runs, lambda: search_rooms(check_in, check_out, sort, facets=True, **filters))
+                print(f"{label:<24} {sort:<11} {matches:>7} {page:>7.2f}ms {both:>10.2f}ms")
+        repository.close_connection()
+
+
+if __name__ == '__main__':
+    main()
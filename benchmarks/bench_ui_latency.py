@@ -0,0 +1,114 @@
+"""Qt event-loop latency while logins run, on the GUI thread versus the auth worker pool.
+
+A 10 ms QTimer measures how late each tick fires while --logins bcrypt
+logins run, first called directly in a slot (the old UserApp behaviour),
+then dispatched as AuthWorker tasks. Runs headless via the offscreen platform.
+
+Usage: python benchmarks/bench_ui_latency.py [--logins N] [--rounds N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QCoreApplication, QTimer  # noqa: E402
+
+import database  # noqa: E402
+import passwords  # noqa: E402
+import repository  # noqa: E402
+from auth_worker import AuthWorker, auth_pool, check_login  # noqa: E402
+
+TICK_MS = 10
+
+
+class LatencyProbe:
+    """Records how late a repeating timer fires relative to its interval."""
+
+    def __init__(self):
+        self.delays = []
+        self.timer = QTimer()
+        self.timer.setInterval(TICK_MS)
+        self.timer.timeout.connect(self.tick)
+        self.last = None
+
+    def start(self):
+        self.delays.clear()
+        self.last = time.perf_counter()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def tick(self):
+        now = time.perf_counter()
+        self.delays.append(max(0.0, (now - self.last) * 1000 - TICK_MS))
+        self.last = now
+
+    def summary(self):
+        delays = sorted(self.delays) or [0.0]
+        return (f"{len(delays):>4} ticks, p50 lateness {delays[len(delays) // 2]:7.1f} ms, "
+                f"p99 {delays[int(len(delays) * 0.99)]:7.1f} ms, max {delays[-1]:7.1f} ms")
+
+
+def run(app, probe, start_work, is_done):
+    probe.start()
+    QTimer.singleShot(50, start_work)
+    deadline = time.perf_counter() + 120
+    while not is_done() and time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+    # Keep ticking briefly so the tick delayed by a blocking slot gets recorded
+    settle = time.perf_counter() + 5 * TICK_MS / 1000
+    while time.perf_counter() < settle:
+        app.processEvents()
+        time.sleep(0.001)
+    probe.stop()
+    return probe.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logins', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=passwords.BCRYPT_ROUNDS, help='bcrypt cost factor')
+    args = parser.parse_args()
+    passwords.BCRYPT_ROUNDS = args.rounds
+
+    app = QCoreApplication(sys.argv)
+    probe = LatencyProbe()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repository.set_database_path(os.path.join(tmp, 'bench.db'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            database.create_database()
+            database.sign_up_client('Bench Guest', 'guest@example.com', '0123456789', 'secret123')
+
+        done = []
+
+        def on_gui_thread():
+            for _ in range(args.logins):
+                done.append(check_login('guest@example.com', 'secret123'))
+
+        print(f"{args.logins} logins at bcrypt cost {args.rounds}\n")
+        print(f"GUI thread:  {run(app, probe, on_gui_thread, lambda: len(done) == args.logins)}")
+
+        done.clear()
+
+        def on_worker_pool():
+            for _ in range(args.logins):
+                worker = AuthWorker(check_login, 'guest@example.com', 'secret123')
+                worker.signals.finished.connect(done.append)
+                auth_pool().start(worker)
+
+        print(f"Worker pool: {run(app, probe, on_worker_pool, lambda: len(done) == args.logins)}")
+        auth_pool().waitForDone()
+        repository.close_all_connections()
+
+
+if __name__ == '__main__':
+    main()
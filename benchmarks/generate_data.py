@@ -0,0 +1,202 @@
+"""Seeded generator for realistic hotel databases of any size.
+
+Builds a database with --clients clients, --rooms rooms and --bookings
+bookings spread over --years years (all but the last year in the past).
+Stays never overlap, so every booking also claims its nights in
+room_nights exactly as a real booking would. The same seed always produces
+the same database.
+
+Every generated client has the password GENERATED_PASSWORD. It is hashed
+once, at --rounds (default passwords.BCRYPT_ROUNDS), and shared, because
+bcrypt-hashing millions of passwords would take days.
+
+Usage: python benchmarks/generate_data.py PATH [--scale NAME] [--clients N] [--rooms N] [--bookings N]
+                                          [--years N] [--seed N] [--rounds N]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import availability  # noqa: E402
+import passwords  # noqa: E402
+import repository  # noqa: E402
+from migrations import migrate  # noqa: E402
+from room_catalog import catalog  # noqa: E402
+
+GENERATED_PASSWORD = 'Generated123'
+
+# Preset sizes, named by their number of bookings
+SCALES = {
+    '10k': {'clients': 2_000, 'rooms': 100, 'bookings': 10_000},
+    '1m': {'clients': 100_000, 'rooms': 5_000, 'bookings': 1_000_000},
+    '10m': {'clients': 1_000_000, 'rooms': 40_000, 'bookings': 10_000_000},
+}
+
+# (room_type, category, description, nightly price, beds), as in the seed rooms
+ROOM_TYPES = [
+    ('Standard', 'Standard Room', 'Basic room with 1 bed', 50, 1),
+    ('2-Bed', '2-Bed Room', 'Room with 2 beds', 70, 2),
+    ('Modern', 'Modern Room', 'Room with 2 beds, modern amenities', 110, 2),
+    ('Luxury', 'Luxury Room', 'Luxurious room with 2 beds and extra features', 150, 2),
+]
+ROOM_TYPE_WEIGHTS = [40, 30, 20, 10]
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+               'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+               'Amir', 'Mei', 'Carlos', 'Aisha', 'Hiroshi', 'Olga', 'Kwame', 'Priya', 'Lucas', 'Fatima']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+              'Martinez', 'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Taylor', 'Moore', 'Nguyen', 'Kim',
+              'Haddad', 'Okafor', 'Sato', 'Ivanova', 'Mensah', 'Patel', 'Silva', 'Khan']
+
+CHUNK_SIZE = 50_000
+
+
+def _chunked(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _clients(count, rng, hashed_password):
+    for client_id in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        # The client_id suffix keeps email and phone unique
+        yield (client_id, f'{first} {last}', f'{first}.{last}.{client_id}@example.com'.lower(),
+               f'555{client_id:07d}', hashed_password)
+
+
+def _rooms(count, rng):
+    for room_id in range(1, count + 1):
+        room_type, category, description, price, beds = rng.choices(ROOM_TYPES, ROOM_TYPE_WEIGHTS)[0]
+        level = 1 + (room_id - 1) // 50
+        yield (room_id, room_type, price, beds, level, 1, category, description)
+
+
+def _bookings(rooms, bookings, clients, start, days, today, rng):
+    """Yield (booking row, nights) with non-overlapping stays on every room.
+
+    Each room gets an equal share of the bookings and its horizon is cut
+    into that many slots; a stay of 1-7 nights is placed inside each slot.
+    """
+    booking_id = 0
+    for room_id in range(1, rooms + 1):
+        share = bookings // rooms + (1 if room_id <= bookings % rooms else 0)
+        if not share:
+            continue
+        slot = days // share
+        for n in range(share):
+            length = rng.randint(1, min(7, slot))
+            check_in = start + timedelta(days=n * slot + rng.randint(0, slot - length))
+            check_out = check_in + timedelta(days=length)
+            booking_date = max(start, check_in - timedelta(days=rng.randint(0, 90)))
+            if check_out <= today:
+                status, payment = 'Checked Out', 'Paid'
+            elif check_in <= today:
+                status, payment = 'Checked In', rng.choice(('Paid', 'Pending'))
+            else:
+                status, payment = 'Booked', 'Paid' if rng.random() < 0.3 else 'Pending'
+            booking_id += 1
+            row = (booking_id, rng.randint(1, clients), room_id, booking_date.isoformat(),
+                   check_in.isoformat(), check_out.isoformat(), status, payment)
+            nights = [(room_id, (check_in + timedelta(days=d)).isoformat(), booking_id) for d in range(length)]
+            yield row, nights
+
+
+def generate(path, clients, rooms, bookings, years=3, seed=42, rounds=None, progress=None):
+    """Build a fresh database at `path` and return its row counts.
+
+    The file must not exist yet. `progress`, if given, is called with a
+    short message after each table is written.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+    days = years * 365
+    if bookings > rooms * days:
+        raise ValueError(f"{bookings} bookings do not fit in {rooms} rooms over {days} nights")
+
+    rng = random.Random(seed)
+    today = date.today()
+    start = today - timedelta(days=days - 365)
+    report = progress or (lambda message: None)
+
+    repository.set_database_path(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        migrate()
+
+    hashed_password = passwords.hash_password(GENERATED_PASSWORD, rounds)
+    for chunk in _chunked(_clients(clients, rng, hashed_password)):
+        with repository.transaction() as cursor:
+            cursor.executemany('INSERT INTO clients (client_id, name, email, phone, password) VALUES (?, ?, ?, ?, ?)',
+                               chunk)
+    report(f"{clients} clients")
+
+    with repository.transaction() as cursor:
+        cursor.executemany('''
+            INSERT INTO rooms (room_id, room_type, price, bed_count, level, availability, category, description)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', list(_rooms(rooms, rng)))
+    report(f"{rooms} rooms")
+
+    night_count = 0
+    for chunk in _chunked(_bookings(rooms, bookings, clients, start, days, today, rng)):
+        with repository.transaction() as cursor:
+            cursor.executemany('''
+                INSERT INTO bookings (booking_id, client_id, room_id, booking_date, check_in, check_out, status, payment_status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [row for row, _ in chunk])
+            nights = [night for _, booking_nights in chunk for night in booking_nights]
+            cursor.executemany('INSERT INTO room_nights (room_id, night, booking_id) VALUES (?, ?, ?)', nights)
+        night_count += len(nights)
+        report(f"{chunk[-1][0][0]} bookings")
+
+    repository.get_connection().execute('ANALYZE')
+    availability.index.invalidate()
+    catalog.invalidate()
+    return {'clients': clients, 'rooms': rooms, 'bookings': bookings, 'room_nights': night_count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='database file to create (must not exist)')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='10k', help='preset sizes')
+    parser.add_argument('--clients', type=int)
+    parser.add_argument('--rooms', type=int)
+    parser.add_argument('--bookings', type=int)
+    parser.add_argument('--years', type=int, default=3, help='booking horizon; the last year is in the future')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--rounds', type=int, default=passwords.BCRYPT_ROUNDS, help='bcrypt cost of the shared hash')
+    args = parser.parse_args()
+
+    sizes = dict(SCALES[args.scale])
+    for name in sizes:
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+
+    started = time.perf_counter()
+
+    def progress(message):
+        print(f"{time.perf_counter() - started:8.1f}s  {message}")
+
+    try:
+        counts = generate(args.path, years=args.years, seed=args.seed, rounds=args.rounds, progress=progress,
+                          **sizes)
+    except (FileExistsError, ValueError) as e:
+        sys.exit(f"Error: {e}")
+    repository.close_all_connections()
+    print(f"Generated {counts} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
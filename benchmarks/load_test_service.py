@@ -0,0 +1,153 @@
+"""Load test for booking_service with hundreds of concurrent front desks on localhost.
+
+Starts the service in a separate process on a throwaway database, signs
+up --clients guests, then runs --desks simulated front desks at once. Each
+desk holds its own connection and loops through search, book and the
+occasional login or cancellation. Prints throughput and p50/p99 latency per
+operation and exits non-zero if any room night ended up double-booked.
+
+Usage: python benchmarks/load_test_service.py [--desks N] [--requests N] [--rooms N] [--rounds N]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'LoadTest123'
+
+
+class Desk:
+    """One simulated front desk: its own connection, one request at a time."""
+
+    def __init__(self, reader, writer, timings):
+        self.reader = reader
+        self.writer = writer
+        self.timings = timings
+        self.ids = itertools.count(1)
+
+    @classmethod
+    async def connect(cls, port, timings):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        return cls(reader, writer, timings)
+
+    async def call(self, op, **args):
+        started = time.perf_counter()
+        self.writer.write(json.dumps({'id': next(self.ids), 'op': op, 'args': args}).encode() + b'\n')
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        self.timings[op].append((time.perf_counter() - started) * 1000)
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+        return response['result']
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def run_desk(port, desk_id, requests, clients, rooms, timings, rng):
+    desk = await Desk.connect(port, timings)
+    booked = []
+    today = date.today()
+    for n in range(requests):
+        check_in = today + timedelta(days=rng.randrange(1, 60))
+        check_out = check_in + timedelta(days=rng.randint(1, 4))
+        roll = rng.random()
+        if roll < 0.05:
+            await desk.call('login', email=f'guest{rng.randrange(clients)}@example.com', password=PASSWORD)
+        elif roll < 0.10 and booked:
+            booking_id, client_id = booked.pop()
+            await desk.call('cancel_bookings', booking_ids=[booking_id], client_id=client_id)
+        elif roll < 0.55:
+            await desk.call('search_rooms', check_in=check_in.isoformat(), check_out=check_out.isoformat())
+        else:
+            client_id = rng.randint(1, clients)
+            result = await desk.call('book_room', client_id=client_id, room_id=rng.randint(1, rooms),
+                                     check_in=check_in.isoformat(), check_out=check_out.isoformat())
+            if result['status'] == 'booked':
+                booked.append((result['booking_id'], client_id))
+    await desk.close()
+
+
+def start_service(path, rounds):
+    env = dict(os.environ, HOTEL_DB_PATH=path, HOTEL_BCRYPT_ROUNDS=str(rounds))
+    # The desks book for any guest by client_id, as a trusted front desk would
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'booking_service.py'), '--port', '0',
+                                '--trust-client-ids'], cwd=ROOT, env=env, stdout=subprocess.PIPE, text=True)
+    for line in process.stdout:
+        if line.startswith('Booking service listening on'):
+            return process, int(line.rsplit(':', 1)[1])
+    raise RuntimeError('The booking service did not start.')
+
+
+def double_booked(path):
+    # room_nights' primary key forbids overlaps; also check the bookings table itself
+    conn = sqlite3.connect(path)
+    count = conn.execute('''
+        SELECT COUNT(*) FROM bookings a JOIN bookings b
+        ON a.room_id = b.room_id AND a.booking_id < b.booking_id
+        AND a.check_in < b.check_out AND b.check_in < a.check_out
+    ''').fetchone()[0]
+    conn.close()
+    return count
+
+
+async def load(port, args):
+    timings = defaultdict(list)
+    setup = await Desk.connect(port, defaultdict(list))
+    for n in range(args.clients):
+        await setup.call('sign_up', name=f'Guest {n}', email=f'guest{n}@example.com', phone=f'{n:010d}',
+                         password=PASSWORD)
+    await setup.close()
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    await asyncio.gather(*(run_desk(port, desk_id, args.requests, args.clients, args.rooms, timings,
+                                    random.Random(rng.random())) for desk_id in range(args.desks)))
+    return timings, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--desks', type=int, default=300, help='concurrent simulated front desks')
+    parser.add_argument('--requests', type=int, default=50, help='requests per desk')
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--rooms', type=int, default=16, help='rooms to book (the seed data has 16)')
+    parser.add_argument('--rounds', type=int, default=4, help='bcrypt cost factor for the service')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'service.db')
+        process, port = start_service(path, args.rounds)
+        try:
+            timings, elapsed = asyncio.run(load(port, args))
+        finally:
+            process.terminate()
+            process.wait()
+
+        total = sum(len(samples) for samples in timings.values())
+        print(f"{args.desks} desks, {total} requests in {elapsed:.1f}s: {total / elapsed:.0f} requests/s\n")
+        for op, samples in sorted(timings.items()):
+            samples.sort()
+            print(f"  {op:<16} {len(samples):>6}  p50 {samples[len(samples) // 2]:8.2f} ms  "
+                  f"p99 {samples[int(len(samples) * 0.99)]:8.2f} ms")
+
+        overlaps = double_booked(path)
+        print(f"\nDouble bookings: {overlaps}")
+        if overlaps:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
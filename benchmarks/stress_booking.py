@@ -0,0 +1,135 @@
+"""Concurrent booking stress test: bookings per second and a double-booking check.
+
+Many threads, then many processes, race to book random stays on a small set
+of rooms through availability.reserve_stay(). Afterwards the bookings table
+is checked for overlapping stays on the same room and the script exits
+non-zero if any are found.
+
+Usage: python benchmarks/stress_booking.py [--threads N] [--processes N] [--attempts N]
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import availability  # noqa: E402
+import database  # noqa: E402
+import repository  # noqa: E402
+
+
+def book_randomly(path, worker_id, attempts, rooms, days, seed):
+    """Try `attempts` random stays and return (booked, conflicts)."""
+    repository.set_database_path(path)
+    rng = random.Random(seed * 1000 + worker_id)
+    start = date.today()
+    booked = conflicts = 0
+    for _ in range(attempts):
+        check_in = start + timedelta(days=rng.randrange(days))
+        check_out = check_in + timedelta(days=rng.randint(1, 4))
+        result = availability.reserve_stay(worker_id, rng.randint(1, rooms), check_in, check_out,
+                                           start.isoformat())
+        if result.status == availability.BOOKED:
+            booked += 1
+        else:
+            conflicts += 1
+    repository.close_connection()
+    return booked, conflicts
+
+
+def _process_worker(args):
+    return book_randomly(*args)
+
+
+def reset(path):
+    repository.close_all_connections()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    repository.set_database_path(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        database.create_database()
+
+
+def count_double_bookings():
+    cursor = repository.get_connection().cursor()
+    cursor.execute('''
+        SELECT COUNT(*)
+        FROM bookings a
+        JOIN bookings b ON a.room_id = b.room_id AND a.booking_id < b.booking_id
+        WHERE a.check_in < b.check_out AND b.check_in < a.check_out
+    ''')
+    overlaps = cursor.fetchone()[0]
+
+    # Every booking must own exactly its own nights
+    cursor.execute('''
+        SELECT COUNT(*) FROM bookings b
+        WHERE julianday(b.check_out) - julianday(b.check_in)
+              != (SELECT COUNT(*) FROM room_nights n WHERE n.booking_id = b.booking_id)
+    ''')
+    return overlaps + cursor.fetchone()[0]
+
+
+def report(label, results, elapsed):
+    booked = sum(r[0] for r in results)
+    conflicts = sum(r[1] for r in results)
+    doubles = count_double_bookings()
+    print(f"{label:<22} {booked:>6} booked {conflicts:>6} conflicts "
+          f"{(booked + conflicts) / elapsed:>9,.0f} attempts/s {booked / elapsed:>8,.0f} bookings/s "
+          f"double bookings: {doubles}")
+    return doubles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--attempts', type=int, default=200, help='booking attempts per worker')
+    parser.add_argument('--days', type=int, default=90, help='horizon the stays are drawn from')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'stress.db')
+        reset(path)
+        rooms = repository.get_connection().execute('SELECT COUNT(*) FROM rooms').fetchone()[0]
+
+        results = []
+        lock = threading.Lock()
+
+        def thread_worker(worker_id):
+            outcome = book_randomly(path, worker_id, args.attempts, rooms, args.days, args.seed)
+            with lock:
+                results.append(outcome)
+
+        threads = [threading.Thread(target=thread_worker, args=(n + 1,)) for n in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        failures += report(f"{args.threads} threads", results, time.perf_counter() - started)
+
+        reset(path)
+        jobs = [(path, n + 1, args.attempts, rooms, args.days, args.seed) for n in range(args.processes)]
+        with multiprocessing.Pool(args.processes) as pool:
+            started = time.perf_counter()
+            results = pool.map(_process_worker, jobs)
+            elapsed = time.perf_counter() - started
+        failures += report(f"{args.processes} processes", results, elapsed)
+        repository.close_all_connections()
+
+    assert failures == 0, f"{failures} double bookings detected"
+
+
+if __name__ == '__main__':
+    main()
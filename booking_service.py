@@ -0,0 +1,415 @@
+"""Headless booking service, so many front desks share one database process.
+
+Front desks connect to a local TCP socket and send one JSON object per line:
+
+    -> {"id": 1, "op": "book_room", "args": {"client_id": 3, "room_id": 7, "check_in": "2030-01-01", "check_out": "2030-01-03"}}
+    <- {"id": 1, "ok": true, "result": {"status": "booked", "booking_id": 812, "room_id": 7}}
+    <- {"id": 2, "ok": false, "error": "Unknown operation: book"}
+
+Requests on one connection may be pipelined; every response carries the id
+of its request and they may come back out of order.
+
+Every write (sign-ups, password upgrades, bookings, cancellations) goes
+through one BookingWriter, which group-commits whatever arrives together.
+Reads and bcrypt work run on a small thread pool, one connection per thread.
+
+login returns a session token; book_room, view_bookings and cancel_bookings
+take it in place of client_id, so bcrypt runs once per login rather than per
+request. A bare client_id is refused: anyone could send someone else's.
+Only with --trust-client-ids, for desks that vouch for their guests
+themselves (and the load test), is it taken as given.
+
+cancel_bookings only cancels the caller's own bookings. Cancelling anyone's
+(the admin app in client mode) takes the admin key instead: the service
+accepts it when HOTEL_ADMIN_KEY is set in its environment, and
+service_client.py sends it from the same variable.
+
+The metrics op returns the latency histograms, busy counters and slow
+queries of the service (see metrics.py) as JSON or Prometheus text.
+
+With --maintenance-every SECONDS the service also runs archive.run_maintenance()
+(archival of old bookings, space reclaim, statistics refresh) on that schedule,
+and with --snapshot-every SECONDS it takes reporting snapshots (snapshots.py),
+which double as hot backups.
+
+    python booking_service.py [--host HOST] [--port PORT] [--readers N] [--persist-sessions] [--trust-client-ids]
+                              [--maintenance-every SECONDS] [--snapshot-every SECONDS]
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import sqlite3
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+from archive import format_report, run_maintenance
+from availability import INVALID_DATES, BookingResult
+from booking_writer import BookingWriter
+from database import create_database
+from listings import PAGE_SIZE, bookings_page
+from passwords import hash_password, needs_rehash, verify_password
+from pricing import quote_rooms, quote_stay
+from properties import select_property
+from repository import get_connection
+from room_catalog import CATALOG_COLUMNS, available_rooms
+from room_search import SORTS, search_rooms
+from sessions import SessionStore
+from snapshots import prune_snapshots, take_snapshot
+from validation import MAX_ROW_ID, client_input_error, is_row_id
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+READ_WORKERS = 4
+MAX_LINE = 64 * 1024  # longest request line accepted, in bytes
+MAX_PAGE = 500  # most rows one room_search or view_bookings page returns
+MAX_CANCEL_IDS = 1000  # most booking IDs one cancel_bookings request may name
+
+# Key that lets cancel_bookings cancel any client's bookings; unset, nobody can
+ADMIN_KEY = os.environ.get('HOTEL_ADMIN_KEY') or None
+
+
+class RequestError(Exception):
+    """A request that cannot be served; its message is sent back to the client."""
+
+
+def _check_stay(check_in, check_out):
+    # Both dates or neither (tonight): with one alone the other would be ignored and tonight searched instead
+    if (check_in is None) != (check_out is None):
+        raise RequestError('Give both check_in and check_out, or neither.')
+    if check_in is not None and not (isinstance(check_in, str) and isinstance(check_out, str)):
+        raise RequestError('check_in and check_out must be YYYY-MM-DD strings.')
+
+
+def _page_limit(limit):
+    # Page sizes go straight into LIMIT; keep them between 1 and MAX_PAGE
+    if not isinstance(limit, int) or isinstance(limit, bool):
+        raise RequestError('limit must be an integer.')
+    return max(1, min(limit, MAX_PAGE))
+
+
+class BookingService:
+    """asyncio server that answers JSON requests with one writer and a pool of readers."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, read_workers=READ_WORKERS, sessions=None,
+                 trust_client_ids=False, admin_key=ADMIN_KEY):
+        self.host = host
+        self.port = port
+        self.read_workers = read_workers
+        self.sessions = sessions or SessionStore()
+        self.trust_client_ids = trust_client_ids
+        self.admin_key = admin_key
+        self.requests = 0
+        self._writer = None
+        self._reads = None
+        self._server = None
+        self._operations = {
+            'ping': self.ping,
+            'sign_up': self.sign_up,
+            'login': self.login,
+            'logout': self.logout,
+            'search_rooms': self.search_rooms,
+            'room_search': self.room_search,
+            'quote_rooms': self.quote_rooms,
+            'book_room': self.book_room,
+            'cancel_bookings': self.cancel_bookings,
+            'view_bookings': self.view_bookings,
+            'metrics': self.dump_metrics,
+        }
+
+    async def start(self):
+        self._writer = BookingWriter().start()
+        self._reads = ThreadPoolExecutor(self.read_workers, thread_name_prefix='service-read')
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port, limit=MAX_LINE)
+        # With port 0 the system picks a free port; report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._reads is not None:
+            self._reads.shutdown()
+        if self._writer is not None:
+            self._writer.stop()
+
+    async def _read(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._reads, function, *args)
+
+    async def _client(self, client_id, token):
+        # The client a request acts for: from its session token, or a bare client_id only if client IDs are trusted
+        if token is not None:
+            if not isinstance(token, str):
+                raise RequestError('token must be a string.')
+            # Persistent stores may have to read the database on a miss; keep that off the event loop
+            if self.sessions.persistent:
+                client_id = await self._read(self.sessions.client_id, token)
+            else:
+                client_id = self.sessions.client_id(token)
+            if client_id is None:
+                raise RequestError('Session expired or invalid; log in again.')
+        elif not self.trust_client_ids:
+            raise RequestError('Log in first: this service requires a session token.')
+        elif not is_row_id(client_id):
+            raise RequestError('A session token or a positive integer client_id is required.')
+        return client_id
+
+    async def _handle_client(self, reader, writer):
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    break  # a line longer than MAX_LINE; drop the client
+                if not line:
+                    break
+                task = asyncio.create_task(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, line, writer):
+        request_id = None
+        operation = 'invalid'
+        started = time.perf_counter()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError('Request must be a JSON object.')
+            request_id = request.get('id')
+            if request.get('op') in self._operations:
+                operation = request['op']
+            response = {'id': request_id, 'ok': True, 'result': await self.dispatch(request)}
+        except RequestError as e:
+            response = {'id': request_id, 'ok': False, 'error': str(e)}
+        except json.JSONDecodeError:
+            response = {'id': None, 'ok': False, 'error': 'Malformed JSON.'}
+        except sqlite3.Error as e:
+            response = {'id': request_id, 'ok': False, 'error': f'Database Error: {e}'}
+        except (TypeError, ValueError) as e:
+            response = {'id': request_id, 'ok': False, 'error': f'Bad request: {e}'}
+        except Exception:
+            # A bug in one operation must still get its request a reply, or the client waits for its timeout
+            print(f"Request {operation} failed:", flush=True)
+            traceback.print_exc()
+            response = {'id': request_id, 'ok': False, 'error': 'internal error'}
+        self.requests += 1
+        metrics.observe('hotel_operation_seconds', f'service.{operation}', time.perf_counter() - started)
+        if not response['ok']:
+            metrics.count('hotel_operation_errors_total', f'service.{operation}')
+        writer.write(json.dumps(response).encode('utf-8') + b'\n')
+        await writer.drain()
+
+    async def dispatch(self, request):
+        """Run one request and return its JSON-serialisable result."""
+        operation = self._operations.get(request.get('op'))
+        if operation is None:
+            raise RequestError(f"Unknown operation: {request.get('op')}")
+        args = request.get('args') or {}
+        if not isinstance(args, dict):
+            raise RequestError('args must be a JSON object.')
+        try:
+            coroutine = operation(**args)
+        except TypeError as e:
+            raise RequestError(f'Bad arguments for {request["op"]}: {e}')
+        return await coroutine
+
+    async def ping(self):
+        return 'pong'
+
+    async def sign_up(self, name, email, phone, password):
+        if not all(isinstance(value, str) for value in (name, email, phone, password)):
+            raise RequestError('All fields must be strings.')
+        error = client_input_error(name, email, phone, password)
+        if error:
+            raise RequestError(error)
+        hashed_password = await self._read(hash_password, password)
+        try:
+            client_id = await asyncio.wrap_future(self._writer.sign_up(name, email, phone, hashed_password))
+        except sqlite3.IntegrityError:
+            client_id = None  # email or phone already registered
+        return {'client_id': client_id}
+
+    async def login(self, email, password):
+        if not isinstance(email, str) or not isinstance(password, str):
+            raise RequestError('Email and password must be strings.')
+
+        def check():
+            cursor = get_connection().cursor()
+            cursor.execute('SELECT client_id, name, password FROM clients WHERE email = ?', (email,))
+            client = cursor.fetchone()
+            if not client or not verify_password(password, client[2]):
+                return None, None
+            # Re-hash weak hashes here, while the plain password is at hand; the writer stores it
+            new_hash = hash_password(password) if needs_rehash(client[2]) else None
+            return client, new_hash
+
+        client, new_hash = await self._read(check)
+        if client is None:
+            return None  # wrong email or password
+        if new_hash is not None:
+            self._writer.update_password(client[0], new_hash, client[2])
+        token = await self._read(self.sessions.issue, client[0])
+        return {'client_id': client[0], 'name': client[1], 'token': token}
+
+    async def logout(self, token):
+        if not isinstance(token, str):
+            raise RequestError('token must be a string.')
+        await self._read(self.sessions.revoke, token)
+        return True
+
+    async def search_rooms(self, check_in=None, check_out=None):
+        _check_stay(check_in, check_out)
+        try:
+            rooms = await self._read(available_rooms, check_in, check_out)
+        except ValueError as e:
+            raise RequestError(f'Invalid dates: {e}')
+        return [dict(zip(CATALOG_COLUMNS, room)) for room in rooms]
+
+    async def room_search(self, check_in=None, check_out=None, sort='price', after=None, limit=PAGE_SIZE,
+                          facets=False, **filters):
+        """A page of room_search.search_rooms; facets come back as [value, rooms] pairs per facet."""
+        if sort not in SORTS:
+            raise RequestError(f"Unknown sort: {sort}")
+        _check_stay(check_in, check_out)
+        limit = _page_limit(limit)
+        try:
+            found = await self._read(lambda: search_rooms(check_in, check_out, sort, after, limit, facets, **filters))
+        except ValueError as e:
+            raise RequestError(f'Invalid dates: {e}')
+        counts = found.facets and {name: list(values.items()) for name, values in found.facets.items()}
+        return {'rows': found.rows, 'after': found.after, 'facets': counts}
+
+    async def quote_rooms(self, room_ids, check_in=None, check_out=None):
+        """[room_id, price of the stay] pairs for the rooms that are open for sale."""
+        _check_stay(check_in, check_out)
+        try:
+            prices = await self._read(quote_rooms, room_ids, check_in, check_out)
+        except ValueError as e:
+            raise RequestError(f'Invalid dates: {e}')
+        return list(prices.items())
+
+    async def book_room(self, room_id, client_id=None, check_in=None, check_out=None, token=None):
+        if not is_row_id(room_id):
+            raise RequestError('room_id must be a positive integer.')
+        _check_stay(check_in, check_out)
+        client_id = await self._client(client_id, token)
+        try:
+            # Priced on a reader thread, so the quote never holds up the event loop
+            amount = await self._read(quote_stay, room_id, check_in, check_out)
+            future = self._writer.book_room(client_id, room_id, check_in, check_out, amount=amount)
+        except ValueError:
+            return BookingResult(INVALID_DATES, None, room_id)._asdict()
+        return (await asyncio.wrap_future(future))._asdict()
+
+    async def cancel_bookings(self, booking_ids, client_id=None, token=None, admin_key=None):
+        """Freed room_id (or None) per booking ID; submitted together, so they share a commit.
+
+        A client may cancel only its own bookings (None for anyone else's); the admin key cancels any.
+        """
+        if admin_key is not None:
+            if not isinstance(admin_key, str) or self.admin_key is None \
+                    or not hmac.compare_digest(admin_key.encode('utf-8'), self.admin_key.encode('utf-8')):
+                raise RequestError('Invalid admin key.')
+            owner = None
+        else:
+            owner = await self._client(client_id, token)
+        if not isinstance(booking_ids, list):
+            raise RequestError('booking_ids must be a list.')
+        # Checked here, so one bad request never reaches the writer batch it would share with other desks
+        if len(booking_ids) > MAX_CANCEL_IDS:
+            raise RequestError(f'At most {MAX_CANCEL_IDS} booking IDs per request.')
+        if not all(is_row_id(booking_id) for booking_id in booking_ids):
+            raise RequestError(f'Booking IDs must be integers from 1 to {MAX_ROW_ID}.')
+        futures = [asyncio.wrap_future(self._writer.reset_booking(booking_id, client_id=owner))
+                   for booking_id in booking_ids]
+        return await asyncio.gather(*futures)
+
+    async def view_bookings(self, client_id=None, after=None, limit=PAGE_SIZE, token=None):
+        limit = _page_limit(limit)
+        client_id = await self._client(client_id, token)
+        page = await self._read(lambda: bookings_page(after, limit, client_id=client_id))
+        return {'rows': page.rows, 'after': page.after}
+
+    async def dump_metrics(self, format='json'):
+        """Every metric of this process, as a dict or as Prometheus text (format='prometheus')."""
+        return metrics.to_prometheus() if format == 'prometheus' else metrics.snapshot()
+
+
+async def maintain(every):
+    """Run archive.run_maintenance() every `every` seconds on a thread of its own, so requests keep flowing."""
+    while True:
+        await asyncio.sleep(every)
+        try:
+            print(format_report(await asyncio.to_thread(run_maintenance)), flush=True)
+        except sqlite3.Error as e:
+            print(f"Maintenance failed: {e}", flush=True)
+
+
+async def snapshot(every):
+    """Take a reporting snapshot every `every` seconds; the backup copies pages on a thread of its own."""
+    def take():
+        taken = take_snapshot()
+        prune_snapshots()
+        return taken
+
+    while True:
+        await asyncio.sleep(every)
+        try:
+            print(f"Snapshot {(await asyncio.to_thread(take)).path}", flush=True)
+        except (sqlite3.Error, OSError) as e:
+            print(f"Snapshot failed: {e}", flush=True)
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, read_workers=READ_WORKERS, sessions=None,
+                trust_client_ids=False, maintenance_every=None, snapshot_every=None):
+    service = await BookingService(host, port, read_workers, sessions, trust_client_ids).start()
+    print(f"Booking service listening on {service.host}:{service.port}", flush=True)
+    schedules = [asyncio.create_task(job(every))
+                 for job, every in ((maintain, maintenance_every), (snapshot, snapshot_every)) if every]
+    try:
+        await service.serve_forever()
+    finally:
+        for task in schedules:
+            task.cancel()
+        await service.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the headless booking service.')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--readers', type=int, default=READ_WORKERS, help='read connection pool size')
+    parser.add_argument('--persist-sessions', action='store_true', help='keep sessions in the database across restarts')
+    parser.add_argument('--trust-client-ids', action='store_true',
+                        help='accept a bare client_id in place of a session token')
+    parser.add_argument('--property', help='serve this property from the registry (see properties.py)')
+    parser.add_argument('--maintenance-every', type=float, metavar='SECONDS',
+                        help='archive old bookings and reclaim space on this schedule')
+    parser.add_argument('--snapshot-every', type=float, metavar='SECONDS',
+                        help='take a reporting snapshot (hot backup) on this schedule')
+    args = parser.parse_args()
+    if args.property:
+        select_property(args.property)
+    create_database()
+    try:
+        asyncio.run(serve(args.host, args.port, args.readers, SessionStore(persistent=args.persist_sessions),
+                          args.trust_client_ids, args.maintenance_every, args.snapshot_every))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,237 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+import availability
+from availability import BOOKED, BookingResult
+from pricing import quote_stay
+from repository import close_connection, is_busy_error, run_with_retry, transaction
+from validation import MAX_ROW_ID, is_row_id
+
+
+# Defaults for how much work one transaction may gather
+MAX_BATCH_SIZE = 128
+MAX_BATCH_WAIT = 0.005  # seconds to wait for more work after the first operation arrives
+
+_STOP = object()
+
+
+def _check_ids(**ids):
+    # Refuse a bad ID in the caller's thread: binding it would fail inside a batch shared with other callers
+    for name, value in ids.items():
+        if not is_row_id(value):
+            raise ValueError(f"{name} must be an integer from 1 to {MAX_ROW_ID}, not {value!r}")
+
+
+class _Operation:
+    def __init__(self, kind, args, callback):
+        self.kind = kind
+        self.args = args
+        self.future = Future()
+        if callback is not None:
+            # The callback receives the operation's result, or the exception it failed with
+            self.future.add_done_callback(lambda future: callback(future.exception() or future.result()))
+
+
+class BookingWriter:
+    """Serve write requests (bookings, resets, sign-ups) from a queue with one writer thread.
+
+    Operations that arrive close together are committed in a single
+    transaction (group commit), so a burst of bookings pays for one commit
+    instead of one each. Every operation runs inside its own savepoint, so a
+    failing one does not undo the rest of the batch. Callers get a Future,
+    and optionally a callback, with their own result: a BookingResult for
+    bookings, the freed room_id (or None) for resets, the new client_id for
+    sign-ups.
+    """
+
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_batch_wait=MAX_BATCH_WAIT):
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait = max_batch_wait
+        self.commits = 0
+        self.operations = 0
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='booking-writer', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Finish the queued work, then stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def book_room(self, client_id, room_id, check_in=None, check_out=None, booking_date=None, callback=None,
+                  amount=None):
+        """Queue a booking; the Future resolves to a BookingResult.
+
+        The stay is priced here, in the caller's thread, unless `amount` is given.
+        """
+        _check_ids(client_id=client_id, room_id=room_id)
+        if check_in is None or check_out is None:
+            check_in, check_out = availability.default_stay()
+        availability.stay_nights(check_in, check_out)  # reject bad dates in the caller's thread
+        if booking_date is None:
+            booking_date = datetime.now().strftime('%Y-%m-%d')
+        if amount is None:
+            amount = quote_stay(room_id, check_in, check_out)
+        return self._submit('book', (client_id, room_id, check_in, check_out, booking_date, amount), callback)
+
+    def reset_booking(self, booking_id, callback=None, client_id=None):
+        """Queue a cancellation; the Future resolves to the freed room_id, or None if not found.
+
+        With client_id only that client's booking is cancelled; anyone else's counts as not found.
+        """
+        _check_ids(booking_id=booking_id)
+        if client_id is not None:
+            _check_ids(client_id=client_id)
+        return self._submit('reset', (booking_id, client_id), callback)
+
+    def sign_up(self, name, email, phone, hashed_password, callback=None):
+        """Queue a new client; the Future resolves to its client_id, or fails with IntegrityError if taken."""
+        return self._submit('sign_up', (name, email, phone, hashed_password), callback)
+
+    def update_password(self, client_id, hashed_password, old_hashed_password, callback=None):
+        """Queue a password re-hash; resolves to True unless the stored hash changed in the meantime."""
+        _check_ids(client_id=client_id)
+        return self._submit('password', (client_id, hashed_password, old_hashed_password), callback)
+
+    def _submit(self, kind, args, callback):
+        if self._thread is None:
+            raise RuntimeError("BookingWriter is not running; call start() first.")
+        operation = _Operation(kind, args, callback)
+        self._queue.put(operation)
+        return operation.future
+
+    def _run(self):
+        try:
+            while True:
+                batch, stopping = self._next_batch()
+                if batch:
+                    self._commit(batch)
+                if stopping:
+                    return
+        finally:
+            close_connection()
+
+    def _next_batch(self):
+        # Block for the first operation, then gather more until the batch is full or the wait runs out
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_batch_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                operation = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if operation is _STOP:
+                return batch, True
+            batch.append(operation)
+        return batch, False
+
+    def _commit(self, batch):
+        def attempt():
+            results, changes = [], []
+            with transaction(immediate=True) as cursor:
+                before = availability.inventory_version(cursor)
+                for operation in batch:
+                    cursor.execute('SAVEPOINT booking_op')
+                    try:
+                        result, change = self._apply(cursor, operation)
+                    except Exception as e:
+                        if isinstance(e, sqlite3.Error) and is_busy_error(e):
+                            raise  # a locked database aborts the whole batch so run_with_retry can redo it
+                        # Anything else fails this operation only; the rest of the batch still commits
+                        cursor.execute('ROLLBACK TO booking_op')
+                        result, change = e, None
+                    cursor.execute('RELEASE booking_op')
+                    results.append(result)
+                    if change is not None:
+                        changes.append(change)
+                after = availability.inventory_version(cursor)
+            return results, changes, before, after
+
+        try:
+            results, changes, before, after = run_with_retry(attempt)
+        except Exception as e:
+            for operation in batch:
+                operation.future.set_exception(e)
+            return
+
+        self.commits += 1
+        self.operations += len(batch)
+        availability.index.note_writes(before, after, changes)
+        for operation, result in zip(batch, results):
+            if isinstance(result, Exception):
+                operation.future.set_exception(result)
+            else:
+                operation.future.set_result(result)
+
+    def _apply(self, cursor, operation):
+        # Returns (result for the caller, index change or None)
+        if operation.kind == 'book':
+            client_id, room_id, check_in, check_out, booking_date, amount = operation.args
+            booking_id = availability.claim_stay(cursor, client_id, room_id, check_in, check_out, booking_date,
+                                                 amount=amount)
+            if booking_id is None:
+                return BookingResult(availability.conflict_reason(room_id), None, room_id), None
+            return BookingResult(BOOKED, booking_id, room_id, amount), (room_id, check_in, check_out, True)
+
+        if operation.kind == 'sign_up':
+            cursor.execute('INSERT INTO clients (name, email, phone, password) VALUES (?, ?, ?, ?)', operation.args)
+            return cursor.lastrowid, None
+
+        if operation.kind == 'password':
+            client_id, hashed_password, old_hashed_password = operation.args
+            cursor.execute('UPDATE clients SET password = ? WHERE client_id = ? AND password = ?',
+                           (hashed_password, client_id, old_hashed_password))
+            return cursor.rowcount == 1, None
+
+        booking = availability.release_stay(cursor, *operation.args)
+        if booking is None:
+            return None, None
+        room_id, check_in, check_out = booking
+        return room_id, (room_id, check_in, check_out, False)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def start_writer(max_batch_size=MAX_BATCH_SIZE, max_batch_wait=MAX_BATCH_WAIT):
+    """Start the process-wide booking writer (if not running) and return it."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BookingWriter(max_batch_size, max_batch_wait).start()
+        return _writer
+
+
+def get_writer():
+    """The process-wide booking writer, or None when the queue is not in use."""
+    return _writer
+
+
+def stop_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
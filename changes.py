@@ -0,0 +1,72 @@
+"""Incremental change feed over the change_log table, for live views.
+
+Triggers (migration 8) append (seq, table_name, row_id, action) to
+change_log for every insert, update or delete of a booking, room or client,
+whichever code path or process makes the write. A ChangeFeed remembers the
+last sequence number it has handed out and returns only the rows touched
+since, so a view can re-read and patch just those rows.
+
+Polling is cheap when nothing happened: PRAGMA data_version (which moves
+only when another connection commits) and the connection's own
+total_changes are compared with the previous poll before change_log is
+read at all.
+"""
+from collections import namedtuple
+
+from repository import get_connection
+
+
+# More entries than this since the last poll and reloading the view is cheaper than patching it
+MAX_CHANGES = 5000
+
+# `rows` is {table name: set of row ids}; `reload` is True when the feed fell behind (pruned log or
+# too many changes) and the whole view should be re-read instead
+Changes = namedtuple('Changes', ['rows', 'reload'])
+
+
+def latest_seq(cursor=None):
+    cursor = cursor or get_connection().cursor()
+    cursor.execute('SELECT IFNULL(MAX(seq), 0) FROM change_log')
+    return cursor.fetchone()[0]
+
+
+class ChangeFeed:
+    """Hands out the rows written since the previous poll. Use from one thread."""
+
+    def __init__(self):
+        self.last_seq = None
+        self._seen = None
+
+    def catch_up(self):
+        """Skip everything logged so far; call just before (re)loading a view from scratch."""
+        self.last_seq = latest_seq()
+        self._seen = None
+
+    def poll(self):
+        """Changes since the last poll or catch_up(), or None when nothing was written."""
+        conn = get_connection()
+        seen = (id(conn), conn.execute('PRAGMA data_version').fetchone()[0], conn.total_changes)
+        if seen == self._seen:
+            return None
+        self._seen = seen
+        if self.last_seq is None:
+            self.catch_up()
+            return None
+
+        cursor = conn.cursor()
+        cursor.execute('SELECT seq, table_name, row_id FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?',
+                       (self.last_seq, MAX_CHANGES + 1))
+        entries = cursor.fetchall()
+        if not entries:
+            return None
+        # Sequence numbers have no gaps (AUTOINCREMENT, assigned under the write lock), so a jump means
+        # the entries we needed were pruned
+        if len(entries) > MAX_CHANGES or entries[0][0] != self.last_seq + 1:
+            self.last_seq = latest_seq(cursor)
+            return Changes({}, True)
+
+        rows = {}
+        for seq, table_name, row_id in entries:
+            rows.setdefault(table_name, set()).add(row_id)
+        self.last_seq = entries[-1][0]
+        return Changes(rows, False)
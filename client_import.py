@@ -0,0 +1,219 @@
+"""Bulk import of clients from CSV or JSONL.
+
+Rows are streamed from the file, checked with the sign-up rules, hashed
+with bcrypt across all cores (ProcessPoolExecutor) and inserted in large
+batches, one transaction per batch. While one batch is being inserted the
+next one is already hashing. Rows that fail validation, or whose email or
+phone is already registered (in the database or earlier in the file), are
+written to an error file with the reason; passwords are never written out.
+
+Input columns (CSV header or JSON keys): name, email, phone, password.
+
+    python client_import.py guests.csv [--errors rejects.csv] [--batch-size N] [--workers N]
+    python client_import.py guests.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+
+import passwords
+from repository import get_connection, transaction
+from validation import client_input_error
+
+
+FIELDS = ['name', 'email', 'phone', 'password']
+BATCH_SIZE = 2000
+
+ImportResult = namedtuple('ImportResult', ['read', 'imported', 'rejected', 'seconds'])
+
+
+def read_clients(path, file_format=None):
+    """Yield (line number, row dict or None, problem) for every record in a CSV or JSONL file."""
+    file_format = file_format or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row, None
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, None, f'Invalid JSON: {e.msg}'
+                    continue
+                if isinstance(row, dict):
+                    yield line_number, row, None
+                else:
+                    yield line_number, None, 'Each line must be a JSON object.'
+
+
+def _clean(row):
+    return tuple(str(row.get(field) or '').strip() for field in FIELDS)
+
+
+class _Rejects:
+    """Writes rejected rows to the error file, opened only when the first reject arrives."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def add(self, line_number, row, reason):
+        if self._writer is None and self.path:
+            self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(['line', 'name', 'email', 'phone', 'reason'])
+        if self._writer is not None:
+            name, email, phone = row[:3] if row else ('', '', '')
+            self._writer.writerow([line_number, name, email, phone, reason])
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _registered(cursor, column, values):
+    # Which of `values` already exist in clients.<column>; chunked under SQLite's parameter limit
+    found = set()
+    values = list(values)
+    for start in range(0, len(values), 500):
+        chunk = values[start:start + 500]
+        cursor.execute(f"SELECT {column} FROM clients WHERE {column} IN ({','.join('?' * len(chunk))})", chunk)
+        found.update(row[0] for row in cursor.fetchall())
+    return found
+
+
+def _screen(records, cursor, seen_emails, seen_phones, rejects):
+    """Validate one batch of records and drop duplicates, before any bcrypt work is spent on them."""
+    candidates = []
+    for line_number, row, problem in records:
+        values = _clean(row) if row is not None else None
+        reason = problem or client_input_error(*values)
+        if reason:
+            rejects.add(line_number, values, reason)
+        else:
+            candidates.append((line_number, values))
+
+    emails = _registered(cursor, 'email', {values[1] for _, values in candidates})
+    phones = _registered(cursor, 'phone', {values[2] for _, values in candidates})
+    accepted = []
+    for line_number, values in candidates:
+        name, email, phone, password = values
+        if email in emails or email in seen_emails:
+            rejects.add(line_number, values, 'Email is already registered.')
+        elif phone in phones or phone in seen_phones:
+            rejects.add(line_number, values, 'Phone is already registered.')
+        else:
+            seen_emails.add(email)
+            seen_phones.add(phone)
+            accepted.append((line_number, values))
+    return accepted
+
+
+def _insert(accepted, hashes, rejects):
+    # Conflicts can still come from another writer since screening; those rows are rejected, not fatal
+    imported = 0
+    hashes = list(hashes)  # wait for bcrypt before taking the write lock, not while holding it
+    with transaction(immediate=True) as cursor:
+        for (line_number, (name, email, phone, _)), hashed_password in zip(accepted, hashes):
+            cursor.execute('''
+                INSERT INTO clients (name, email, phone, password) VALUES (?, ?, ?, ?) ON CONFLICT DO NOTHING
+            ''', (name, email, phone, hashed_password))
+            if cursor.rowcount == 1:
+                imported += 1
+            else:
+                rejects.add(line_number, (name, email, phone), 'Email or phone is already registered.')
+    return imported
+
+
+def import_clients(path, errors_path=None, file_format=None, batch_size=BATCH_SIZE, workers=None, rounds=None,
+                   progress=None):
+    """Import clients from a CSV/JSONL file and return an ImportResult.
+
+    `progress`, if given, is called with the running ImportResult after
+    every batch.
+    """
+    rounds = rounds or passwords.BCRYPT_ROUNDS
+    records = read_clients(path, file_format)
+    rejects = _Rejects(errors_path)
+    seen_emails, seen_phones = set(), set()
+    read = imported = 0
+    started = time.perf_counter()
+
+    def screened_batches(cursor):
+        nonlocal read
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return
+            read += len(batch)
+            yield _screen(batch, cursor, seen_emails, seen_phones, rejects)
+
+    try:
+        with ProcessPoolExecutor(workers) as pool:
+            batches = screened_batches(get_connection().cursor())
+            pending = None  # (accepted rows, hash iterator) of the batch being hashed
+            for accepted in batches:
+                chunksize = max(1, len(accepted) // (4 * (workers or os.cpu_count() or 1)))
+                hashing = pool.map(passwords.hash_password, [values[3] for _, values in accepted],
+                                   repeat(rounds), chunksize=chunksize)
+                if pending is not None:
+                    imported += _insert(pending[0], pending[1], rejects)
+                    if progress:
+                        progress(ImportResult(read, imported, rejects.count, time.perf_counter() - started))
+                pending = (accepted, hashing)
+            if pending is not None:
+                imported += _insert(pending[0], pending[1], rejects)
+    finally:
+        rejects.close()
+
+    result = ImportResult(read, imported, rejects.count, time.perf_counter() - started)
+    if progress:
+        progress(result)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='CSV or JSONL file of clients')
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='input format (default: from the file name)')
+    parser.add_argument('--errors', help='where to write rejected rows (default: <input>.errors.csv)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='rows per transaction')
+    parser.add_argument('--workers', type=int, help='hashing processes (default: all cores)')
+    parser.add_argument('--rounds', type=int, default=passwords.BCRYPT_ROUNDS, help='bcrypt cost factor')
+    args = parser.parse_args()
+
+    from migrations import migrate
+    migrate()
+
+    def report(result):
+        rate = result.read / result.seconds if result.seconds else 0
+        print(f"\r{result.read:,} read, {result.imported:,} imported, {result.rejected:,} rejected "
+              f"({rate:,.0f} rows/s)", end='', flush=True)
+
+    errors_path = args.errors or os.path.splitext(args.path)[0] + '.errors.csv'
+    try:
+        result = import_clients(args.path, errors_path, args.format, args.batch_size, args.workers, args.rounds,
+                                report)
+    except (OSError, sqlite3.Error) as e:
+        sys.exit(f"\nImport failed: {e}")
+    print(f"\nImported {result.imported:,} of {result.read:,} clients in {result.seconds:.1f}s.")
+    if result.rejected:
+        print(f"{result.rejected:,} rejected rows written to {errors_path}")
+
+
+if __name__ == '__main__':
+    main()
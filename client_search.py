@@ -0,0 +1,74 @@
+"""Client search by partial name, email or phone, backed by the clients_fts FTS5 index.
+
+Every word typed must match the start of a word in the client's name, email
+or phone: "ann mens" finds Ann Mensah, "mensah@exa" and "555000" work too.
+The index is kept current by triggers (migration 9), so any write path is
+covered.
+
+    python client_search.py ann mensah
+"""
+import re
+import sys
+
+from listings import CLIENT_COLUMNS
+from metrics import timed
+from repository import get_connection
+
+
+SEARCH_LIMIT = 50
+
+# Ranking with bm25 reads every match, so it is only done when there are at most this many
+RANK_LIMIT = 200
+
+
+def match_expression(text, prefix=True):
+    """The FTS5 query for what was typed, or None when it contains no words.
+
+    Each word becomes a quoted term, a prefix term unless `prefix` is False,
+    so FTS5 operators and quotes in the input are never interpreted.
+    """
+    terms = re.findall(r'\w+', text or '')
+    suffix = '*' if prefix else ''
+    return ' '.join(f'"{term}"{suffix}' for term in terms) if terms else None
+
+
+def _matches(cursor, expression, order, limit):
+    cursor.execute(f'SELECT rowid FROM clients_fts WHERE clients_fts MATCH ? ORDER BY {order} LIMIT ?',
+                   (expression, limit))
+    return [row[0] for row in cursor.fetchall()]
+
+
+@timed('search_clients')
+def search_clients(text, limit=SEARCH_LIMIT):
+    """Clients matching `text` as (client_id, name, email, phone) rows, best matches first.
+
+    Broad searches ("a", "example") can match a large share of the table; for
+    those the first matches in client_id order are returned without ranking,
+    which keeps every lookup to a few milliseconds.
+    """
+    expression = match_expression(text)
+    if expression is None:
+        return []
+    cursor = get_connection().cursor()
+    # Prefixes longer than the indexed ones (migration 9) merge the doclist of every token they cover, which is
+    # slow for a common word typed in full; when the whole words alone already match too much to rank, use those
+    client_ids = _matches(cursor, match_expression(text, prefix=False), 'rowid', RANK_LIMIT + 1)
+    if len(client_ids) <= RANK_LIMIT:
+        client_ids = _matches(cursor, expression, 'rowid', RANK_LIMIT + 1)
+        if len(client_ids) <= RANK_LIMIT:
+            client_ids = _matches(cursor, expression, 'rank', limit)
+    client_ids = client_ids[:limit]
+    if not client_ids:
+        return []
+
+    cursor.execute(f"SELECT {', '.join(CLIENT_COLUMNS)} FROM clients WHERE client_id IN "
+                   f"({','.join('?' * len(client_ids))})", client_ids)
+    rows = {row[0]: row for row in cursor.fetchall()}
+    return [rows[client_id] for client_id in client_ids if client_id in rows]
+
+
+if __name__ == '__main__':
+    from migrations import migrate
+    migrate()
+    for client in search_clients(' '.join(sys.argv[1:])):
+        print(f"{client[0]}: {client[1]} <{client[2]}> {client[3]}")
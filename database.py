@@ -1,109 +1,79 @@
 import sqlite3
-import bcrypt
-from datetime import datetime
-
-
-def create_database():
-    conn = sqlite3.connect('hotel_management.db')
-    cursor = conn.cursor()
-
-    # Drop the tables if they exist to avoid schema issues
-    cursor.execute('DROP TABLE IF EXISTS rooms')
-    cursor.execute('DROP TABLE IF EXISTS clients')
-    cursor.execute('DROP TABLE IF EXISTS bookings')
-
-    # Create rooms table
-    cursor.execute(''' 
-        CREATE TABLE rooms (
-            room_id INTEGER PRIMARY KEY,
-            room_type TEXT,
-            price REAL,
-            bed_count INTEGER,
-            level INTEGER,
-            availability BOOLEAN,
-            category TEXT,
-            description TEXT
-        )
-    ''')
-
-    # Create clients table with password column
-    cursor.execute(''' 
-        CREATE TABLE clients (
-            client_id INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            phone TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL
-        )
-    ''')
-
-    # Create bookings table
-    cursor.execute(''' 
-        CREATE TABLE bookings (
-            booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            client_id INTEGER NOT NULL,
-            room_id INTEGER NOT NULL,
-            booking_date TEXT NOT NULL,
-            status TEXT NOT NULL,
-            payment_status TEXT NOT NULL,
-            FOREIGN KEY (client_id) REFERENCES clients(client_id),
-            FOREIGN KEY (room_id) REFERENCES rooms(room_id)
-        );
-    ''')
-
+from datetime import datetime, timedelta
+
+import availability
+from availability import BookingResult, default_stay, parse_date, reserve_stay
+from booking_writer import get_writer
+from listings import PAGE_SIZE, Page, bookings_page
+from metrics import timed
+from migrations import migrate
+from passwords import hash_password, needs_rehash, verify_password
+from pricing import quote_rooms, quote_stay
+from repository import get_connection, run_with_retry, transaction
+from room_catalog import available_rooms, catalog
+from sessions import store as sessions
+
+
+# Rooms a new database is seeded with:
+# (room_id, room_type, price, bed_count, level, availability, category, description)
+SEED_ROOMS = [
+    (1, 'Standard', 50, 1, 1, 1, 'Standard Room', 'Basic room with 1 bed'),
+    (2, 'Standard', 50, 1, 1, 1, 'Standard Room', 'Basic room with 1 bed'),
+    (3, 'Standard', 50, 1, 1, 1, 'Standard Room', 'Basic room with 1 bed'),
+    (4, 'Standard', 50, 1, 1, 1, 'Standard Room', 'Basic room with 1 bed'),
+    (5, 'Standard', 50, 1, 1, 1, 'Standard Room', 'Basic room with 1 bed'),
+    (6, '2-Bed', 70, 2, 2, 1, '2-Bed Room', 'Room with 2 beds'),
+    (7, '2-Bed', 70, 2, 2, 1, '2-Bed Room', 'Room with 2 beds'),
+    (8, '2-Bed', 70, 2, 2, 1, '2-Bed Room', 'Room with 2 beds'),
+    (9, '2-Bed', 70, 2, 2, 1, '2-Bed Room', 'Room with 2 beds'),
+    (10, '2-Bed', 70, 2, 2, 1, '2-Bed Room', 'Room with 2 beds'),
+    (11, 'Modern', 110, 2, 3, 1, 'Modern Room', 'Room with 2 beds, modern amenities'),
+    (12, 'Modern', 110, 2, 3, 1, 'Modern Room', 'Room with 2 beds, modern amenities'),
+    (13, 'Modern', 110, 2, 3, 1, 'Modern Room', 'Room with 2 beds, modern amenities'),
+    (14, 'Modern', 110, 2, 3, 1, 'Modern Room', 'Room with 2 beds, modern amenities'),
+    (15, 'Luxury', 150, 2, 4, 1, 'Luxury Room', 'Luxurious room with 2 beds and extra features'),
+    (16, 'Luxury', 150, 2, 4, 1, 'Luxury Room', 'Luxurious room with 2 beds and extra features')
+]
+
+
+def create_database(rooms=None):
+    # Bring the schema up to date without touching existing data, then seed the rooms (SEED_ROOMS by default)
+    migrate()
+    with transaction() as cursor:
+        _seed_rooms(cursor, SEED_ROOMS if rooms is None else rooms)
+    availability.index.invalidate()
+    catalog.invalidate()
+
+
+def _seed_rooms(cursor, rooms):
     # Check if rooms already exist before inserting
     cursor.execute('SELECT COUNT(*) FROM rooms')
     if cursor.fetchone()[0] == 0:
-        rooms = [
-            (1, 'Standard', 50, 'Standard Room', 'Basic room with 1 bed', 1, 'Standard Room', 'Basic room with 1 bed'),
-            (2, 'Standard', 50, 'Standard Room', 'Basic room with 1 bed', 1, 'Standard Room', 'Basic room with 1 bed'),
-            (3, 'Standard', 50, 'Standard Room', 'Basic room with 1 bed', 1, 'Standard Room', 'Basic room with 1 bed'),
-            (4, 'Standard', 50, 'Standard Room', 'Basic room with 1 bed', 1, 'Standard Room', 'Basic room with 1 bed'),
-            (5, 'Standard', 50, 'Standard Room', 'Basic room with 1 bed', 1, 'Standard Room', 'Basic room with 1 bed'),
-            (6, '2-Bed', 70, '2-Bed Room', 'Room with 2 beds', 1, '2-Bed Room', 'Room with 2 beds'),
-            (7, '2-Bed', 70, '2-Bed Room', 'Room with 2 beds', 1, '2-Bed Room', 'Room with 2 beds'),
-            (8, '2-Bed', 70, '2-Bed Room', 'Room with 2 beds', 1, '2-Bed Room', 'Room with 2 beds'),
-            (9, '2-Bed', 70, '2-Bed Room', 'Room with 2 beds', 1, '2-Bed Room', 'Room with 2 beds'),
-            (10, '2-Bed', 70,'2-Bed Room', 'Room with 2 beds', 1, '2-Bed Room', 'Room with 2 beds'),
-            (11, 'Modern', 110, 'Modern Room', 'Room with 2 beds, modern amenities', 1, 'Modern Room', 'Room with 2 beds, modern amenities'),
-            (12, 'Modern', 110, 'Modern Room', 'Room with 2 beds, modern amenities', 1, 'Modern Room', 'Room with 2 beds, modern amenities'),
-            (13, 'Modern', 110, 'Modern Room', 'Room with 2 beds, modern amenities', 1, 'Modern Room', 'Room with 2 beds, modern amenities'),
-            (14, 'Modern', 110, 'Modern Room', 'Room with 2 beds, modern amenities', 1, 'Modern Room', 'Room with 2 beds, modern amenities'),
-            (15, 'Luxury', 150, 'Luxury Room', 'Luxurious room with 2 beds and extra features', 1, 'Luxury Room', 'Luxurious room with 2 beds and extra features'),
-            (16, 'Luxury', 150, 'Luxury Room', 'Luxurious room with 2 beds and extra features', 1, 'Luxury Room', 'Luxurious room with 2 beds and extra features')
-        ]
         cursor.executemany(''' 
             INSERT INTO rooms (room_id, room_type, price, bed_count, level, availability, category, description) 
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', rooms)
 
-    conn.commit()
-    conn.close()
-
+@timed('sign_up_client')
 def sign_up_client(name, email, phone, password):
-    conn = sqlite3.connect('hotel_management.db')
-    cursor = conn.cursor()
-
-    # Hash the password before storing
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+    # Hash the password before storing (cost factor from passwords.BCRYPT_ROUNDS)
+    hashed_password = hash_password(password)
 
     try:
-        cursor.execute(''' 
-            INSERT INTO clients (name, email, phone, password) 
-            VALUES (?, ?, ?, ?)
-        ''', (name, email, phone, hashed_password.decode('utf-8')))  # Decode bytes to string
-        conn.commit()
+        with transaction() as cursor:
+            cursor.execute(''' 
+                INSERT INTO clients (name, email, phone, password) 
+                VALUES (?, ?, ?, ?)
+            ''', (name, email, phone, hashed_password))
         print("Client registered successfully.")
     except sqlite3.IntegrityError as e:
         print(f"Integrity Error: {e}. Ensure unique email and phone.")
     except sqlite3.Error as e:
         print(f"Database Error: {e}")
-    finally:
-        conn.close()
 
+@timed('authenticate_client')
 def authenticate_client(email, password):
-    conn = sqlite3.connect('hotel_management.db')
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
 
     try:
         cursor.execute(''' 
@@ -114,9 +84,9 @@ def authenticate_client(email, password):
         client = cursor.fetchone()
 
         if client:
-            stored_password = client[4].encode('utf-8')  # Convert stored password to bytes
             # Check if the password matches
-            if bcrypt.checkpw(password.encode('utf-8'), stored_password):
+            if verify_password(password, client[4]):
+                upgrade_password_hash(client[0], password, client[4])
                 print(f"Login successful. Welcome {client[1]}!")
                 return client  # Return client info if authentication is successful
             else:
@@ -125,91 +95,281 @@ def authenticate_client(email, password):
             print("Client not found.")
     except sqlite3.Error as e:
         print(f"Database Error: {e}")
-    finally:
-        conn.close()
     return None
 
 
+def upgrade_password_hash(client_id, password, stored_password):
+    # Re-hash at the current cost factor when the stored hash is weaker; needs the plain password, so only at login
+    if not needs_rehash(stored_password):
+        return False
+    with transaction() as cursor:
+        cursor.execute('UPDATE clients SET password = ? WHERE client_id = ? AND password = ?',
+                       (hash_password(password), client_id, stored_password))
+    return True
+
+
+@timed('login_client')
+def login_client(email, password):
+    # One bcrypt check; book_room and view_bookings then take the returned token in place of the client_id
+    client = authenticate_client(email, password)
+    return sessions.issue(client[0]) if client else None
+
+
+def logout_client(token):
+    sessions.revoke(token)
+
+
+def _session_client(client_id):
+    # A session token from login_client resolves to its client_id, None if expired. Tokens are never all
+    # digits, so a numeric ID sent as a string ("42") is an ID, not a token that silently fails to resolve
+    if isinstance(client_id, str):
+        return int(client_id) if client_id.isdecimal() else sessions.client_id(client_id)
+    return client_id
+
+
 # Booking functions
-def view_available_rooms():
-    conn = sqlite3.connect('hotel_management.db')
-    cursor = conn.cursor()
-    cursor.execute('''SELECT room_id, room_type, price, description FROM rooms WHERE availability = 1''')
-    rooms = cursor.fetchall()
+@timed('view_available_rooms')
+def view_available_rooms(check_in=None, check_out=None):
+    # Rooms are available when every night between check-in and check-out is free (default: tonight)
+    if check_in is None or check_out is None:
+        check_in, check_out = default_stay()
+    # Room details come from the in-process catalog cache, availability from the night index
+    rooms = [(room[0], room[1], room[2], room[6]) for room in available_rooms(check_in, check_out)]
 
     if rooms:
-        print("Available Rooms:")
+        print(f"Available Rooms from {parse_date(check_in)} to {parse_date(check_out)}:")
         for room in rooms:
             print(f"Room ID: {room[0]}, Type: {room[1]}, Price: ${room[2]}, Description: {room[3]}")
     else:
         print("No available rooms.")
-    conn.close()
+    return rooms
 
 
-def book_room(client_id, room_id):
-    conn = sqlite3.connect('hotel_management.db')
-    cursor = conn.cursor()
+@timed('book_room')
+def book_room(client_id, room_id, check_in=None, check_out=None):
+    # client_id may also be a session token from login_client
+    client_id = _session_client(client_id)
+    if client_id is None:
+        print("Session expired or invalid. Please log in again.")
+        return
 
-    # Check if the room exists and is available
-    cursor.execute('SELECT availability FROM rooms WHERE room_id = ?', (room_id,))
-    room = cursor.fetchone()
+    # Ensure all required values are present
+    booking_date = datetime.now().strftime('%Y-%m-%d')
+    if check_in is None or check_out is None:
+        check_in, check_out = default_stay()
 
-    if room is None:
-        print(f"Room with ID {room_id} does not exist.")
-        conn.close()
+    if None in (client_id, room_id, booking_date):
+        print("Error: Missing required values for booking.")
         return
 
-    if room[0] == 1:  # Room is available
-        # Ensure all required values are present
-        booking_date = datetime.now().strftime('%Y-%m-%d')
-
-        if None in (client_id, room_id, booking_date):
-            print("Error: Missing required values for booking.")
-            conn.close()
-            return
+    try:
+        print(f"client_id: {client_id}, room_id: {room_id}, booking_date: {booking_date}, "
+              f"check_in: {parse_date(check_in)}, check_out: {parse_date(check_out)}")
+
+        # Checking the room and claiming its nights happen in one conditional write,
+        # group-committed with other bookings when the booking writer is running; the writer prices the stay too
+        writer = get_writer()
+        if writer is not None:
+            result = writer.book_room(client_id, room_id, check_in, check_out, booking_date).result()
+        else:
+            result = reserve_stay(client_id, room_id, check_in, check_out, booking_date,
+                                  amount=quote_stay(room_id, check_in, check_out))
+    except ValueError as e:
+        print(f"Invalid dates: {e}")
+        return
+    except sqlite3.Error as e:
+        print(f"Error occurred while booking the room: {e}")
+        return
 
-        try:
-            print(f"client_id: {client_id}, room_id: {room_id}, booking_date: {booking_date}")
-            
-            # Insert booking (exclude booking_id from the insert as it is auto-incremented)
-            cursor.execute(''' 
-                INSERT INTO bookings (client_id, room_id, booking_date, status, payment_status) 
-                VALUES (?, ?, ?, ?, ?) 
-            ''', (client_id, room_id, booking_date, 'Booked', 'Pending'))
+    if result.status == availability.BOOKED:
+        price = f" for ${result.amount:,.2f}" if result.amount is not None else ''
+        print(f"Room {room_id} booked successfully for client {client_id}{price}.")
+        return result.booking_id
+    if result.status == availability.ROOM_NOT_FOUND:
+        print(f"Room with ID {room_id} does not exist.")
+    elif result.status == availability.ROOM_CLOSED:
+        print(f"Room {room_id} is not available.")
+    else:
+        print(f"Room {room_id} is not available for those dates.")
 
-            # Mark the room as unavailable
-            cursor.execute('UPDATE rooms SET availability = 0 WHERE room_id = ?', (room_id,))
 
-            conn.commit()
-            print(f"Room {room_id} booked successfully for client {client_id}.")
-        except sqlite3.Error as e:
-            print(f"Error occurred while booking the room: {e}")
-    else:
-        print(f"Room {room_id} is not available.")
-    conn.close()
+def _chunks(items, size=500):
+    # Keep IN (...) lists under SQLite's bound-parameter limit
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
 
+@timed('book_rooms_batch')
+def book_rooms_batch(requests, check_in=None, check_out=None):
+    """Book many rooms in one transaction, e.g. a tour operator's room block.
 
+    Each request is (client_id, room_id) or (client_id, room_id, check_in, check_out);
+    the check_in/check_out arguments (default: tonight) apply when a request has no dates.
+    Returns one BookingResult per request, in order. A request conflicts when its
+    room is taken on any night, including by an earlier request in the same batch.
+    """
+    if check_in is None or check_out is None:
+        check_in, check_out = default_stay()
+    booking_date = datetime.now().strftime('%Y-%m-%d')
 
+    items = []
+    for request in requests:
+        client_id, room_id = request[0], request[1]
+        stay_in, stay_out = (request[2], request[3]) if len(request) > 2 else (check_in, check_out)
+        try:
+            nights = availability.stay_nights(stay_in, stay_out)
+        except ValueError:
+            nights = None
+        items.append((client_id, room_id, nights))
+
+    # One quote per distinct stay, priced before the write lock is taken
+    stays = {}
+    for _, room_id, nights in items:
+        if nights:
+            stays.setdefault((nights[0], len(nights)), set()).add(room_id)
+    prices = {(first_night, length): quote_rooms(rooms, first_night,
+                                                 parse_date(first_night) + timedelta(days=length))
+              for (first_night, length), rooms in stays.items()}
+
+    room_ids = sorted({room_id for _, room_id, nights in items if nights})
+    dated = [nights for _, _, nights in items if nights]
+    first = min(n[0] for n in dated) if dated else None
+    last = max(n[-1] for n in dated) if dated else None
+
+    def attempt():
+        results, accepted = [], []
+        with transaction(immediate=True) as cursor:
+            before = availability.inventory_version(cursor)
+
+            open_rooms, known_rooms, taken = set(), set(), set()
+            for chunk in _chunks(room_ids):
+                marks = ','.join('?' * len(chunk))
+                cursor.execute(f'SELECT room_id, availability FROM rooms WHERE room_id IN ({marks})', chunk)
+                for room_id, open_flag in cursor.fetchall():
+                    known_rooms.add(room_id)
+                    if open_flag == 1:
+                        open_rooms.add(room_id)
+                cursor.execute(f'''
+                    SELECT room_id, night FROM room_nights
+                    WHERE room_id IN ({marks}) AND night >= ? AND night <= ?
+                ''', (*chunk, first, last))
+                taken.update(cursor.fetchall())
+
+            for client_id, room_id, nights in items:
+                if not nights:
+                    results.append(BookingResult(availability.INVALID_DATES, None, room_id))
+                elif room_id not in known_rooms:
+                    results.append(BookingResult(availability.ROOM_NOT_FOUND, None, room_id))
+                elif room_id not in open_rooms:
+                    results.append(BookingResult(availability.ROOM_CLOSED, None, room_id))
+                elif any((room_id, night) in taken for night in nights):
+                    results.append(BookingResult(availability.CONFLICT, None, room_id))
+                else:
+                    taken.update((room_id, night) for night in nights)
+                    results.append(None)  # filled in once the booking_id is known
+                    accepted.append((len(results) - 1, client_id, room_id, nights))
+
+            if accepted:
+                cursor.execute('SELECT COALESCE(MAX(booking_id), 0) FROM bookings')
+                previous_max = cursor.fetchone()[0]
+                cursor.executemany('''
+                    INSERT INTO bookings (client_id, room_id, booking_date, check_in, check_out, status, payment_status,
+                                          amount)
+                    VALUES (?, ?, ?, ?, ?, 'Booked', 'Pending', ?)
+                ''', [(client_id, room_id, booking_date, nights[0],
+                       (parse_date(nights[-1]) + timedelta(days=1)).isoformat(),
+                       prices[(nights[0], len(nights))].get(room_id))
+                      for _, client_id, room_id, nights in accepted])
+
+                # Rows inserted under our write lock get increasing IDs above the previous maximum
+                cursor.execute('SELECT booking_id FROM bookings WHERE booking_id > ? ORDER BY booking_id',
+                               (previous_max,))
+                booking_ids = [row[0] for row in cursor.fetchall()]
+                cursor.executemany('''
+                    INSERT INTO room_nights (room_id, night, booking_id) VALUES (?, ?, ?)
+                ''', [(room_id, night, booking_id)
+                      for (_, _, room_id, nights), booking_id in zip(accepted, booking_ids)
+                      for night in nights])
+                for (position, _, room_id, nights), booking_id in zip(accepted, booking_ids):
+                    results[position] = BookingResult(availability.BOOKED, booking_id, room_id,
+                                                      prices[(nights[0], len(nights))].get(room_id))
+
+            after = availability.inventory_version(cursor)
+        return results, accepted, before, after
 
-def view_bookings(client_id):
-    conn = sqlite3.connect('hotel_management.db')
-    cursor = conn.cursor()
-    cursor.execute(''' 
-        SELECT b.booking_id, r.room_type, b.booking_date, b.status, b.payment_status 
-        FROM bookings b 
-        JOIN rooms r ON b.room_id = r.room_id
-        WHERE b.client_id = ? 
-    ''', (client_id,))
-    bookings = cursor.fetchall()
+    try:
+        results, accepted, before, after = run_with_retry(attempt)
+    except sqlite3.Error as e:
+        print(f"Error occurred while booking the rooms: {e}")
+        return [None] * len(items)
+
+    availability.index.note_writes(before, after, [
+        (room_id, nights[0], parse_date(nights[-1]) + timedelta(days=1), True)
+        for _, _, room_id, nights in accepted
+    ])
+    print(f"Booked {len(accepted)} of {len(items)} requested rooms.")
+    return results
+
+
+@timed('cancel_bookings_batch')
+def cancel_bookings_batch(booking_ids):
+    """Cancel many bookings in one transaction and free their nights.
+
+    Returns one entry per booking ID, in order: the freed room_id, or None when
+    there was no such booking. Database errors propagate, so a failed write is
+    never mistaken for bookings that were not found.
+    """
+    booking_ids = list(booking_ids)
+    unique_ids = sorted(set(booking_ids))
+
+    def attempt():
+        with transaction(immediate=True) as cursor:
+            before = availability.inventory_version(cursor)
+            found = {}
+            for chunk in _chunks(unique_ids):
+                marks = ','.join('?' * len(chunk))
+                cursor.execute(f'''
+                    SELECT booking_id, room_id, check_in, check_out FROM bookings WHERE booking_id IN ({marks})
+                ''', chunk)
+                for booking_id, room_id, stay_in, stay_out in cursor.fetchall():
+                    found[booking_id] = (room_id, stay_in, stay_out)
+
+            rows = [(booking_id,) for booking_id in found]
+            cursor.executemany('DELETE FROM room_nights WHERE booking_id = ?', rows)
+            cursor.executemany('DELETE FROM bookings WHERE booking_id = ?', rows)
+            after = availability.inventory_version(cursor)
+        return found, before, after
+
+    found, before, after = run_with_retry(attempt)
+    availability.index.note_writes(before, after, [
+        (room_id, stay_in, stay_out, False) for room_id, stay_in, stay_out in found.values()
+    ])
+    print(f"Cancelled {len(found)} of {len(unique_ids)} bookings.")
+    return [found[booking_id][0] if booking_id in found else None for booking_id in booking_ids]
+
+
+@timed('view_bookings')
+def view_bookings(client_id, after=None, limit=PAGE_SIZE, **filters):
+    # One keyset page of the client's bookings; filters: status, payment_status, date_from, date_to, and
+    # archived=True to include archived stays.
+    # client_id may also be a session token from login_client
+    client_id = _session_client(client_id)
+    if client_id is None:
+        print("Session expired or invalid. Please log in again.")
+        return Page([], None)
+    page = bookings_page(after, limit, client_id=client_id, **filters)
+    bookings = page.rows
 
     if bookings:
         print(f"Bookings for Client {client_id}:")
         for booking in bookings:
-            print(f"Booking ID: {booking[0]}, Room Type: {booking[1]}, Date: {booking[2]}, Status: {booking[3]}, Payment Status: {booking[4]}")
+            print(f"Booking ID: {booking[0]}, Room Type: {booking[2]}, Date: {booking[3]}, Status: {booking[6]}, Payment Status: {booking[7]}, "
+                  f"Stay: {booking[4]} to {booking[5]}")
+        if page.after is not None:
+            print(f"More bookings: call view_bookings({client_id}, after={page.after!r})")
     else:
         print("No bookings found.")
-    conn.close()
+    return page
 
 
 # Example usage:
@@ -222,10 +382,9 @@ if __name__ == '__main__':
 
     # Step 2: Authenticate the same client
     print("\nAuthenticating the client:")
-    client_info = authenticate_client("johndoe@example.com", "SecurePass123")
-    if client_info:
-        print(f"Authenticated: {client_info}")
-        client_id = client_info[0]  # Get the authenticated client ID
+    token = login_client("johndoe@example.com", "SecurePass123")
+    if token:
+        client_id = token  # The session token stands in for the client ID from here on
         
         # Step 3: View available rooms
         print("\nAvailable Rooms:")
@@ -0,0 +1,157 @@
+"""Streaming CSV/JSONL export of bookings and clients.
+
+Rows are read with fetchmany() in chunks and written through a buffered
+(optionally gzip-compressed) file, so memory use stays the same whatever
+the table size. Each export runs in one read transaction, so it sees a
+consistent snapshot, and returns the last ID it wrote: pass that back as
+`since` (or use --watermark) to export only rows added since the last run.
+
+From the command line the rows are read from a reporting snapshot (see
+snapshots.py) at most --max-age seconds old, so a long export stays off the
+live file; --live reads the live database instead.
+
+    python exports.py bookings nightly.csv.gz --watermark bookings.watermark
+    python exports.py clients clients.jsonl [--since ID] [--max-age SECONDS | --live]
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import sys
+from collections import namedtuple
+from contextlib import nullcontext
+
+from repository import transaction
+from snapshots import reading
+
+
+CHUNK_SIZE = 5000
+WRITE_BUFFER = 1 << 20  # bytes buffered before each write to the output file
+
+ExportResult = namedtuple('ExportResult', ['rows', 'last_id'])
+
+# name -> (column names, SELECT expressions, FROM clause, key column)
+EXPORTS = {
+    'bookings': (
+        ['booking_id', 'client_id', 'client_name', 'client_email', 'room_id', 'room_type', 'category', 'price',
+         'booking_date', 'check_in', 'check_out', 'status', 'payment_status', 'amount'],
+        ['b.booking_id', 'b.client_id', 'c.name', 'c.email', 'b.room_id', 'r.room_type', 'r.category', 'r.price',
+         'b.booking_date', 'b.check_in', 'b.check_out', 'b.status', 'b.payment_status', 'b.amount'],
+        '''bookings b
+           JOIN clients c ON b.client_id = c.client_id
+           JOIN rooms r ON b.room_id = r.room_id''',
+        'b.booking_id',
+    ),
+    # Password hashes are never exported
+    'clients': (
+        ['client_id', 'name', 'email', 'phone'],
+        ['client_id', 'name', 'email', 'phone'],
+        'clients',
+        'client_id',
+    ),
+}
+
+
+def _open_output(path, compress):
+    if path == '-':
+        return io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', newline='', write_through=False)
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='', compresslevel=6)
+    return open(path, 'w', encoding='utf-8', newline='', buffering=WRITE_BUFFER)
+
+
+def export_rows(name, out, file_format='csv', since=None, chunk_size=CHUNK_SIZE):
+    """Write every `name` row ('bookings' or 'clients') with an ID above `since` to the open text file `out`.
+
+    Rows go out in ID order. Returns an ExportResult with the number of rows
+    written and the last ID (since, unchanged, when there were none).
+    """
+    columns, expressions, from_clause, key = EXPORTS[name]
+    if file_format == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(columns)
+        write_chunk = writer.writerows
+    elif file_format == 'jsonl':
+        def write_chunk(rows):
+            out.write(''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in rows))
+    else:
+        raise ValueError("file_format must be 'csv' or 'jsonl'")
+
+    count, last_id = 0, since
+    with transaction() as cursor:
+        cursor.execute(f"SELECT {', '.join(expressions)} FROM {from_clause} WHERE {key} > ? ORDER BY {key}",
+                       (since or 0,))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            write_chunk(rows)
+            count += len(rows)
+            last_id = rows[-1][0]
+    return ExportResult(count, last_id)
+
+
+def export_to_file(name, path, file_format=None, since=None, compress=None, chunk_size=CHUNK_SIZE):
+    """Export to a file path ('-' for stdout); format and gzip default from the extension (.csv, .jsonl, .gz)."""
+    base = path[:-3] if path.endswith('.gz') else path
+    file_format = file_format or ('jsonl' if base.endswith(('.jsonl', '.json')) else 'csv')
+    compress = path.endswith('.gz') if compress is None else compress
+    out = _open_output(path, compress)
+    try:
+        return export_rows(name, out, file_format, since, chunk_size)
+    finally:
+        if path == '-':
+            out.flush()
+            out.detach()
+        else:
+            out.close()
+
+
+def read_watermark(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return None
+
+
+def write_watermark(path, last_id):
+    # Replace atomically so a crash never leaves a half-written watermark
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        f.write(f'{last_id}\n')
+    os.replace(temporary, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('table', choices=sorted(EXPORTS))
+    parser.add_argument('path', help="output file, '-' for stdout; .gz compresses")
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help='default: from the file extension')
+    parser.add_argument('--gzip', action='store_true', default=None, help='compress even without .gz')
+    parser.add_argument('--since', type=int, help='only export rows with a higher ID')
+    parser.add_argument('--watermark', help='file holding the last exported ID; read before and updated after')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--max-age', type=float, help='oldest snapshot to read, in seconds (default: snapshots.MAX_AGE)')
+    source.add_argument('--live', action='store_true', help='read the live database rather than a snapshot')
+    args = parser.parse_args()
+
+    since = args.since
+    if since is None and args.watermark:
+        since = read_watermark(args.watermark)
+    try:
+        with nullcontext() if args.live else reading(args.max_age):
+            result = export_to_file(args.table, args.path, args.format, since, args.gzip, args.chunk_size)
+    except (OSError, sqlite3.Error) as e:
+        sys.exit(f"Export failed: {e}")
+    if args.watermark and result.last_id is not None:
+        write_watermark(args.watermark, result.last_id)
+    print(f"Exported {result.rows} {args.table} (last ID {result.last_id}).", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
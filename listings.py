@@ -0,0 +1,126 @@
+from collections import namedtuple
+
+from archive import attach_archive
+from repository import get_connection
+
+
+PAGE_SIZE = 50
+
+# Values offered by the admin filters; the columns are free text, so others still work
+BOOKING_STATUSES = ['Booked', 'Checked In', 'Checked Out', 'Cancelled']
+PAYMENT_STATUSES = ['Pending', 'Paid', 'Refunded']
+
+# `after` is the (sort value, key) of the last row seen, to pass back for the next page; None on the last page
+Page = namedtuple('Page', ['rows', 'after'])
+
+BOOKING_COLUMNS = ['b.booking_id', 'c.name', 'r.room_type', 'b.booking_date', 'b.check_in', 'b.check_out',
+                   'b.status', 'b.payment_status', 'b.room_id', 'b.amount']
+BOOKING_HEADERS = ['Booking ID', 'Client', 'Room Type', 'Date', 'Check-in', 'Check-out', 'Status', 'Payment', 'Room ID',
+                   'Amount']
+BOOKING_FROM = '''
+    bookings b
+    JOIN clients c ON b.client_id = c.client_id
+    JOIN rooms r ON b.room_id = r.room_id
+'''
+# The same over live and archived bookings; the connection must have the archive attached (archive.attach_archive)
+ALL_BOOKINGS_FROM = BOOKING_FROM.replace('bookings b', 'all_bookings b')
+
+CLIENT_COLUMNS = ['client_id', 'name', 'email', 'phone']
+CLIENT_HEADERS = ['Client ID', 'Name', 'Email', 'Phone']
+
+ROOM_COLUMNS = ['room_id', 'room_type', 'price', 'category', 'description', 'availability']
+ROOM_HEADERS = ['Room ID', 'Type', 'Price', 'Category', 'Description', 'Availability']
+
+
+def keyset_page(columns, from_clause, key, sort=None, after=None, limit=PAGE_SIZE, descending=False,
+                where=(), params=()):
+    """Fetch one page ordered by (sort, key) by seeking past the previous page instead of using OFFSET.
+
+    `key` must be unique (a primary key). With an index on the sort column,
+    page N costs the same as page 1 however large the table is.
+    """
+    sort = sort or key
+    direction, compare = ('DESC', '<') if descending else ('ASC', '>')
+    conditions, values = list(where), list(params)
+    if after is not None:
+        if sort == key:
+            conditions.append(f'{key} {compare} ?')
+            values.append(after[1])
+        else:
+            conditions.append(f'({sort}, {key}) {compare} (?, ?)')
+            values.extend(after)
+
+    sql = f"SELECT {', '.join(columns)}, {sort}, {key} FROM {from_clause}"
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    order = f'{key} {direction}' if sort == key else f'{sort} {direction}, {key} {direction}'
+    sql += f' ORDER BY {order} LIMIT ?'
+
+    cursor = get_connection().cursor()
+    cursor.execute(sql, (*values, limit + 1))
+    rows = cursor.fetchall()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_after = tuple(rows[-1][-2:]) if more else None
+    return Page([row[:-2] for row in rows], next_after)
+
+
+def rows_by_key(columns, from_clause, key, keys, where=(), params=()):
+    """The rows whose `key` is one of `keys` and that pass `where`, as {key value: row}.
+
+    Rows come back with the same columns as keyset_page() rows; used to
+    re-read just the rows a change touched.
+    """
+    found = {}
+    keys = list(keys)
+    cursor = get_connection().cursor()
+    for start in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+        chunk = keys[start:start + 500]
+        conditions = [*where, f"{key} IN ({','.join('?' * len(chunk))})"]
+        cursor.execute(f"SELECT {', '.join(columns)}, {key} FROM {from_clause} WHERE {' AND '.join(conditions)}",
+                       (*params, *chunk))
+        found.update((row[-1], row[:-1]) for row in cursor.fetchall())
+    return found
+
+
+def booking_filters(status=None, payment_status=None, date_from=None, date_to=None, client_id=None):
+    """WHERE conditions and parameters for the booking listing filters (dates are inclusive booking dates)."""
+    where, params = [], []
+    if status:
+        where.append('b.status = ?')
+        params.append(status)
+    if payment_status:
+        where.append('b.payment_status = ?')
+        params.append(payment_status)
+    if date_from:
+        where.append('b.booking_date >= ?')
+        params.append(str(date_from))
+    if date_to:
+        # booking_date may carry a time, so compare against the start of the next day
+        where.append("b.booking_date < date(?, '+1 day')")
+        params.append(str(date_to))
+    if client_id is not None:
+        where.append('b.client_id = ?')
+        params.append(client_id)
+    return where, params
+
+
+def bookings_page(after=None, limit=PAGE_SIZE, sort='booking_id', descending=False, archived=False, **filters):
+    """One page of bookings joined with client name and room type.
+
+    sort is 'booking_id' or 'booking_date'; filters are status, payment_status,
+    date_from, date_to and client_id. With archived=True bookings moved to
+    the archive database are listed too.
+    """
+    sort_column = {'booking_id': 'b.booking_id', 'booking_date': 'b.booking_date'}[sort]
+    where, params = booking_filters(**filters)
+    if archived:
+        attach_archive()
+    return keyset_page(BOOKING_COLUMNS, ALL_BOOKINGS_FROM if archived else BOOKING_FROM, 'b.booking_id', sort_column,
+                       after, limit, descending, where, params)
+
+
+def clients_page(after=None, limit=PAGE_SIZE, descending=False):
+    """One page of clients in client_id order (password hashes are never selected)."""
+    return keyset_page(CLIENT_COLUMNS, 'clients', 'client_id', None, after, limit, descending)
@@ -0,0 +1,331 @@
+"""Latency histograms, SQLite busy counters and a slow-query log.
+
+Every connection from repository.get_connection() is created with
+TimedConnection, whose cursors time each execute()/executemany() into a
+histogram per statement (time until the first row is ready) and count
+the statements each operation issues (an executemany() counts once). The
+operations are timed as a whole by timed() and timer(): database
+functions, GUI actions and service requests. Statements slower than
+SLOW_QUERY_SECONDS go to the slow-query log, together with their
+EXPLAIN QUERY PLAN. Bound values are never logged.
+
+Recording a value takes a few microseconds, so metrics are on by default.
+Environment variables:
+
+    HOTEL_METRICS=0            turn all recording off
+    HOTEL_SLOW_QUERY_MS=250    slow-query threshold in milliseconds
+    HOTEL_SLOW_QUERY_LOG=path  also append slow queries to this file as JSON lines
+    HOTEL_METRICS_FILE=path    write all metrics to this file at exit (.prom for Prometheus text, else JSON)
+    HOTEL_SQL_TRACE=path       write every statement SQLite runs, with bound values and trigger programs, to this
+                               file (debugging only: SQLite expands the bound values of every statement for it)
+"""
+import atexit
+import functools
+import json
+import os
+import re
+import sqlite3
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from time import perf_counter
+
+
+ENABLED = os.environ.get('HOTEL_METRICS', '1') != '0'
+SLOW_QUERY_SECONDS = float(os.environ.get('HOTEL_SLOW_QUERY_MS', 250)) / 1000
+SLOW_QUERY_LOG = os.environ.get('HOTEL_SLOW_QUERY_LOG')
+SLOW_QUERIES_KEPT = 100
+METRICS_FILE = os.environ.get('HOTEL_METRICS_FILE')
+SQL_TRACE_FILE = os.environ.get('HOTEL_SQL_TRACE')
+
+# Histogram bucket upper bounds in seconds, from 100 us to 10 s
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Metric name -> (label name or None, help text)
+METRICS = {
+    'hotel_operation_seconds': ('operation', 'Latency of database functions, GUI actions and service requests.'),
+    'hotel_operation_errors_total': ('operation', 'Operations that ended with an exception.'),
+    'hotel_operation_statements_total': ('operation', 'SQL statements issued by an operation.'),
+    'hotel_statement_seconds': ('statement', 'Time until a statement has its first row or finishes.'),
+    'hotel_lock_wait_seconds': (None, 'Time BEGIN IMMEDIATE waited for the write lock.'),
+    'hotel_sqlite_busy_total': ('event', 'SQLITE_BUSY/LOCKED errors raised ("error") and retried ("retry").'),
+    'hotel_slow_queries_total': (None, 'Statements slower than the slow-query threshold.'),
+    'hotel_maintenance_seconds': ('step', 'Time taken by each archival and maintenance step.'),
+    'hotel_maintenance_reclaimed_bytes_total': (None, 'Bytes of free pages maintenance gave back to the filesystem.'),
+    'hotel_snapshot_seconds': (None, 'Time taken to copy the database to a reporting snapshot.'),
+}
+
+_lock = threading.Lock()
+_histograms = {}  # (metric, label) -> Histogram
+_counters = {}    # (metric, label) -> number
+_statement_keys = {}  # SQL text -> normalised statement label
+_local = threading.local()
+slow_queries = deque(maxlen=SLOW_QUERIES_KEPT)
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+_EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum."""
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last slot counts values above BUCKETS[-1]
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (inf when it is above the last bucket)."""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank and seen:
+                return bound
+        return 0.0
+
+    def snapshot(self):
+        cumulative, seen = {}, 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            cumulative[str(bound)] = seen
+        cumulative['+Inf'] = self.count
+        return {'count': self.count, 'sum': self.total, 'mean': self.total / self.count if self.count else 0.0,
+                'p50': self.quantile(0.5), 'p90': self.quantile(0.9), 'p99': self.quantile(0.99),
+                'buckets': cumulative}
+
+
+def observe(metric, label, seconds):
+    if not ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get((metric, label))
+        if histogram is None:
+            histogram = _histograms[(metric, label)] = Histogram()
+        histogram.observe(seconds)
+
+
+def count(metric, label='', amount=1):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[(metric, label)] = _counters.get((metric, label), 0) + amount
+
+
+@contextmanager
+def timer(operation):
+    """Time the enclosed block as one operation."""
+    if not ENABLED:
+        yield
+        return
+    statements = getattr(_local, 'statements', 0)
+    started = perf_counter()
+    try:
+        yield
+    except BaseException:
+        count('hotel_operation_errors_total', operation)
+        raise
+    finally:
+        observe('hotel_operation_seconds', operation, perf_counter() - started)
+        count('hotel_operation_statements_total', operation, getattr(_local, 'statements', 0) - statements)
+
+
+def timed(operation):
+    """Decorator form of timer() for plain functions (not Qt slots, which would get extra arguments)."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timer(operation):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def statement_key(sql):
+    """The label a statement is recorded under: whitespace collapsed, IN (?, ?, ...) lists folded."""
+    key = _statement_keys.get(sql)
+    if key is None:
+        key = _PLACEHOLDER_LIST.sub('?, ...', _WHITESPACE.sub(' ', sql).strip())
+        if len(_statement_keys) < 4096:
+            _statement_keys[sql] = key
+    return key
+
+
+def _explain(connection, sql, parameters):
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    try:
+        cursor = connection.cursor(sqlite3.Cursor)  # a plain cursor, so the EXPLAIN itself is not timed
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', () if parameters is None else parameters)
+        return [row[3] for row in cursor.fetchall()]
+    except sqlite3.Error:
+        return None
+
+
+def _log_slow_query(connection, key, sql, parameters, seconds):
+    entry = {
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'seconds': round(seconds, 6),
+        'statement': key,
+        'plan': _explain(connection, sql, parameters),
+    }
+    count('hotel_slow_queries_total')
+    with _lock:
+        slow_queries.append(entry)
+        if SLOW_QUERY_LOG:
+            with open(SLOW_QUERY_LOG, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+
+
+def _statement_finished(cursor, sql, parameters, seconds):
+    _local.statements = getattr(_local, 'statements', 0) + 1
+    key = statement_key(sql)
+    observe('hotel_statement_seconds', key, seconds)
+    if seconds >= SLOW_QUERY_SECONDS:
+        _log_slow_query(cursor.connection, key, sql, parameters, seconds)
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that records how long each statement takes."""
+
+    def execute(self, sql, parameters=()):
+        started = perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _statement_finished(self, sql, parameters, perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _statement_finished(self, sql, None, perf_counter() - started)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors (and execute() shortcuts) are TimedCursors."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # sqlite3's own shortcuts run the statement in C, past TimedCursor.execute()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+_trace_file = None
+
+
+def _trace_to_file(sql):
+    # Runs for every statement SQLite starts, including each trigger program
+    with _lock:
+        _trace_file.write(f'{perf_counter():.6f} {threading.current_thread().name} {sql}\n')
+
+
+def connection_factory():
+    return TimedConnection if ENABLED else sqlite3.Connection
+
+
+def install(connection):
+    """Attach the HOTEL_SQL_TRACE log to a new connection, when it is set.
+
+    Off by default: with a trace callback CPython has SQLite expand the
+    bound values of every statement, trigger programs included, which can
+    make trigger-heavy writes many times slower.
+    """
+    global _trace_file
+    if not ENABLED or not SQL_TRACE_FILE:
+        return
+    with _lock:
+        if _trace_file is None:
+            _trace_file = open(SQL_TRACE_FILE, 'a', encoding='utf-8', buffering=1)
+    connection.set_trace_callback(_trace_to_file)
+
+
+def reset():
+    """Forget everything recorded so far."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        slow_queries.clear()
+
+
+def snapshot():
+    """All metrics as a JSON-serialisable dict."""
+    with _lock:
+        histograms = {key: histogram.snapshot() for key, histogram in _histograms.items()}
+        counters = dict(_counters)
+        slow = list(slow_queries)
+    result = {'histograms': {}, 'counters': {}, 'slow_queries': slow}
+    for (metric, label), data in sorted(histograms.items()):
+        result['histograms'].setdefault(metric, {})[label] = data
+    for (metric, label), value in sorted(counters.items()):
+        result['counters'].setdefault(metric, {})[label] = value
+    return result
+
+
+def to_json(indent=2):
+    return json.dumps(snapshot(), indent=indent)
+
+
+def _labels(metric, label, extra=''):
+    name = METRICS.get(metric, (None,))[0]
+    pairs = []
+    if name is not None:
+        escaped = label.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def to_prometheus():
+    """All histograms and counters in the Prometheus text exposition format."""
+    with _lock:
+        histograms = sorted((key, list(histogram.counts), histogram.total, histogram.count)
+                            for key, histogram in _histograms.items())
+        counters = sorted(_counters.items())
+    lines = []
+    described = set()
+
+    def describe(metric, kind):
+        if metric not in described:
+            described.add(metric)
+            lines.append(f'# HELP {metric} {METRICS.get(metric, (None, metric))[1]}')
+            lines.append(f'# TYPE {metric} {kind}')
+
+    for (metric, label), counts, total, observations in histograms:
+        describe(metric, 'histogram')
+        seen = 0
+        for bound, bucket in zip(BUCKETS + ('+Inf',), counts):
+            seen += bucket
+            lines.append(f'{metric}_bucket{_labels(metric, label, "le=" + json.dumps(str(bound)))} {seen}')
+        lines.append(f'{metric}_sum{_labels(metric, label)} {total}')
+        lines.append(f'{metric}_count{_labels(metric, label)} {observations}')
+    for (metric, label), value in counters:
+        describe(metric, 'counter')
+        lines.append(f'{metric}{_labels(metric, label)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_metrics(path):
+    """Write every metric to path: Prometheus text for .prom files, JSON otherwise."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(to_prometheus() if path.endswith('.prom') else to_json())
+
+
+if ENABLED and METRICS_FILE:
+    atexit.register(write_metrics, METRICS_FILE)
@@ -0,0 +1,507 @@
+"""Versioned schema migrations tracked with PRAGMA user_version.
+
+Each step runs in its own transaction together with the user_version bump,
+so a database is always at exactly one version and only pending steps run.
+
+    python migrations.py                 apply pending migrations
+    python migrations.py --check-plans   fail if a hot query plans a full table scan
+"""
+import re
+import sys
+from datetime import date, timedelta
+
+from repository import get_connection, transaction
+
+
+def _column_names(cursor, table):
+    cursor.execute(f'PRAGMA table_info({table})')
+    return {row[1] for row in cursor.fetchall()}
+
+
+def _initial_schema(cursor):
+    # The original tables; IF NOT EXISTS adopts databases created before migrations existed
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rooms (
+            room_id INTEGER PRIMARY KEY,
+            room_type TEXT,
+            price REAL,
+            bed_count INTEGER,
+            level INTEGER,
+            availability BOOLEAN,
+            category TEXT,
+            description TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS clients (
+            client_id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            phone TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS bookings (
+            booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id INTEGER NOT NULL,
+            room_id INTEGER NOT NULL,
+            booking_date TEXT NOT NULL,
+            status TEXT NOT NULL,
+            payment_status TEXT NOT NULL,
+            FOREIGN KEY (client_id) REFERENCES clients(client_id),
+            FOREIGN KEY (room_id) REFERENCES rooms(room_id)
+        )
+    ''')
+
+
+def _per_night_inventory(cursor):
+    # Stay dates on bookings plus one room_nights row per booked night
+    legacy = 'check_in' not in _column_names(cursor, 'bookings')
+    if legacy:
+        cursor.execute('ALTER TABLE bookings ADD COLUMN check_in TEXT')
+        cursor.execute('ALTER TABLE bookings ADD COLUMN check_out TEXT')
+        # Old bookings were for the night of their booking date
+        cursor.execute('''
+            UPDATE bookings
+            SET check_in = date(booking_date), check_out = date(booking_date, '+1 day')
+            WHERE check_in IS NULL
+        ''')
+        # availability used to mean "not booked yet"; it now means "open for sale"
+        cursor.execute('UPDATE rooms SET availability = 1 WHERE availability = 0')
+
+    # The primary key makes double-booking a night impossible
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS room_nights (
+            room_id INTEGER NOT NULL,
+            night TEXT NOT NULL,
+            booking_id INTEGER NOT NULL,
+            PRIMARY KEY (room_id, night)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_room_nights_booking ON room_nights (booking_id)')
+
+    if legacy:
+        cursor.execute('SELECT booking_id, room_id, check_in, check_out FROM bookings')
+        nights = []
+        for booking_id, room_id, check_in, check_out in cursor.fetchall():
+            first, last = date.fromisoformat(check_in), date.fromisoformat(check_out)
+            nights.extend((room_id, (first + timedelta(days=n)).isoformat(), booking_id)
+                          for n in range((last - first).days))
+        cursor.executemany('INSERT OR IGNORE INTO room_nights (room_id, night, booking_id) VALUES (?, ?, ?)', nights)
+
+    # Counter bumped on every inventory write so in-memory availability indexes know when to reload
+    cursor.execute('CREATE TABLE IF NOT EXISTS inventory_meta (version INTEGER NOT NULL)')
+    cursor.execute('INSERT INTO inventory_meta (version) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM inventory_meta)')
+    for table, event in (('room_nights', 'INSERT'), ('room_nights', 'DELETE'),
+                         ('rooms', 'INSERT'), ('rooms', 'DELETE'), ('rooms', 'UPDATE OF availability')):
+        name = f"{table}_{event.split()[0].lower()}_bump_inventory"
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}
+            BEGIN
+                UPDATE inventory_meta SET version = version + 1;
+            END
+        ''')
+
+
+def _hot_query_indexes(cursor):
+    # Filters used by view_bookings, reset_booking and view_available_rooms
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_client_id ON bookings (client_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_room_id ON bookings (room_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rooms_availability ON rooms (availability)')
+
+
+def _listing_indexes(cursor):
+    # Keyset pagination seeks on (booking_date, booking_id); status filters are the usual admin queries
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_booking_date ON bookings (booking_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_bookings_status ON bookings (status, payment_status)')
+
+
+def _catalog_version(cursor):
+    # Counter bumped on any change to room metadata, so cached room catalogs know when to reload
+    cursor.execute('CREATE TABLE IF NOT EXISTS catalog_meta (version INTEGER NOT NULL)')
+    cursor.execute('INSERT INTO catalog_meta (version) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM catalog_meta)')
+    for event in ('INSERT', 'DELETE', 'UPDATE OF room_type, price, bed_count, level, category, description'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS rooms_{event.split()[0].lower()}_bump_catalog AFTER {event} ON rooms
+            BEGIN
+                UPDATE catalog_meta SET version = version + 1;
+            END
+        ''')
+
+
+def _summary_tables(cursor):
+    # Dashboard counters kept current by triggers, so reading them never scans bookings or rooms
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS room_type_counts (
+            room_type TEXT PRIMARY KEY,
+            rooms INTEGER NOT NULL DEFAULT 0,
+            open_rooms INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS booking_status_counts (
+            status TEXT NOT NULL,
+            payment_status TEXT NOT NULL,
+            bookings INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (status, payment_status)
+        )
+    ''')
+    cursor.execute('DELETE FROM room_type_counts')
+    cursor.execute('''
+        INSERT INTO room_type_counts (room_type, rooms, open_rooms)
+        SELECT IFNULL(room_type, ''), COUNT(*), SUM(availability = 1) FROM rooms GROUP BY IFNULL(room_type, '')
+    ''')
+    cursor.execute('DELETE FROM booking_status_counts')
+    cursor.execute('''
+        INSERT INTO booking_status_counts (status, payment_status, bookings)
+        SELECT status, payment_status, COUNT(*) FROM bookings GROUP BY status, payment_status
+    ''')
+
+    # Statements that add (sign +1) or remove (sign -1) one row's contribution
+    def count_room(row, sign):
+        return f'''
+            INSERT INTO room_type_counts (room_type, rooms, open_rooms)
+            VALUES (IFNULL({row}.room_type, ''), {sign}, {sign} * ({row}.availability = 1))
+            ON CONFLICT (room_type) DO UPDATE SET rooms = rooms + excluded.rooms,
+                                                  open_rooms = open_rooms + excluded.open_rooms;
+        '''
+
+    def count_booking(row, sign):
+        return f'''
+            INSERT INTO booking_status_counts (status, payment_status, bookings)
+            VALUES ({row}.status, {row}.payment_status, {sign})
+            ON CONFLICT (status, payment_status) DO UPDATE SET bookings = bookings + excluded.bookings;
+        '''
+
+    triggers = {
+        'rooms_insert_count': ('INSERT ON rooms', count_room('NEW', 1)),
+        'rooms_delete_count': ('DELETE ON rooms', count_room('OLD', -1)),
+        'rooms_update_count': ('UPDATE OF room_type, availability ON rooms',
+                               count_room('OLD', -1) + count_room('NEW', 1)),
+        'bookings_insert_count': ('INSERT ON bookings', count_booking('NEW', 1)),
+        'bookings_delete_count': ('DELETE ON bookings', count_booking('OLD', -1)),
+        'bookings_update_count': ('UPDATE OF status, payment_status ON bookings',
+                                  count_booking('OLD', -1) + count_booking('NEW', 1)),
+    }
+    for name, (event, body) in triggers.items():
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} BEGIN {body} END')
+
+
+def _sessions(cursor):
+    # Persistent login sessions (sessions.SessionStore); only a digest of each token is kept
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            token_hash TEXT PRIMARY KEY,
+            client_id INTEGER NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_client_id ON sessions (client_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)')
+
+
+def _change_log(cursor):
+    # Every insert, update or delete of a booking, room or client appends one entry, whoever writes it,
+    # so open admin views can apply just those rows (changes.ChangeFeed)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            action TEXT NOT NULL
+        )
+    ''')
+    tables = {
+        'bookings': ('booking_id', 'UPDATE'),
+        'rooms': ('room_id', 'UPDATE'),
+        'clients': ('client_id', 'UPDATE OF client_id, name, email, phone'),  # not password re-hashes
+    }
+    for table, (key, update) in tables.items():
+        log = "INSERT INTO change_log (table_name, row_id, action) VALUES ('{table}', {row}.{key}, '{action}');"
+        triggers = {
+            f'{table}_insert_log': ('INSERT', log.format(table=table, row='NEW', key=key, action='insert')),
+            f'{table}_delete_log': ('DELETE', log.format(table=table, row='OLD', key=key, action='delete')),
+            f'{table}_update_log': (update, log.format(table=table, row='NEW', key=key, action='update') + f'''
+                INSERT INTO change_log (table_name, row_id, action)
+                SELECT '{table}', OLD.{key}, 'delete' WHERE OLD.{key} != NEW.{key};
+            '''),
+        }
+        for name, (event, body) in triggers.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table} BEGIN {body} END')
+    # Keep the last 100,000 entries; readers that fall further behind reload their view
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS change_log_prune AFTER INSERT ON change_log WHEN NEW.seq % 1000 = 0
+        BEGIN
+            DELETE FROM change_log WHERE seq <= NEW.seq - 100000;
+        END
+    ''')
+
+
+def _client_search(cursor):
+    # FTS5 index over client name, email and phone for the admin search box (client_search.py). It is an
+    # external-content table: the text stays in clients and triggers keep the index in step with it.
+    # Prefixes of up to 6 characters are indexed so a typed word reads one doclist instead of merging every
+    # token that starts with it (50 ms down to under 1 ms for "exampl" over a million clients)
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5(
+            name, email, phone,
+            content='clients', content_rowid='client_id',
+            tokenize='unicode61', prefix='1 2 3 4 5 6'
+        )
+    ''')
+    cursor.execute("INSERT INTO clients_fts (clients_fts) VALUES ('rebuild')")
+    remove = '''
+        INSERT INTO clients_fts (clients_fts, rowid, name, email, phone)
+        VALUES ('delete', OLD.client_id, OLD.name, OLD.email, OLD.phone);
+    '''
+    add = '''
+        INSERT INTO clients_fts (rowid, name, email, phone) VALUES (NEW.client_id, NEW.name, NEW.email, NEW.phone);
+    '''
+    triggers = {
+        'clients_insert_search': ('INSERT', add),
+        'clients_delete_search': ('DELETE', remove),
+        'clients_update_search': ('UPDATE OF client_id, name, email, phone', remove + add),
+    }
+    for name, (event, body) in triggers.items():
+        cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON clients BEGIN {body} END')
+
+
+# Floors of the seed rooms by room type (database.SEED_ROOMS), for rows whose level held seed text
+SEED_LEVELS = {'Standard': 1, '2-Bed': 2, 'Modern': 3, 'Luxury': 4}
+
+
+def _room_number(value):
+    # Whole number stored in a room column as int, float or digit text; None for anything else
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return value if isinstance(value, int) else None
+
+
+def _typed_rooms(cursor):
+    # The old seed data put category and description text into bed_count and level, which INTEGER affinity
+    # keeps as text. Rebuild rooms with CHECK constraints so numeric columns only ever hold numbers,
+    # repairing the seed rows on the way: beds from the description ("... 2 beds"), floors from SEED_LEVELS
+    cursor.execute('''
+        CREATE TABLE rooms_typed (
+            room_id INTEGER PRIMARY KEY,
+            room_type TEXT,
+            price REAL NOT NULL CHECK (typeof(price) = 'real' AND price >= 0),
+            bed_count INTEGER NOT NULL CHECK (typeof(bed_count) = 'integer' AND bed_count > 0),
+            level INTEGER NOT NULL CHECK (typeof(level) = 'integer'),
+            availability INTEGER NOT NULL DEFAULT 1 CHECK (availability IN (0, 1)),
+            category TEXT,
+            description TEXT
+        )
+    ''')
+    cursor.execute('''
+        SELECT room_id, room_type, price, bed_count, level, availability, category, description FROM rooms
+    ''')
+    rooms = []
+    for room_id, room_type, price, bed_count, level, availability, category, description in cursor.fetchall():
+        beds = re.search(r'(\d+) bed', description or '')
+        bed_count = _room_number(bed_count) or (int(beds.group(1)) if beds else 1)
+        level = _room_number(level)
+        level = SEED_LEVELS.get(room_type, 1) if level is None else level
+        rooms.append((room_id, room_type, float(price or 0), bed_count, level, 1 if availability else 0,
+                      category, description))
+    cursor.executemany('INSERT INTO rooms_typed VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rooms)
+
+    # Dropping rooms drops its triggers (inventory, catalog, counters, change log); put them back unchanged.
+    # Foreign keys are not enforced on our connections, so bookings may point at rooms while it is swapped
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'rooms'")
+    triggers = [row[0] for row in cursor.fetchall()]
+    cursor.execute('DROP TABLE rooms')
+    cursor.execute('ALTER TABLE rooms_typed RENAME TO rooms')
+    for sql in triggers:
+        cursor.execute(sql)
+    # Room details changed without firing those triggers, so tell the catalog and availability caches
+    cursor.execute('UPDATE catalog_meta SET version = version + 1')
+    cursor.execute('UPDATE inventory_meta SET version = version + 1')
+
+    # Room search (room_search.py). Each index returns open rooms in (price, room_id) order, the default sort,
+    # for no filter, a category and a level; the last covers every filter column so facet counts never read
+    # the table. They all lead with availability, so they replace idx_rooms_availability (migration 3), which
+    # went with the old table and is not recreated
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rooms_price ON rooms (availability, price)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rooms_category_price ON rooms (availability, category, price)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rooms_level_price ON rooms (availability, level, price)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_rooms_facets ON rooms (availability, category, price, bed_count, level)
+    ''')
+
+
+def _booking_amounts(cursor):
+    # The price of each stay (pricing.py) is kept on its booking, so bills and revenue don't follow later rate
+    # changes. Bookings made before this stay NULL; reports value them at their room's price
+    if 'amount' not in _column_names(cursor, 'bookings'):
+        cursor.execute('ALTER TABLE bookings ADD COLUMN amount REAL')
+    # Nightly base rate per room type; rooms of a type without one are priced from rooms.price. Types whose rooms
+    # all cost the same start out at that price
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS room_rates (
+            room_type TEXT PRIMARY KEY,
+            base_rate REAL NOT NULL CHECK (base_rate >= 0)
+        )
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO room_rates (room_type, base_rate)
+        SELECT room_type, MIN(price) FROM rooms WHERE room_type IS NOT NULL
+        GROUP BY room_type HAVING MIN(price) = MAX(price)
+    ''')
+
+
+def _drop_open_room_counts(cursor):
+    # The dashboard shows rooms free tonight from the night index (availability.py), which no trigger can keep
+    # current as the date moves on, so room_type_counts.open_rooms went unread. Drop it, and stop the triggers
+    # updating the counters when a room is opened or closed for sale. The old triggers go first: renaming a
+    # table checks every trigger, and theirs still name the table being replaced
+    for name in ('rooms_insert_count', 'rooms_delete_count', 'rooms_update_count'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    cursor.execute('''
+        CREATE TABLE room_type_counts_new (
+            room_type TEXT PRIMARY KEY,
+            rooms INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('INSERT INTO room_type_counts_new (room_type, rooms) SELECT room_type, rooms FROM room_type_counts')
+    cursor.execute('DROP TABLE room_type_counts')
+    cursor.execute('ALTER TABLE room_type_counts_new RENAME TO room_type_counts')
+
+    def count_room(row, sign):
+        return f'''
+            INSERT INTO room_type_counts (room_type, rooms) VALUES (IFNULL({row}.room_type, ''), {sign})
+            ON CONFLICT (room_type) DO UPDATE SET rooms = rooms + excluded.rooms;
+        '''
+
+    triggers = {
+        'rooms_insert_count': ('INSERT ON rooms', count_room('NEW', 1)),
+        'rooms_delete_count': ('DELETE ON rooms', count_room('OLD', -1)),
+        'rooms_update_count': ('UPDATE OF room_type ON rooms', count_room('OLD', -1) + count_room('NEW', 1)),
+    }
+    for name, (event, body) in triggers.items():
+        cursor.execute(f'CREATE TRIGGER {name} AFTER {event} BEGIN {body} END')
+
+
+# (version, description, step) in the order they must be applied; never edit a shipped step, add a new one
+MIGRATIONS = [
+    (1, 'initial rooms, clients and bookings tables', _initial_schema),
+    (2, 'per-night inventory and booking stay dates', _per_night_inventory),
+    (3, 'indexes for client, room and availability filters', _hot_query_indexes),
+    (4, 'indexes for paginated booking listings', _listing_indexes),
+    (5, 'room catalog version counter', _catalog_version),
+    (6, 'trigger-maintained dashboard counters', _summary_tables),
+    (7, 'persistent login sessions', _sessions),
+    (8, 'change log for live admin views', _change_log),
+    (9, 'full-text client search index', _client_search),
+    (10, 'typed room columns and room search indexes', _typed_rooms),
+    (11, 'booking amounts and room type base rates', _booking_amounts),
+    (12, 'drop the unread open_rooms counter', _drop_open_room_counts),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version():
+    return get_connection().execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate():
+    """Apply every pending migration and return the versions that were applied."""
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version <= schema_version():
+            continue
+        with transaction(immediate=True) as cursor:
+            # Another process may have applied it while we waited for the write lock
+            cursor.execute('PRAGMA user_version')
+            if cursor.fetchone()[0] >= version:
+                continue
+            step(cursor)
+            cursor.execute(f'PRAGMA user_version = {version}')
+        print(f"Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
+
+
+# Queries that run on every click; none of them may fall back to a full table scan
+HOT_QUERIES = {
+    'view_bookings': ('''
+        SELECT b.booking_id, r.room_type, b.booking_date, b.status, b.payment_status, b.check_in, b.check_out
+        FROM bookings b
+        JOIN rooms r ON b.room_id = r.room_id
+        WHERE b.client_id = ?
+    ''', (1,)),
+    'view_available_rooms': ('''
+        SELECT room_id, room_type, price, description FROM rooms WHERE availability = 1
+    ''', ()),
+    'reset_booking lookup': ('''
+        SELECT room_id, check_in, check_out FROM bookings WHERE booking_id = ?
+    ''', (1,)),
+    'reset_booking nights': ('''
+        DELETE FROM room_nights WHERE booking_id = ?
+    ''', (1,)),
+    'open rooms': ('''
+        SELECT room_id FROM rooms WHERE availability = 1 ORDER BY room_id
+    ''', ()),
+    'bookings by room': ('''
+        SELECT booking_id FROM bookings WHERE room_id = ?
+    ''', (1,)),
+    'bookings page by id': ('''
+        SELECT b.booking_id, c.name, r.room_type FROM bookings b
+        JOIN clients c ON b.client_id = c.client_id JOIN rooms r ON b.room_id = r.room_id
+        WHERE b.booking_id > ? ORDER BY b.booking_id LIMIT ?
+    ''', (100, 51)),
+    'bookings page by date': ('''
+        SELECT b.booking_id, c.name, r.room_type FROM bookings b
+        JOIN clients c ON b.client_id = c.client_id JOIN rooms r ON b.room_id = r.room_id
+        WHERE (b.booking_date, b.booking_id) > (?, ?) ORDER BY b.booking_date, b.booking_id LIMIT ?
+    ''', ('2030-01-01', 100, 51)),
+    'client bookings page': ('''
+        SELECT b.booking_id FROM bookings b
+        WHERE b.client_id = ? AND b.booking_id > ? ORDER BY b.booking_id LIMIT ?
+    ''', (1, 100, 51)),
+    'claim_stay conflict check': ('''
+        SELECT 1 FROM room_nights WHERE room_id = ? AND night >= ? AND night < ?
+    ''', (1, '2030-01-01', '2030-01-08')),
+    'change log since': ('''
+        SELECT seq, table_name, row_id FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?
+    ''', (100, 5001)),
+    'client search': ('''
+        SELECT rowid FROM clients_fts WHERE clients_fts MATCH ? ORDER BY rowid LIMIT ?
+    ''', ('"ann"*', 50)),
+    'session lookup': ('''
+        SELECT client_id, expires_at FROM sessions WHERE token_hash = ? AND expires_at > ?
+    ''', ('0' * 64, 0.0)),
+}
+
+
+def explain(sql, params=()):
+    """Return the detail column of EXPLAIN QUERY PLAN for a statement."""
+    cursor = get_connection().cursor()
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    return [row[3] for row in cursor.fetchall()]
+
+
+def full_scans(queries=None):
+    """Return (query name, plan step) for every hot query step that scans a whole table."""
+    offenders = []
+    for name, (sql, params) in (queries or HOT_QUERIES).items():
+        for detail in explain(sql, params):
+            # Virtual tables (FTS5) report SCAN even when they answer from their own index
+            if detail.startswith('SCAN') and 'CONSTANT ROW' not in detail and 'VIRTUAL TABLE' not in detail:
+                offenders.append((name, detail))
+    return offenders
+
+
+if __name__ == '__main__':
+    migrate()
+    if '--check-plans' in sys.argv:
+        offenders = full_scans()
+        for name, detail in offenders:
+            print(f"FULL SCAN in {name}: {detail}")
+        if offenders:
+            sys.exit(1)
+        print(f"{len(HOT_QUERIES)} hot queries use indexes.")
@@ -0,0 +1,36 @@
+import os
+
+import bcrypt
+
+
+# bcrypt cost factor for new hashes; each +1 doubles the work. Stored hashes
+# below this cost are upgraded on the next successful login.
+BCRYPT_ROUNDS = int(os.environ.get('HOTEL_BCRYPT_ROUNDS', 12))
+
+
+def hash_password(password, rounds=None):
+    """Hash a password with the configured cost and return it as a string."""
+    salt = bcrypt.gensalt(rounds or BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def verify_password(password, hashed_password):
+    """Check a password against a stored hash (str or bytes, both have been stored)."""
+    if isinstance(hashed_password, str):
+        hashed_password = hashed_password.encode('utf-8')
+    return bcrypt.checkpw(password.encode('utf-8'), hashed_password)
+
+
+def hash_rounds(hashed_password):
+    """Cost factor of a stored hash, read from its '$2b$<cost>$' prefix."""
+    if isinstance(hashed_password, bytes):
+        hashed_password = hashed_password.decode('utf-8')
+    try:
+        return int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(hashed_password, rounds=None):
+    """True when a stored hash was made with a lower cost than the current target."""
+    return hash_rounds(hashed_password) < (rounds or BCRYPT_ROUNDS)
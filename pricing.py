@@ -0,0 +1,219 @@
+"""Stay prices: every open room quoted for every night of a stay in one NumPy pass.
+
+The price of a room for one night is
+
+    base rate x weekday multiplier x season multiplier x occupancy surcharge
+
+rounded to the cent, and a stay costs the sum of its nights. The base rate
+comes from room_rates for the room's type, or from rooms.price when its
+type has none. WEEKDAY_MULTIPLIERS and SEASONS depend on the date only.
+The occupancy surcharge depends on how full the room's type already is
+that night (OCCUPANCY_SURCHARGES), read from the in-memory night index
+(availability.py) like the rest of the stay's bookings.
+
+quote_matrix() builds the rooms x nights matrix of nightly prices for all
+open rooms at once; quote_rooms() and quote_stay() pick rooms out of it.
+Bookings store the quote they were made at in bookings.amount.
+
+    python pricing.py quote 2026-12-20 2027-01-03 [--limit N]
+    python pricing.py rates
+    python pricing.py set-rate Luxury 180
+"""
+import argparse
+import sqlite3
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from availability import CACHED_DATABASES, default_stay, index as availability_index, parse_date
+from metrics import timed
+from repository import get_connection, get_database_path, transaction
+from room_catalog import catalog
+
+
+# Multiplier for the night of each weekday, Monday first: Friday and Saturday nights cost more
+WEEKDAY_MULTIPLIERS = (1.0, 1.0, 1.0, 1.0, 1.15, 1.15, 1.0)
+
+# (first night, last night, multiplier) as 'MM-DD'; a season may run over the new year. Nights in two seasons
+# get both multipliers
+SEASONS = [
+    ('06-15', '08-31', 1.25),
+    ('12-20', '01-02', 1.4),
+]
+
+# (occupancy of the room's type that night, surcharge), lowest first; the highest threshold reached applies
+OCCUPANCY_SURCHARGES = [
+    (0.7, 0.10),
+    (0.9, 0.25),
+]
+
+# Nights handled per block when unpacking the index bitsets into the booked matrix
+_BLOCK = 64
+
+# `room_ids` are the open rooms, `nights` the datetime64 nights of the stay, `nightly` the rooms x nights price
+# matrix, `totals` the price of the stay per room and `free` whether the room has every night free
+Quote = namedtuple('Quote', ['room_ids', 'nights', 'nightly', 'totals', 'free'])
+
+_lock = threading.Lock()
+# Database path -> (catalog rooms, base rates, (base rate by room_id, type code by room_id, type count))
+_arrays = OrderedDict()
+
+
+def base_rates():
+    """{room_type: nightly base rate} from room_rates."""
+    cursor = get_connection().cursor()
+    cursor.execute('SELECT room_type, base_rate FROM room_rates')
+    return dict(cursor.fetchall())
+
+
+def set_base_rate(room_type, rate):
+    """Set a room type's nightly base rate; a rate of None removes it, so its rooms go back to rooms.price."""
+    with transaction(immediate=True) as cursor:
+        if rate is None:
+            cursor.execute('DELETE FROM room_rates WHERE room_type = ?', (room_type,))
+        else:
+            cursor.execute('''
+                INSERT INTO room_rates (room_type, base_rate) VALUES (?, ?)
+                ON CONFLICT (room_type) DO UPDATE SET base_rate = excluded.base_rate
+            ''', (room_type, float(rate)))
+
+
+def _room_arrays():
+    # Base rate and room type code indexed by room_id (type -1 for no room), rebuilt when the catalog or rates change
+    path = get_database_path()
+    rooms = catalog.rooms()
+    rates = base_rates()
+    with _lock:
+        cached = _arrays.get(path)
+        if cached is not None and cached[0] is rooms and cached[1] == rates:
+            _arrays.move_to_end(path)
+            return cached[2]
+    types = sorted({room[1] or '' for room in rooms.values()})
+    codes = {room_type: code for code, room_type in enumerate(types)}
+    size = max(rooms, default=0) + 1
+    base_of = np.zeros(size, dtype=np.float64)
+    type_of = np.full(size, -1, dtype=np.int64)
+    for room_id, room_type, price, *_ in rooms.values():
+        base_of[room_id] = rates.get(room_type, price or 0)
+        type_of[room_id] = codes[room_type or '']
+    arrays = (base_of, type_of, len(types))
+    with _lock:
+        _arrays[path] = (rooms, rates, arrays)
+        _arrays.move_to_end(path)
+        while len(_arrays) > CACHED_DATABASES:
+            _arrays.popitem(last=False)
+    return arrays
+
+
+def _booked_matrix(windows, nights):
+    # rooms x nights booleans from the per-room bitsets of availability.night_windows(), _BLOCK nights at a time
+    booked = np.empty((len(windows), nights), dtype=bool)
+    for start in range(0, nights, _BLOCK):
+        width = min(_BLOCK, nights - start)
+        mask = (1 << width) - 1
+        block = np.fromiter(((bits >> start) & mask for bits in windows), dtype=np.uint64, count=len(windows))
+        booked[:, start:start + width] = (block[:, None] >> np.arange(width, dtype=np.uint64)) & np.uint64(1)
+    return booked
+
+
+def night_multipliers(nights):
+    """Weekday times season multiplier of each datetime64 night."""
+    multipliers = np.asarray(WEEKDAY_MULTIPLIERS)[(nights.astype(np.int64) + 3) % 7]  # 1970-01-01 was a Thursday
+    months = nights.astype('datetime64[M]')
+    month_day = (months.astype(np.int64) % 12 + 1) * 100 + (nights - months).astype(np.int64) + 1
+    for first, last, multiplier in SEASONS:
+        first, last = int(first.replace('-', '')), int(last.replace('-', ''))
+        if first <= last:
+            inside = (month_day >= first) & (month_day <= last)
+        else:
+            inside = (month_day >= first) | (month_day <= last)
+        multipliers = np.where(inside, multipliers * multiplier, multipliers)
+    return multipliers
+
+
+@timed('quote_matrix')
+def quote_matrix(check_in=None, check_out=None):
+    """Nightly prices and stay totals of every open room for a stay (default: tonight), as a Quote.
+
+    Rooms with some nights already taken are quoted too (see `free`), since
+    they count toward the occupancy surcharges.
+    """
+    if check_in is None or check_out is None:
+        check_in, check_out = default_stay()
+    check_in, check_out = parse_date(check_in), parse_date(check_out)
+    windows = availability_index.night_windows(check_in, check_out)
+    base_of, type_of, types = _room_arrays()
+    nights = np.arange(np.datetime64(check_in, 'D'), np.datetime64(check_out, 'D'))
+
+    room_ids = np.fromiter(windows, dtype=np.int64, count=len(windows))
+    booked = _booked_matrix(list(windows.values()), len(nights))
+    # Rooms added since the catalog was read have no rate yet; leave them out
+    known = room_ids < len(base_of)
+    known[known] = type_of[room_ids[known]] >= 0
+    room_ids, booked = room_ids[known], booked[known]
+    room_types = type_of[room_ids]
+
+    # Share of each type's open rooms already taken, per night: a types x rooms one-hot matrix times the booked
+    # matrix (np.add.at does the same sum an order of magnitude slower)
+    one_hot = room_types[None, :] == np.arange(types)[:, None]
+    sold = one_hot.astype(np.float64) @ booked.astype(np.float64)
+    occupancy = sold / np.maximum(np.bincount(room_types, minlength=types), 1)[:, None]
+    surcharge = np.ones_like(occupancy)
+    for threshold, extra in OCCUPANCY_SURCHARGES:
+        surcharge = np.where(occupancy >= threshold, 1 + extra, surcharge)
+
+    nightly = np.round(base_of[room_ids][:, None] * night_multipliers(nights)[None, :] * surcharge[room_types], 2)
+    totals = np.round(nightly.sum(axis=1), 2)
+    return Quote(room_ids, nights, nightly, totals, ~booked.any(axis=1))
+
+
+def quote_rooms(room_ids, check_in=None, check_out=None):
+    """{room_id: price of the stay} for the given rooms; rooms that are not open for sale are left out."""
+    quote = quote_matrix(check_in, check_out)
+    totals = dict(zip(quote.room_ids.tolist(), quote.totals.tolist()))
+    return {room_id: totals[room_id] for room_id in room_ids if room_id in totals}
+
+
+def quote_stay(room_id, check_in=None, check_out=None):
+    """Price of a stay in one room, or None when the room is not open for sale."""
+    return quote_rooms([room_id], check_in, check_out).get(room_id)
+
+
+if __name__ == '__main__':
+    from migrations import migrate
+    parser = argparse.ArgumentParser(description='Quote stays and manage room type base rates.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    quote = commands.add_parser('quote', help='cheapest free rooms for a stay, with their price')
+    quote.add_argument('check_in')
+    quote.add_argument('check_out')
+    quote.add_argument('--limit', type=int, default=20)
+    commands.add_parser('rates', help='list the base rates per room type')
+    rate = commands.add_parser('set-rate', help="set a room type's base rate ('none' to use the room prices)")
+    rate.add_argument('room_type')
+    rate.add_argument('rate')
+    args = parser.parse_args()
+
+    try:
+        migrate()
+        if args.command == 'quote':
+            found = quote_matrix(args.check_in, args.check_out)
+            nights = len(found.nights)
+            for position in np.argsort(found.totals, kind='stable'):
+                if not found.free[position]:
+                    continue
+                room = catalog.get(int(found.room_ids[position]))
+                print(f"Room {room[0]} ({room[1]}): ${found.totals[position]:,.2f} for {nights} night(s), "
+                      f"${found.totals[position] / nights:,.2f} a night")
+                args.limit -= 1
+                if not args.limit:
+                    break
+        elif args.command == 'rates':
+            for room_type, base_rate in sorted(base_rates().items()):
+                print(f"{room_type}: ${base_rate:,.2f}")
+        else:
+            set_base_rate(args.room_type, None if args.rate.lower() == 'none' else float(args.rate))
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
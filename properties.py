@@ -0,0 +1,266 @@
+"""Several hotels (properties), each in its own SQLite database file.
+
+A property's rooms, clients and bookings live in its own file (its shard),
+so bookings at one hotel never wait on another's write lock. The registry
+file (properties.db, or HOTEL_REGISTRY_PATH) maps a short property code to
+the hotel's name and database file.
+
+A process serving one hotel points at its shard with select_property()
+(or --property CODE on the command line of the apps and the service), and
+all reads and writes stay there. Chain-wide reads go through fan_out(),
+which runs the same function against every shard on a thread pool and
+returns the results per property to be merged. sqlite3 and NumPy release
+the GIL while they work, so the shards are queried in parallel.
+
+    python properties.py add north "Hotel North" [--db hotel_north.db] [--rooms rooms.csv]
+    python properties.py list
+    python properties.py free --category "Luxury Room" [--check-in 2026-11-10 --check-out 2026-11-12]
+    python properties.py revenue 2026-01-01 2026-04-01 [--period month]
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from availability import default_stay, stay_nights
+from database import create_database
+from metrics import timed
+from reports import PERIODS, ReportRow, occupancy_report
+from repository import get_connection, set_database_path, transaction, using_database
+from room_catalog import CATALOG_COLUMNS
+from room_search import room_filters
+from snapshots import from_snapshot
+
+
+# Default registry file, overridable with the HOTEL_REGISTRY_PATH environment variable
+DEFAULT_REGISTRY_PATH = 'properties.db'
+
+# Shards queried at the same time by fan_out()
+FAN_OUT_WORKERS = 8
+
+FREE_ROOMS_LIMIT = 20
+
+Property = namedtuple('Property', ['code', 'name', 'db_path'])
+
+# Columns of a rooms CSV for add_property(), in database.SEED_ROOMS order
+ROOM_FIELDS = ['room_id', 'room_type', 'price', 'bed_count', 'level', 'availability', 'category', 'description']
+
+_pool = None
+
+
+def registry_path():
+    return os.environ.get('HOTEL_REGISTRY_PATH', DEFAULT_REGISTRY_PATH)
+
+
+@contextmanager
+def _registry():
+    # A transaction on the registry file, which is created on first use
+    with using_database(registry_path()):
+        with transaction() as cursor:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS properties (
+                    code TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    db_path TEXT NOT NULL UNIQUE
+                )
+            ''')
+            yield cursor
+
+
+def list_properties():
+    """Every registered property, by code."""
+    with _registry() as cursor:
+        cursor.execute('SELECT code, name, db_path FROM properties ORDER BY code')
+        return [Property(*row) for row in cursor.fetchall()]
+
+
+def get_property(code):
+    with _registry() as cursor:
+        cursor.execute('SELECT code, name, db_path FROM properties WHERE code = ?', (code,))
+        row = cursor.fetchone()
+    if row is None:
+        raise ValueError(f"Unknown property: {code}")
+    return Property(*row)
+
+
+def add_property(code, name, db_path=None, rooms=None):
+    """Register a property and create its database, seeded with `rooms` (database.SEED_ROOMS by default).
+
+    The file defaults to hotel_<code>.db next to the registry. An existing
+    file is migrated and keeps its data. Raises sqlite3.IntegrityError if
+    the code or file is already registered.
+    """
+    if db_path is None:
+        db_path = os.path.join(os.path.dirname(registry_path()), f'hotel_{code}.db')
+    with _registry() as cursor:
+        cursor.execute('INSERT INTO properties (code, name, db_path) VALUES (?, ?, ?)', (code, name, db_path))
+        # The registry row is only committed once the shard exists
+        with using_database(db_path):
+            create_database(rooms)
+    return Property(code, name, db_path)
+
+
+def read_rooms(path):
+    """Room rows in ROOM_FIELDS order from a CSV file with those columns as its header."""
+    with open(path, newline='', encoding='utf-8') as f:
+        return [tuple(row[field] for field in ROOM_FIELDS) for row in csv.DictReader(f)]
+
+
+def select_property(code):
+    """Point this whole process at one property's database; returns the Property."""
+    prop = get_property(code)
+    set_database_path(prop.db_path)
+    return prop
+
+
+def use_property(code):
+    """Context manager pointing the calling thread at one property's database for the enclosed block."""
+    return using_database(get_property(code).db_path)
+
+
+def property_from_args(argv):
+    """select_property() for a '--property CODE' argument or the HOTEL_PROPERTY variable, else None."""
+    code = os.environ.get('HOTEL_PROPERTY')
+    if '--property' in argv:
+        position = argv.index('--property')
+        if position + 1 < len(argv):
+            code = argv[position + 1]
+    return select_property(code) if code else None
+
+
+def _fan_out_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(FAN_OUT_WORKERS, thread_name_prefix='fan-out')
+    return _pool
+
+
+def fan_out(function, *args, properties=None, **kwargs):
+    """Call function(*args, **kwargs) once per property, each against that property's database.
+
+    The calls run in parallel on a thread pool whose threads keep their
+    connections to each shard open between calls. Returns {code: result} in
+    registry order; the first exception raised by any call is re-raised.
+    `properties` limits the calls to some Property tuples (default: all).
+    """
+    def run(prop):
+        with using_database(prop.db_path):
+            return function(*args, **kwargs)
+
+    properties = list_properties() if properties is None else properties
+    futures = [(prop.code, _fan_out_pool().submit(run, prop)) for prop in properties]
+    return {code: future.result() for code, future in futures}
+
+
+def _free_rooms(first_night, last_night, limit, filters):
+    # Open rooms of the current shard matching the filters with none of the nights booked, cheapest first.
+    # Probing room_nights keeps a chain-wide search from loading the night index of every property, which
+    # would push the ones this process serves out of its CACHED_DATABASES slots
+    where, params = room_filters(**filters)
+    cursor = get_connection().cursor()
+    cursor.execute(f'''
+        SELECT {', '.join(CATALOG_COLUMNS)} FROM rooms
+        WHERE {' AND '.join(where)} AND NOT EXISTS (
+            SELECT 1 FROM room_nights WHERE room_nights.room_id = rooms.room_id AND night >= ? AND night <= ?)
+        ORDER BY price, room_id LIMIT ?
+    ''', (*params, first_night, last_night, limit))
+    return cursor.fetchall()
+
+
+@timed('find_free_rooms')
+def find_free_rooms(check_in=None, check_out=None, limit=FREE_ROOMS_LIMIT, properties=None, **filters):
+    """Open rooms free every night of the stay (default: tonight) in any property, cheapest first.
+
+    `filters` are those of room_search (min_price, max_price, min_beds,
+    level, category). Returns (property code, *catalog row) tuples.
+    """
+    if check_in is None or check_out is None:
+        check_in, check_out = default_stay()
+    nights = stay_nights(check_in, check_out)
+    found = fan_out(_free_rooms, nights[0], nights[-1], limit, filters, properties=properties)
+    rooms = [(code, *room) for code, rows in found.items() for room in rows]
+    rooms.sort(key=lambda room: (room[3], room[0], room[1]))
+    return rooms[:limit]
+
+
+def property_reports(start, end, group_by='room_type', period='month', properties=None):
+    """reports.occupancy_report() of every property, read from its snapshot (snapshots.py), as {code: [ReportRow]}."""
+    return fan_out(from_snapshot, occupancy_report, start, end, group_by, period, properties=properties)
+
+
+def merge_reports(reports):
+    """Chain-wide ReportRows from per-property ones: counts and revenue add up, the ratios are recomputed."""
+    cells = {}
+    for rows in reports:
+        for row in rows:
+            total = cells.get((row.period, row.group))
+            if total is None:
+                cells[(row.period, row.group)] = row
+            else:
+                cells[(row.period, row.group)] = total._replace(
+                    rooms=total.rooms + row.rooms, available_nights=total.available_nights + row.available_nights,
+                    sold_nights=total.sold_nights + row.sold_nights, revenue=total.revenue + row.revenue,
+                    pending=total.pending + row.pending)
+    merged = []
+    for (period, group), row in sorted(cells.items()):
+        merged.append(ReportRow(
+            period, group, row.rooms, row.available_nights, row.sold_nights,
+            row.sold_nights / row.available_nights if row.available_nights else 0.0, row.revenue,
+            row.revenue / row.sold_nights if row.sold_nights else 0.0,
+            row.revenue / row.available_nights if row.available_nights else 0.0, row.pending))
+    return merged
+
+
+def chain_report(start, end, group_by='room_type', period='month', properties=None):
+    """occupancy_report() over every property at once, as merged ReportRows."""
+    return merge_reports(property_reports(start, end, group_by, period, properties).values())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manage properties and run chain-wide queries.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='register a property and create its database')
+    add.add_argument('code')
+    add.add_argument('name')
+    add.add_argument('--db', help='database file (default: hotel_<code>.db)')
+    add.add_argument('--rooms', help='CSV of rooms to seed with (default: the standard 16)')
+    commands.add_parser('list', help='list the registered properties')
+    free = commands.add_parser('free', help='rooms free for a stay in any property')
+    free.add_argument('--check-in')
+    free.add_argument('--check-out')
+    free.add_argument('--category')
+    free.add_argument('--min-beds', type=int)
+    free.add_argument('--max-price', type=float)
+    revenue = commands.add_parser('revenue', help='revenue per property and chain-wide')
+    revenue.add_argument('start')
+    revenue.add_argument('end')
+    revenue.add_argument('--period', choices=PERIODS, default='month')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'add':
+            prop = add_property(args.code, args.name, args.db, read_rooms(args.rooms) if args.rooms else None)
+            print(f"Added {prop.code} ({prop.name}) in {prop.db_path}")
+        elif args.command == 'list':
+            for prop in list_properties():
+                print(f"{prop.code}: {prop.name} ({prop.db_path})")
+        elif args.command == 'free':
+            for code, room_id, room_type, price, beds, level, category, _ in find_free_rooms(
+                    args.check_in, args.check_out, category=args.category, min_beds=args.min_beds,
+                    max_price=args.max_price):
+                print(f"{code} room {room_id}: {category}, ${price:.2f}, {beds} bed(s), level {level}")
+        else:
+            reports = property_reports(args.start, args.end, period=args.period)
+            for code, rows in reports.items():
+                print(f"{code}: ${sum(row.revenue for row in rows):,.2f} over {sum(row.sold_nights for row in rows)} "
+                      f"room-nights")
+            for row in merge_reports(reports.values()):
+                print(f"{row.period} {row.group}: occupancy {row.occupancy:.1%}, revenue ${row.revenue:,.2f}, "
+                      f"ADR ${row.adr:,.2f}, RevPAR ${row.revpar:,.2f}")
+    except (sqlite3.Error, ValueError, OSError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
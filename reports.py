@@ -0,0 +1,197 @@
+"""Occupancy and revenue reports computed with NumPy.
+
+Bookings overlapping the report window are loaded from SQLite in
+booking_id ranges as integer column arrays (room, check-in, check-out,
+unpaid flag), expanded to one entry per booked night and accumulated per
+(group, period) cell with np.bincount. Memory depends on the chunk size,
+not on the number of bookings, and no Python code runs per booking or per
+night.
+
+A booking's revenue is the amount stored on it (pricing.py) spread evenly
+over its nights; bookings made before amounts were recorded count their
+room's price for each night.
+
+Available room-nights are every night of the rooms open for sale, plus the
+sold nights of closed rooms: a room closed after it was booked still had
+those nights to sell, so occupancy never passes 100%.
+
+Metrics per cell:
+    occupancy  sold room-nights / available room-nights
+    ADR        average daily rate: revenue / sold room-nights
+    RevPAR     revenue per available room-night
+    pending    revenue of sold nights whose booking is not paid yet
+
+Bookings moved to the archive database (archive.py) are read too when the
+window reaches back into archived stays.
+"""
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+
+from archive import archived_through
+from metrics import timed
+from repository import get_connection
+
+
+GROUP_COLUMNS = {'room_type': 'room_type', 'category': 'category'}
+PERIODS = ['week', 'month', 'quarter']
+CHUNK_SIZE = 100_000
+
+# julianday() of a date at midnight is ordinal + 1721424.5; this turns it into date.toordinal()
+_JULIAN_OFFSET = 1721424
+
+ReportRow = namedtuple('ReportRow', ['period', 'group', 'rooms', 'available_nights', 'sold_nights',
+                                     'occupancy', 'revenue', 'adr', 'revpar', 'pending'])
+
+REPORT_HEADERS = ['Period', 'Group', 'Rooms', 'Available Nights', 'Sold Nights', 'Occupancy', 'Revenue',
+                  'ADR', 'RevPAR', 'Pending']
+# Display format of each ReportRow field in the admin table
+REPORT_FORMATS = [str, str, str, str, str, '{:.1%}'.format, '${:,.2f}'.format, '${:,.2f}'.format,
+                  '${:,.2f}'.format, '${:,.2f}'.format]
+
+
+def _room_arrays(cursor, group_by):
+    """Per-room lookup arrays indexed by room_id: group code (-1 for no room), nightly price, open flag."""
+    cursor.execute(f"SELECT room_id, IFNULL({GROUP_COLUMNS[group_by]}, ''), price, availability FROM rooms")
+    rooms = cursor.fetchall()
+    groups = sorted({room[1] for room in rooms})
+    size = max((room[0] for room in rooms), default=0) + 1
+    group_of = np.full(size, -1, dtype=np.int64)
+    price_of = np.zeros(size, dtype=np.float64)
+    open_of = np.zeros(size, dtype=bool)
+    codes = {group: code for code, group in enumerate(groups)}
+    for room_id, group, price, availability in rooms:
+        group_of[room_id] = codes[group]
+        price_of[room_id] = price or 0
+        open_of[room_id] = availability == 1
+    return groups, group_of, price_of, open_of
+
+
+def _periods(start, end, period):
+    """Period index of every night in [start, end), the period labels and the nights in each period."""
+    days = np.arange(np.datetime64(start, 'D'), np.datetime64(end, 'D'))
+    if period == 'week':
+        # datetime64 day 0 (1970-01-01) was a Thursday; shift so weeks start on Monday
+        keys = (days.astype(np.int64) + 3) // 7
+        labels = lambda key: str(np.datetime64(key * 7 - 3, 'D'))  # noqa: E731
+    elif period == 'month':
+        keys = days.astype('datetime64[M]').astype(np.int64)
+        labels = lambda key: str(np.datetime64(key, 'M'))  # noqa: E731
+    elif period == 'quarter':
+        keys = days.astype('datetime64[M]').astype(np.int64) // 3
+        labels = lambda key: f'{1970 + key // 4}-Q{key % 4 + 1}'  # noqa: E731
+    else:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    unique_keys, period_of_day, nights = np.unique(keys, return_inverse=True, return_counts=True)
+    return period_of_day, [labels(int(key)) for key in unique_keys], nights
+
+
+def _booking_columns(cursor, table, first_id, end_id, start, end):
+    """(room_id, check-in ordinal, check-out ordinal, unpaid flag, amount) arrays for bookings in `table` with
+    first_id <= booking_id < end_id that have a night in [start, end), or None if there are none. The amount is
+    -1 where none was recorded.
+
+    Each column comes back from SQLite as one comma-separated string and is
+    parsed by NumPy in C, which is several times faster than building a
+    Python tuple per row with fetchmany().
+    """
+    cursor.execute(f'''
+        SELECT COUNT(*),
+               group_concat(room_id),
+               group_concat(CAST(julianday(check_in) AS INTEGER) - {_JULIAN_OFFSET}),
+               group_concat(CAST(julianday(check_out) AS INTEGER) - {_JULIAN_OFFSET}),
+               group_concat(payment_status = 'Pending'),
+               group_concat(IFNULL(amount, -1))
+        FROM {table} b
+        WHERE booking_id >= ? AND booking_id < ? AND check_in < ? AND check_out > ? AND status != 'Cancelled'
+          {'' if table == 'main.bookings' else
+           'AND NOT EXISTS (SELECT 1 FROM main.bookings h WHERE h.booking_id = b.booking_id)'}
+    ''', (first_id, end_id, end.isoformat(), start.isoformat()))
+    count, *columns = cursor.fetchone()
+    if not count:
+        return None
+    *integers, amounts = columns
+    return ([np.fromstring(column, dtype=np.int64, sep=',') for column in integers]
+            + [np.fromstring(amounts, dtype=np.float64, sep=',')])
+
+
+def _chunks(cursor, tables, chunk_size):
+    # (table, first booking_id) of every chunk of chunk_size booking_ids in the tables
+    for table in tables:
+        cursor.execute(f'SELECT MIN(booking_id), MAX(booking_id) FROM {table}')
+        low, high = cursor.fetchone()
+        for chunk_start in range(low or 0, (high or 0) + 1, chunk_size):
+            yield table, chunk_start
+
+
+@timed('occupancy_report')
+def occupancy_report(start, end, group_by='room_type', period='month', chunk_size=CHUNK_SIZE):
+    """Occupancy, ADR, RevPAR and pending exposure per period and room group for nights in [start, end).
+
+    start and end are dates or 'YYYY-MM-DD' strings; group_by is 'room_type'
+    or 'category'. Returns ReportRows ordered by period, then group.
+    """
+    start = start if isinstance(start, date) else date.fromisoformat(start)
+    end = end if isinstance(end, date) else date.fromisoformat(end)
+    if end <= start:
+        raise ValueError("The report end date must be after its start date.")
+    if group_by not in GROUP_COLUMNS:
+        raise ValueError(f"group_by must be one of {', '.join(GROUP_COLUMNS)}")
+
+    period_of_day, labels, period_nights = _periods(start, end, period)
+    cursor = get_connection().cursor()
+    groups, group_of, price_of, open_of = _room_arrays(cursor, group_by)
+    cells = len(groups) * len(labels)
+    sold = np.zeros(cells, dtype=np.int64)
+    closed_sold = np.zeros(cells, dtype=np.int64)
+    revenue = np.zeros(cells, dtype=np.float64)
+    pending = np.zeros(cells, dtype=np.float64)
+
+    first, last = start.toordinal(), end.toordinal()
+    # archived_through() attaches the archive, if there is one
+    tables = ['main.bookings']
+    if (archived_through() or '') > start.isoformat():
+        tables.append('archive.bookings')
+    for table, chunk_start in _chunks(cursor, tables, chunk_size):
+        columns = _booking_columns(cursor, table, chunk_start, chunk_start + chunk_size, start, end)
+        if columns is None:
+            continue
+        room_ids, check_in, check_out, unpaid, amounts = columns
+        # Bookings of rooms that no longer exist have no group; leave them out
+        known = (room_ids >= 0) & (room_ids < len(group_of))
+        known[known] = group_of[room_ids[known]] >= 0
+        room_ids, check_in, check_out, unpaid, amounts = (room_ids[known], check_in[known], check_out[known],
+                                                          unpaid[known], amounts[known])
+        # Nightly rate of each booking, taken before the stay is clipped to the window
+        booking_rate = np.where(amounts >= 0, amounts / np.maximum(check_out - check_in, 1), price_of[room_ids])
+        # Clip stays to the window, then expand each booking into its nights
+        check_in = np.maximum(check_in, first) - first
+        nights = np.minimum(check_out, last) - first - check_in
+        booking_of_night = np.repeat(np.arange(len(room_ids)), nights)
+        offsets = np.arange(len(booking_of_night)) - np.repeat(np.cumsum(nights) - nights, nights)
+        day = check_in[booking_of_night] + offsets
+
+        night_rooms = room_ids[booking_of_night]
+        cell = group_of[night_rooms] * len(labels) + period_of_day[day]
+        rate = booking_rate[booking_of_night]
+        sold += np.bincount(cell, minlength=cells)
+        closed_sold += np.bincount(cell[~open_of[night_rooms]], minlength=cells)
+        revenue += np.bincount(cell, weights=rate, minlength=cells)
+        pending += np.bincount(cell, weights=rate * unpaid[booking_of_night], minlength=cells)
+
+    rooms_per_group = np.bincount(group_of[open_of], minlength=len(groups))
+    available = np.outer(rooms_per_group, period_nights).ravel() + closed_sold
+    with np.errstate(divide='ignore', invalid='ignore'):
+        occupancy = np.where(available > 0, sold / available, 0.0)
+        adr = np.where(sold > 0, revenue / sold, 0.0)
+        revpar = np.where(available > 0, revenue / available, 0.0)
+
+    report = []
+    for period_index, label in enumerate(labels):
+        for group_index, group in enumerate(groups):
+            i = group_index * len(labels) + period_index
+            report.append(ReportRow(label, group, int(rooms_per_group[group_index]), int(available[i]),
+                                    int(sold[i]), float(occupancy[i]), float(revenue[i]), float(adr[i]),
+                                    float(revpar[i]), float(pending[i])))
+    return report
@@ -0,0 +1,216 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+
+
+# Default database file, overridable with the HOTEL_DB_PATH environment variable
+DEFAULT_DB_PATH = 'hotel_management.db'
+
+# Seconds to wait on a locked database before raising "database is locked"
+BUSY_TIMEOUT = 5.0
+
+# Extra attempts made by run_with_retry() once busy_timeout has run out, and the first backoff delay
+BUSY_RETRIES = 6
+BUSY_BACKOFF = 0.02
+
+# Pragmas applied to every new connection
+PRAGMAS = {
+    'auto_vacuum': 'INCREMENTAL',  # new files only: lets archive.reclaim_space() free pages bit by bit
+    'journal_mode': 'WAL',      # readers no longer block the writer
+    'synchronous': 'NORMAL',    # safe with WAL, avoids an fsync per commit
+    'cache_size': -20000,       # negative value means KiB, so ~20 MB page cache
+    'mmap_size': 268435456,     # map up to 256 MB of the file into memory
+    'temp_store': 'MEMORY',
+}
+
+_db_path = os.environ.get('HOTEL_DB_PATH', DEFAULT_DB_PATH)
+_generation = 0
+_local = threading.local()
+_lock = threading.Lock()
+_connections = []
+
+
+def get_database_path():
+    """Return the path of the database file the calling thread is using."""
+    return getattr(_local, 'path', None) or _db_path
+
+
+def set_database_path(path):
+    """Point every module at another database file.
+
+    Connections opened for the previous path are reopened lazily by the
+    thread that owns them on its next call to get_connection().
+    """
+    global _db_path, _generation
+    with _lock:
+        _db_path = path
+        _generation += 1
+
+
+def _open_connection(path):
+    # isolation_level=None leaves transaction control to transaction() below; the metrics factory
+    # times every statement unless HOTEL_METRICS=0
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False,
+                           factory=metrics.connection_factory())
+    metrics.install(conn)
+    for name, value in PRAGMAS.items():
+        conn.execute(f'PRAGMA {name} = {value}')
+    return conn
+
+
+@contextmanager
+def using_database(path):
+    """Point the calling thread at another database file for the enclosed block.
+
+    Used to read or write one property's database (see properties.py)
+    without moving the rest of the process off its own. Each thread keeps
+    one open connection per file it has used this way. Blocks may nest.
+    """
+    previous = getattr(_local, 'path', None)
+    _local.path = path
+    try:
+        yield
+    finally:
+        _local.path = previous
+
+
+def _shard_connection(path):
+    # The calling thread's connection to a file picked with using_database()
+    shards = getattr(_local, 'shards', None)
+    if shards is None:
+        shards = _local.shards = {}
+    conn = shards.get(path)
+    if conn is None:
+        conn = shards[path] = _open_connection(path)
+        with _lock:
+            _connections.append(conn)
+    return conn
+
+
+def get_connection():
+    """Return the calling thread's shared connection, opening it on first use."""
+    path = getattr(_local, 'path', None)
+    if path is not None:
+        return _shard_connection(path)
+
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.generation == _generation:
+        return conn
+
+    if conn is not None:
+        close_connection()
+
+    with _lock:
+        path, generation = _db_path, _generation
+    conn = _open_connection(path)
+    _local.conn = conn
+    _local.generation = generation
+    with _lock:
+        _connections.append(conn)
+    return conn
+
+
+def close_connection():
+    """Close the calling thread's connections, if it has any."""
+    connections = list(getattr(_local, 'shards', {}).values())
+    _local.shards = {}
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        connections.append(conn)
+    _local.conn = None
+    for conn in connections:
+        with _lock:
+            if conn in _connections:
+                _connections.remove(conn)
+        conn.close()
+
+
+def close_database(path):
+    """Close the calling thread's connection to a file it used with using_database(), if it has one."""
+    conn = getattr(_local, 'shards', {}).pop(path, None)
+    if conn is not None:
+        with _lock:
+            if conn in _connections:
+                _connections.remove(conn)
+        conn.close()
+
+
+def close_all_connections():
+    """Close every connection handed out so far (used at shutdown and by benchmarks)."""
+    with _lock:
+        connections = list(_connections)
+        _connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _local.conn = None
+    _local.shards = {}
+
+
+@contextmanager
+def transaction(immediate=False):
+    """Run the enclosed statements in one transaction on the shared connection.
+
+    Yields a cursor. The transaction commits when the block exits normally and
+    rolls back on any exception. BEGIN IMMEDIATE takes the write lock up front,
+    which is what booking writes want. Nested use joins the outer transaction.
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn.cursor()
+        return
+
+    started = time.perf_counter()
+    try:
+        conn.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+    except sqlite3.OperationalError as e:
+        _count_busy(e)
+        raise
+    if immediate:
+        # BEGIN IMMEDIATE blocks (up to busy_timeout) until this connection holds the write lock
+        metrics.observe('hotel_lock_wait_seconds', '', time.perf_counter() - started)
+    try:
+        yield conn.cursor()
+    except BaseException as e:
+        _count_busy(e)
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+
+def is_busy_error(error):
+    """True for SQLITE_BUSY/SQLITE_LOCKED ("database is locked") errors."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+def _count_busy(error):
+    if is_busy_error(error):
+        metrics.count('hotel_sqlite_busy_total', 'error')
+
+
+def run_with_retry(operation, retries=None, backoff=None):
+    """Call operation(), retrying with jittered exponential backoff while the database is busy."""
+    retries = BUSY_RETRIES if retries is None else retries
+    delay = BUSY_BACKOFF if backoff is None else backoff
+    for attempt in range(retries + 1):
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if attempt == retries or not is_busy_error(e):
+                raise
+        metrics.count('hotel_sqlite_busy_total', 'retry')
+        time.sleep(delay * (1 + random.random()))
+        delay *= 2
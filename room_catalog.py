@@ -0,0 +1,110 @@
+import threading
+from collections import OrderedDict
+
+from availability import CACHED_DATABASES, free_room_ids, index as availability_index
+from repository import get_connection, get_database_path, transaction
+
+
+# Columns kept in the catalog, in row order
+CATALOG_COLUMNS = ['room_id', 'room_type', 'price', 'bed_count', 'level', 'category', 'description']
+
+
+class RoomCatalog:
+    """Process-wide cache of room metadata keyed on room_id.
+
+    Room details almost never change, so they are loaded once and reused
+    until a write hits the rooms table. Our own write paths call
+    invalidate(). Writes from other connections or processes are noticed
+    through PRAGMA data_version (free to read, changes only when someone else
+    commits) and then confirmed against catalog_meta.version, which triggers
+    bump on every rooms change, so booking traffic elsewhere does not evict
+    the catalog. Like the night index, it keeps the rooms of the
+    CACHED_DATABASES database files used most recently.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._entries = OrderedDict()  # database path -> (rooms, catalog version), least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    def _catalog_version(self, conn):
+        return conn.execute('SELECT version FROM catalog_meta').fetchone()[0]
+
+    def _seen(self):
+        # The calling thread's last (connection, data_version) per database path
+        seen = getattr(self._local, 'seen', None)
+        if seen is None:
+            seen = self._local.seen = {}
+        return seen
+
+    def _is_current(self, conn, path):
+        entry = self._entries.get(path)
+        if entry is None:
+            return False
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        seen = (id(conn), data_version)
+        if self._seen().get(path) == seen:
+            return True
+        # Another connection committed something; only a rooms change matters
+        self._seen()[path] = seen
+        return entry[1] == self._catalog_version(conn)
+
+    def rooms(self):
+        """All rooms as {room_id: (room_id, room_type, price, bed_count, level, category, description)}."""
+        conn = get_connection()
+        path = get_database_path()
+        with self._lock:
+            if self._is_current(conn, path):
+                self.hits += 1
+                self._entries.move_to_end(path)
+                return self._entries[path][0]
+
+            self.misses += 1
+            with transaction() as cursor:
+                version = self._catalog_version(conn)
+                cursor.execute(f"SELECT {', '.join(CATALOG_COLUMNS)} FROM rooms ORDER BY room_id")
+                rows = cursor.fetchall()
+                data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+            rooms = {row[0]: row for row in rows}
+            self._entries[path] = (rooms, version)
+            self._entries.move_to_end(path)
+            while len(self._entries) > CACHED_DATABASES:
+                self._entries.popitem(last=False)
+            self._seen()[path] = (id(conn), data_version)
+            return rooms
+
+    def get(self, room_id):
+        return self.rooms().get(room_id)
+
+    def invalidate(self):
+        """Drop the cached rooms; called by code paths that write to the rooms table."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            rooms = sum(len(rooms) for rooms, _ in self._entries.values())
+        return {'hits': self.hits, 'misses': self.misses, 'rooms': rooms, 'databases': len(self._entries)}
+
+
+catalog = RoomCatalog()
+
+
+def available_rooms(check_in=None, check_out=None):
+    """Catalog rows of rooms open for sale and free every night of the stay (default: tonight).
+
+    The metadata comes from the cache; only availability is looked up, from
+    the in-memory night index.
+    """
+    rooms = catalog.rooms()
+    return [rooms[room_id] for room_id in free_room_ids(check_in, check_out) if room_id in rooms]
+
+
+def room_status(check_in=None, check_out=None):
+    """{room_id: 'Free', 'Booked' or 'Closed'} for a stay (default: tonight)."""
+    free = set(free_room_ids(check_in, check_out))
+    open_rooms = availability_index.open_rooms()
+    return {room_id: 'Free' if room_id in free else 'Booked' if room_id in open_rooms else 'Closed'
+            for room_id in catalog.rooms()}
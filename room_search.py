@@ -0,0 +1,149 @@
+"""Faceted room search: open rooms free for a stay, filtered by price, beds, level and category.
+
+Filtering, ordering and facet counts run in SQL on the composite indexes
+from migration 10. Which rooms are free for the stay comes from the
+in-memory night index (availability.free_room_ids) and is passed to the
+query as a JSON list of whichever is shorter, the free or the booked room
+IDs; probing room_nights from SQL instead costs a lookup per room.
+
+    python room_search.py --category "Luxury Room" --min-beds 2 --sort price_desc
+"""
+import argparse
+import json
+from bisect import bisect_right
+from collections import namedtuple
+
+from availability import booked_room_ids, free_room_ids, index as availability_index
+from listings import PAGE_SIZE, keyset_page
+from repository import transaction
+from room_catalog import CATALOG_COLUMNS
+
+
+# `rows` are catalog rows (room_catalog.CATALOG_COLUMNS); `after` as in listings.Page; `facets` is None unless
+# asked for, else {'category': {category: rooms}, 'price': {band lower bound: rooms}}
+RoomSearch = namedtuple('RoomSearch', ['rows', 'after', 'facets'])
+
+# Sort options as (column, descending); ties are broken by room_id
+SORTS = {
+    'price': ('price', False),
+    'price_desc': ('price', True),
+    'level': ('level', False),
+}
+
+# Lower bounds of the price bands in the facet counts; each band runs up to the next bound
+PRICE_BANDS = [0, 75, 125, 200]
+
+# Filter name -> SQL condition. The price range is [min_price, max_price), so a band from PRICE_BANDS can be
+# passed as it is
+FILTERS = {
+    'min_price': 'price >= ?',
+    'max_price': 'price < ?',
+    'min_beds': 'bed_count >= ?',
+    'level': 'level = ?',
+    'category': 'category = ?',
+}
+
+def price_band_label(bound):
+    """'Under $75', '$75-$125' or '$200 and up' for a lower bound from PRICE_BANDS."""
+    position = PRICE_BANDS.index(bound)
+    if position == len(PRICE_BANDS) - 1:
+        return f'${bound} and up'
+    upper = PRICE_BANDS[position + 1]
+    return f'Under ${upper}' if position == 0 else f'${bound}-${upper}'
+
+
+def price_band_range(bound):
+    """(min_price, max_price) filter values for a price band, max_price None for the last band."""
+    position = PRICE_BANDS.index(bound)
+    return bound, PRICE_BANDS[position + 1] if position + 1 < len(PRICE_BANDS) else None
+
+
+def _conditions(filters):
+    # SQL for the filters that are set, ANDed ('1' when none are), and their parameters
+    for name in filters:
+        if name not in FILTERS:
+            raise TypeError(f"Unknown room filter: {name}")
+    names = [name for name, value in filters.items() if value is not None]
+    return ' AND '.join(FILTERS[name] for name in names) or '1', [filters[name] for name in names]
+
+
+def room_filters(**filters):
+    """WHERE conditions and parameters for the room search filters that are set (None means unset).
+
+    Only rooms open for sale are ever matched.
+    """
+    condition, params = _conditions(filters)
+    return ['availability = 1', condition] if params else ['availability = 1'], params
+
+
+def stay_filter(check_in=None, check_out=None):
+    """WHERE condition and parameter limiting a rooms query to rooms free for the stay (default: tonight)."""
+    booked = booked_room_ids(check_in, check_out)
+    if len(booked) <= availability_index.open_count() // 2:
+        return 'room_id NOT IN (SELECT value FROM json_each(?))', json.dumps(booked)
+    return 'room_id IN (SELECT value FROM json_each(?))', json.dumps(free_room_ids(check_in, check_out))
+
+
+def facet_counts(cursor, stay, **filters):
+    """Matching rooms per category and per price band.
+
+    Each facet applies every filter except its own, so the counts say how
+    many rooms picking that value would show. One pass over the covering
+    index grouped by (category, price) serves both: a group's rooms that
+    pass the price filters count toward its category, and the ones that
+    pass the category filter toward its price band.
+    """
+    price_test, price_params = _conditions({name: filters.pop(name, None) for name in ('min_price', 'max_price')})
+    category_test, category_params = _conditions({'category': filters.pop('category', None)})
+    where, params = room_filters(**filters)
+    cursor.execute(f"""
+        SELECT category, price, SUM({price_test}), SUM({category_test}) FROM rooms
+        WHERE {' AND '.join([*where, stay[0]])} GROUP BY category, price
+    """, (*price_params, *category_params, *params, stay[1]))
+    categories, bands = {}, {}
+    for category, price, for_category, for_price in cursor.fetchall():
+        band = PRICE_BANDS[max(bisect_right(PRICE_BANDS, price) - 1, 0)]
+        categories[category] = categories.get(category, 0) + for_category
+        bands[band] = bands.get(band, 0) + for_price
+    return {'category': {category: rooms for category, rooms in categories.items() if rooms},
+            'price': {band: rooms for band, rooms in sorted(bands.items()) if rooms}}
+
+
+def search_rooms(check_in=None, check_out=None, sort='price', after=None, limit=PAGE_SIZE, facets=False, **filters):
+    """One page of open rooms free every night of the stay (default: tonight), as a RoomSearch.
+
+    `filters` are min_price, max_price, min_beds, level and category; `sort`
+    is a key of SORTS. Pass the returned `after` back for the next page.
+    With facets=True the counts per category and price band for the whole
+    search come back too.
+    """
+    column, descending = SORTS[sort]
+    where, params = room_filters(**filters)
+    stay = stay_filter(check_in, check_out)
+    # One read transaction, so the page and the counts agree
+    with transaction() as cursor:
+        page = keyset_page(CATALOG_COLUMNS, 'rooms', 'room_id', column, after, limit, descending,
+                           [*where, stay[0]], [*params, stay[1]])
+        counts = facet_counts(cursor, stay, **filters) if facets else None
+    return RoomSearch(page.rows, page.after, counts)
+
+
+if __name__ == '__main__':
+    from migrations import migrate
+    parser = argparse.ArgumentParser(description='Search rooms free for a stay.')
+    parser.add_argument('--check-in')
+    parser.add_argument('--check-out')
+    parser.add_argument('--min-price', type=float)
+    parser.add_argument('--max-price', type=float)
+    parser.add_argument('--min-beds', type=int)
+    parser.add_argument('--level', type=int)
+    parser.add_argument('--category')
+    parser.add_argument('--sort', choices=sorted(SORTS), default='price')
+    args = parser.parse_args()
+    migrate()
+    filters = {name: getattr(args, name) for name in FILTERS}
+    found = search_rooms(args.check_in, args.check_out, args.sort, facets=True, **filters)
+    for room in found.rows:
+        print(f"Room {room[0]}: {room[5]}, ${room[2]:.2f}, {room[3]} bed(s), level {room[4]}")
+    print('Categories: ' + ', '.join(f'{category} ({rooms})' for category, rooms in found.facets['category'].items()))
+    print('Prices: ' + ', '.join(f'{price_band_label(bound)} ({rooms})' for bound, rooms in found.facets['price'].items()))
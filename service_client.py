@@ -0,0 +1,173 @@
+import itertools
+import json
+import os
+import socket
+import threading
+
+from availability import BookingResult
+from booking_service import DEFAULT_HOST, DEFAULT_PORT, MAX_CANCEL_IDS
+from room_catalog import CATALOG_COLUMNS
+from room_search import RoomSearch
+
+
+class ServiceError(Exception):
+    """The booking service could not be reached or refused a request."""
+
+
+class ServiceClient:
+    """Blocking client for booking_service, for the GUIs' client mode.
+
+    Safe to share between threads: each thread gets its own socket, so
+    auth workers and the GUI thread never interleave their requests. The
+    methods return the same values as the local functions they replace.
+
+    login() keeps the session token the service hands out, and later
+    book_room()/view_bookings() calls for that client send it instead of
+    the bare client_id.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=30.0, admin_key=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        # Sent by cancel_bookings() without a client; see booking_service.py
+        self.admin_key = admin_key if admin_key is not None else os.environ.get('HOTEL_ADMIN_KEY')
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self._tokens = {}  # client_id -> session token from login()
+
+    @classmethod
+    def from_address(cls, address):
+        """Build a client from 'host:port', 'host' or ':port'."""
+        host, _, port = address.partition(':')
+        return cls(host or DEFAULT_HOST, int(port) if port else DEFAULT_PORT)
+
+    def _stream(self):
+        stream = getattr(self._local, 'stream', None)
+        if stream is None:
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            except OSError as e:
+                raise ServiceError(f'Cannot reach the booking service at {self.host}:{self.port}: {e}')
+            stream = self._local.stream = sock.makefile('rwb')
+        return stream
+
+    def close(self):
+        """Close the calling thread's connection."""
+        stream = getattr(self._local, 'stream', None)
+        if stream is not None:
+            self._local.stream = None
+            stream.close()
+
+    def call(self, op, **args):
+        """Send one request and return its result, raising ServiceError if it failed."""
+        request_id = next(self._ids)
+        stream = self._stream()
+        try:
+            stream.write(json.dumps({'id': request_id, 'op': op, 'args': args}).encode('utf-8') + b'\n')
+            stream.flush()
+            line = stream.readline()
+        except OSError as e:
+            self.close()
+            raise ServiceError(f'Lost connection to the booking service: {e}')
+        if not line:
+            self.close()
+            raise ServiceError('The booking service closed the connection.')
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise ServiceError(response.get('error', 'Request failed.'))
+        return response['result']
+
+    def ping(self):
+        return self.call('ping') == 'pong'
+
+    def sign_up(self, name, email, phone, password):
+        """Returns the new client_id, or None if the email or phone is already registered."""
+        return self.call('sign_up', name=name, email=email, phone=phone, password=password)['client_id']
+
+    def login(self, email, password):
+        """Returns (client_id, name), or None when the email or password is wrong."""
+        client = self.call('login', email=email, password=password)
+        if not client:
+            return None
+        self._tokens[client['client_id']] = client['token']
+        return client['client_id'], client['name']
+
+    def logout(self, client_id):
+        token = self._tokens.pop(client_id, None)
+        if token is not None:
+            self.call('logout', token=token)
+
+    def _identity(self, client_id):
+        token = self._tokens.get(client_id)
+        return {'token': token} if token is not None else {'client_id': client_id}
+
+    def search_rooms(self, check_in=None, check_out=None):
+        """Catalog rows (as room_catalog.available_rooms) free for every night of the stay."""
+        rooms = self.call('search_rooms', check_in=_iso(check_in), check_out=_iso(check_out))
+        return [tuple(room[column] for column in CATALOG_COLUMNS) for room in rooms]
+
+    def room_search(self, check_in=None, check_out=None, sort='price', after=None, limit=None, facets=False,
+                    **filters):
+        """A RoomSearch, like room_search.search_rooms."""
+        args = {'check_in': _iso(check_in), 'check_out': _iso(check_out), 'sort': sort, 'after': after,
+                'facets': facets, **filters}
+        if limit is not None:
+            args['limit'] = limit
+        found = self.call('room_search', **args)
+        facets = found['facets'] and {name: dict(values) for name, values in found['facets'].items()}
+        return RoomSearch([tuple(row) for row in found['rows']], found['after'] and tuple(found['after']), facets)
+
+    def quote_rooms(self, room_ids, check_in=None, check_out=None):
+        """{room_id: price of the stay}, like pricing.quote_rooms."""
+        return dict(self.call('quote_rooms', room_ids=list(room_ids), check_in=_iso(check_in),
+                              check_out=_iso(check_out)))
+
+    def book_room(self, client_id, room_id, check_in=None, check_out=None):
+        """Returns a BookingResult."""
+        return BookingResult(**self.call('book_room', room_id=room_id, check_in=_iso(check_in),
+                                         check_out=_iso(check_out), **self._identity(client_id)))
+
+    def cancel_bookings(self, booking_ids, client_id=None):
+        """Freed room_id (or None) per booking ID, like database.cancel_bookings_batch.
+
+        With client_id only that client's bookings are cancelled; without, the admin key is sent.
+        Long lists go in requests of MAX_CANCEL_IDS, the most the service takes at once.
+        """
+        if client_id is not None:
+            identity = self._identity(client_id)
+        elif self.admin_key:
+            identity = {'admin_key': self.admin_key}
+        else:
+            raise ServiceError('Cancelling bookings through the service needs HOTEL_ADMIN_KEY.')
+        booking_ids = list(booking_ids)
+        freed = []
+        for start in range(0, len(booking_ids), MAX_CANCEL_IDS):
+            freed += self.call('cancel_bookings', booking_ids=booking_ids[start:start + MAX_CANCEL_IDS], **identity)
+        return freed
+
+    def view_bookings(self, client_id, after=None, limit=None):
+        """One page of the client's bookings as (rows, after)."""
+        args = {'after': after, **self._identity(client_id)}
+        if limit is not None:
+            args['limit'] = limit
+        page = self.call('view_bookings', **args)
+        return [tuple(row) for row in page['rows']], page['after'] and tuple(page['after'])
+
+    def metrics(self, format='json'):
+        """The service's metrics: a dict, or Prometheus text with format='prometheus'."""
+        return self.call('metrics', format=format)
+
+
+def _iso(value):
+    return value if value is None or isinstance(value, str) else value.isoformat()
+
+
+def service_from_args(argv):
+    """ServiceClient for a '--connect HOST:PORT' argument or the HOTEL_SERVICE variable, else None."""
+    if '--connect' in argv:
+        position = argv.index('--connect')
+        if position + 1 < len(argv):
+            return ServiceClient.from_address(argv[position + 1])
+    address = os.environ.get('HOTEL_SERVICE')
+    return ServiceClient.from_address(address) if address else None
@@ -0,0 +1,115 @@
+"""Session tokens, so bcrypt runs once at login instead of on every request.
+
+A successful login gets an opaque random token. book_room and
+view_bookings accept it instead of a client_id, and resolving it is a
+dictionary lookup. Tokens expire a fixed time after they were issued
+(no sliding renewal). The in-memory store is bounded: past max_sessions
+the least recently used token is dropped.
+
+With persistent=True every token is also written to the sessions table
+(migration 7). A token evicted from memory, or issued by another process
+or before a restart, is then read back from the database on first use.
+Only a SHA-256 digest of each token is stored, in memory and on disk, so a
+copy of the database does not hand out live sessions.
+"""
+import hashlib
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from repository import get_connection, run_with_retry, transaction
+
+
+SESSION_TTL = 12 * 60 * 60  # seconds a token stays valid after login
+MAX_SESSIONS = 10_000       # tokens kept in memory per store
+
+
+def _digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class SessionStore:
+    """Thread-safe token -> client_id map with a TTL and an LRU bound, optionally backed by SQLite."""
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS, persistent=False):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.persistent = persistent
+        self._sessions = OrderedDict()  # token digest -> (client_id, expires_at), least recently used first
+        self._lock = threading.Lock()
+
+    def _remember(self, key, client_id, expires_at):
+        with self._lock:
+            self._sessions[key] = (client_id, expires_at)
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def issue(self, client_id):
+        """Start a session for an authenticated client and return its token."""
+        token = secrets.token_urlsafe(32)
+        key = _digest(token)
+        now = time.time()
+        expires_at = now + self.ttl
+        if self.persistent:
+            def store():
+                with transaction(immediate=True) as cursor:
+                    # Expired rows are cleared as new ones arrive, so the table stays small
+                    cursor.execute('DELETE FROM sessions WHERE expires_at <= ?', (now,))
+                    cursor.execute('INSERT INTO sessions (token_hash, client_id, expires_at) VALUES (?, ?, ?)',
+                                   (key, client_id, expires_at))
+            run_with_retry(store)
+        self._remember(key, client_id, expires_at)
+        return token
+
+    def client_id(self, token):
+        """The client_id a token belongs to, or None if it is unknown, revoked or expired."""
+        if not isinstance(token, str) or not token:
+            return None
+        key = _digest(token)
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None:
+                if session[1] > now:
+                    self._sessions.move_to_end(key)
+                    return session[0]
+                del self._sessions[key]
+        if not self.persistent:
+            return None
+        cursor = get_connection().cursor()
+        cursor.execute('SELECT client_id, expires_at FROM sessions WHERE token_hash = ? AND expires_at > ?',
+                       (key, now))
+        session = cursor.fetchone()
+        if session is None:
+            return None
+        self._remember(key, *session)
+        return session[0]
+
+    def revoke(self, token):
+        """End one session (logout)."""
+        key = _digest(token)
+        with self._lock:
+            self._sessions.pop(key, None)
+        if self.persistent:
+            run_with_retry(lambda: self._delete('token_hash = ?', key))
+
+    def revoke_client(self, client_id):
+        """End every session of a client, e.g. after a password change."""
+        with self._lock:
+            for key in [key for key, session in self._sessions.items() if session[0] == client_id]:
+                del self._sessions[key]
+        if self.persistent:
+            run_with_retry(lambda: self._delete('client_id = ?', client_id))
+
+    def _delete(self, condition, value):
+        with transaction(immediate=True) as cursor:
+            cursor.execute(f'DELETE FROM sessions WHERE {condition}', (value,))
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+# Sessions of this process (database.login_client); the booking service keeps its own store
+store = SessionStore()
@@ -0,0 +1,233 @@
+"""Point-in-time copies of the database for reports and exports, made with the SQLite online backup API.
+
+A report or export reads many pages over seconds. On the live file that
+holds back WAL checkpoints and competes with booking writers for I/O, and
+a report that reads in chunks can see a booking half way through a write.
+Reads wrapped in reading() run against a snapshot instead: a copy of the
+database (and of its archive, see archive.py) that is at most
+HOTEL_SNAPSHOT_MAX_AGE seconds old, taken on the spot when the newest one
+is older.
+
+take_snapshot() opens one read transaction on the live file and its archive
+and copies them with Connection.backup(), STEP_PAGES pages per step. In WAL
+mode the read transaction never blocks writers, and because it pins the
+version being copied the backup does not restart when they commit, so
+every snapshot is consistent. Snapshots are written under a temporary name
+and renamed when complete; the newest KEEP_SNAPSHOTS are kept. Each one is
+also a hot backup: with the apps stopped, copying a snapshot file (and its
+_archive file) over the live ones restores the database as it was then.
+
+Snapshots go to a snapshots directory next to the database, or to
+HOTEL_SNAPSHOT_DIR, and are named after the database file and the time
+they were taken (hotel_management-20260101-120000-000000.db).
+
+    python snapshots.py [--every SECONDS] [--keep N]
+    python snapshots.py --list
+"""
+import argparse
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.request import pathname2url
+
+import metrics
+from archive import archive_path
+from repository import BUSY_TIMEOUT, close_database, get_database_path, using_database
+
+
+# Oldest snapshot reading() accepts, in seconds, overridable with the HOTEL_SNAPSHOT_MAX_AGE environment variable
+MAX_AGE = float(os.environ.get('HOTEL_SNAPSHOT_MAX_AGE', 300))
+
+# Snapshots kept per database; older ones are deleted after each new one
+KEEP_SNAPSHOTS = 3
+
+# Pages copied per backup step (4 MB with the default 4 KB pages)
+STEP_PAGES = 1024
+
+STAMP_FORMAT = '%Y%m%d-%H%M%S-%f'
+PARTIAL = '.partial'
+
+# `taken` is the time.time() at which the copied version of the database was current
+Snapshot = namedtuple('Snapshot', ['path', 'taken'])
+
+_lock = threading.Lock()
+_path_locks = {}  # database path -> lock held while a snapshot of it is checked or taken
+
+
+def snapshot_dir(path=None):
+    """Directory holding the snapshots of a database file (default: the one in use)."""
+    path = path or get_database_path()
+    return os.environ.get('HOTEL_SNAPSHOT_DIR') or os.path.join(os.path.dirname(path), 'snapshots')
+
+
+def list_snapshots(path=None):
+    """Complete snapshots of a database file (default: the one in use), oldest first."""
+    path = path or get_database_path()
+    directory = snapshot_dir(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    pattern = re.compile(rf'{re.escape(stem)}-(\d{{8}}-\d{{6}}-\d{{6}})\.db')
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    found = []
+    for name in names:
+        match = pattern.fullmatch(name)
+        if match:
+            taken = datetime.strptime(match.group(1), STAMP_FORMAT).timestamp()
+            found.append(Snapshot(os.path.join(directory, name), taken))
+    return sorted(found, key=lambda snapshot: snapshot.taken)
+
+
+def newest_snapshot(path=None):
+    snapshots = list_snapshots(path)
+    return snapshots[-1] if snapshots else None
+
+
+def snapshot_age(snapshot=None):
+    """Seconds since a snapshot (default: the newest of the database in use) was taken; None without one."""
+    snapshot = snapshot or newest_snapshot()
+    return None if snapshot is None else max(time.time() - snapshot.taken, 0.0)
+
+
+def _copy(source, schema, target, pages):
+    destination = sqlite3.connect(target)
+    try:
+        source.backup(destination, pages=pages, name=schema)
+    finally:
+        destination.close()
+
+
+def take_snapshot(pages=STEP_PAGES):
+    """Copy the database in use, and its archive if it has one, to a new snapshot; returns the Snapshot."""
+    live = get_database_path()
+    directory = snapshot_dir(live)
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    # mode=rw: a missing database is an error rather than a new empty file
+    source = sqlite3.connect(f'file:{pathname2url(os.path.abspath(live))}?mode=rw', uri=True,
+                             timeout=BUSY_TIMEOUT, isolation_level=None)
+    copies = []
+    try:
+        archived = os.path.exists(archive_path(live))
+        if archived:
+            source.execute('ATTACH DATABASE ? AS archive', (archive_path(live),))
+        # One read transaction over both files, the live one first: a booking moved to the archive in between
+        # is then in both copies, which readers of the archive skip, never in neither
+        source.execute('BEGIN')
+        source.execute('SELECT COUNT(*) FROM main.sqlite_master').fetchone()
+        if archived:
+            source.execute('SELECT COUNT(*) FROM archive.sqlite_master').fetchone()
+        taken = datetime.now()
+        stem = os.path.splitext(os.path.basename(live))[0]
+        path = os.path.join(directory, f'{stem}-{taken.strftime(STAMP_FORMAT)}.db')
+        copies.append(('main', path))
+        if archived:
+            copies.append(('archive', archive_path(path)))
+        for schema, target in copies:
+            _copy(source, schema, target + PARTIAL, pages)
+        source.execute('COMMIT')
+    except BaseException:
+        for _, target in copies:
+            try:
+                os.remove(target + PARTIAL)
+            except OSError:
+                pass
+        raise
+    finally:
+        source.close()
+    # The archive copy goes into place first, so a snapshot is never listed without it
+    for _, target in reversed(copies):
+        os.replace(target + PARTIAL, target)
+    metrics.observe('hotel_snapshot_seconds', '', time.perf_counter() - started)
+    return Snapshot(path, taken.timestamp())
+
+
+def prune_snapshots(keep=KEEP_SNAPSHOTS, path=None):
+    """Delete all but the newest `keep` snapshots; files still open elsewhere (on Windows) are left for next time."""
+    def remove(name):
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(name + suffix)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                return False
+        return True
+
+    for snapshot in list_snapshots(path)[:-keep or None]:
+        # The snapshot file goes first, so one that stays is never without its archive copy
+        if remove(snapshot.path):
+            remove(archive_path(snapshot.path))
+
+
+def fresh_snapshot(max_age=None):
+    """The newest snapshot of the database in use, after taking a new one if it is older than max_age seconds."""
+    max_age = MAX_AGE if max_age is None else max_age
+    # One thread takes the snapshot of a database; the others wait and use it. Other databases (properties)
+    # are snapshotted in parallel
+    with _lock:
+        path_lock = _path_locks.setdefault(get_database_path(), threading.Lock())
+    with path_lock:
+        snapshot = newest_snapshot()
+        if snapshot is None or snapshot_age(snapshot) > max_age:
+            snapshot = take_snapshot()
+            prune_snapshots()
+    return snapshot
+
+
+@contextmanager
+def reading(max_age=None):
+    """Point the calling thread at a snapshot no older than max_age seconds for the enclosed block.
+
+    Yields the Snapshot. Writes made in the block would go to the snapshot
+    and be lost, so only reports and exports belong here.
+    """
+    snapshot = fresh_snapshot(max_age)
+    with using_database(snapshot.path):
+        try:
+            yield snapshot
+        finally:
+            close_database(snapshot.path)
+
+
+def from_snapshot(function, *args, max_age=None, **kwargs):
+    """Call function(*args, **kwargs) with its reads going to a snapshot at most max_age seconds old."""
+    with reading(max_age):
+        return function(*args, **kwargs)
+
+
+def format_age(seconds):
+    """A snapshot age for display: '40 s', '12 min', '3 h'."""
+    if seconds < 60:
+        return f'{seconds:.0f} s'
+    if seconds < 3600:
+        return f'{seconds / 60:.0f} min'
+    return f'{seconds / 3600:.0f} h'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Take reporting snapshots (hot backups) of the database.')
+    parser.add_argument('--every', type=float, help='keep running, taking a snapshot every this many seconds')
+    parser.add_argument('--keep', type=int, default=KEEP_SNAPSHOTS, help='snapshots kept (default: %(default)s)')
+    parser.add_argument('--list', action='store_true', help='list the snapshots and exit')
+    args = parser.parse_args()
+    if args.list:
+        for snapshot in list_snapshots():
+            print(f"{snapshot.path} ({format_age(snapshot_age(snapshot))} old)")
+    else:
+        while True:
+            try:
+                snapshot = take_snapshot()
+                prune_snapshots(args.keep)
+                print(f"Snapshot {snapshot.path}", flush=True)
+            except (sqlite3.Error, OSError) as e:
+                print(f"Snapshot failed: {e}", flush=True)
+            if not args.every:
+                break
+            time.sleep(args.every)
@@ -0,0 +1,96 @@
+"""Dashboard counters read from trigger-maintained summary tables.
+
+room_type_counts and booking_status_counts (migration 6) are updated by
+triggers on every insert, update or delete of rooms and bookings, whoever
+makes the write, so reading them costs the same at any table size. Rooms
+free tonight come from the in-memory night index (availability.py) instead:
+which night is tonight changes without any write for a trigger to see.
+
+    python summaries.py            print the dashboard counters
+    python summaries.py --verify   recount from scratch and report any drift (exit 1 on drift)
+    python summaries.py --rebuild  recount from scratch and overwrite the summary tables
+"""
+import sys
+from collections import Counter, namedtuple
+
+from availability import free_room_ids
+from repository import get_connection, transaction
+from room_catalog import catalog
+
+
+Drift = namedtuple('Drift', ['table', 'key', 'stored', 'actual'])
+
+# Summary table -> (key columns, count columns, query that recomputes it from the base table)
+SUMMARIES = {
+    'room_type_counts': (['room_type'], ['rooms'], '''
+        SELECT IFNULL(room_type, ''), COUNT(*) FROM rooms GROUP BY IFNULL(room_type, '')
+    '''),
+    'booking_status_counts': (['status', 'payment_status'], ['bookings'], '''
+        SELECT status, payment_status, COUNT(*) FROM bookings GROUP BY status, payment_status
+    '''),
+}
+
+
+def dashboard_counts():
+    """Rooms and rooms free tonight per type, bookings per status, and bookings awaiting payment."""
+    rooms = catalog.rooms()
+    free = Counter(rooms[room_id][1] or '' for room_id in free_room_ids() if room_id in rooms)
+    cursor = get_connection().cursor()
+    cursor.execute('SELECT room_type, rooms FROM room_type_counts WHERE rooms > 0 ORDER BY room_type')
+    room_types = {room_type: (total, free[room_type]) for room_type, total in cursor.fetchall()}
+    cursor.execute('SELECT status, SUM(bookings) FROM booking_status_counts GROUP BY status HAVING SUM(bookings) > 0')
+    statuses = dict(cursor.fetchall())
+    cursor.execute("SELECT IFNULL(SUM(bookings), 0) FROM booking_status_counts WHERE payment_status = 'Pending'")
+    pending = cursor.fetchone()[0]
+    return {'room_types': room_types, 'statuses': statuses, 'pending_payments': pending}
+
+
+def _rows(cursor, sql, keys):
+    # {key tuple: count tuple}, leaving out all-zero rows (stored rows reach zero and stay)
+    cursor.execute(sql)
+    return {tuple(row[:keys]): tuple(row[keys:]) for row in cursor.fetchall() if any(row[keys:])}
+
+
+def verify_summaries():
+    """Recount every summary from its base table and return the differences as Drift tuples."""
+    drift = []
+    with transaction() as cursor:  # one snapshot for stored and recounted values
+        for table, (keys, counts, recount) in SUMMARIES.items():
+            stored = _rows(cursor, f"SELECT {', '.join(keys + counts)} FROM {table}", len(keys))
+            actual = _rows(cursor, recount, len(keys))
+            for key in sorted(stored.keys() | actual.keys()):
+                if stored.get(key) != actual.get(key):
+                    drift.append(Drift(table, key, stored.get(key), actual.get(key)))
+    return drift
+
+
+def rebuild_summaries():
+    """Throw the summary tables away and recount them; returns the drift that was repaired."""
+    with transaction(immediate=True) as cursor:
+        drift = verify_summaries()
+        for table, (keys, counts, recount) in SUMMARIES.items():
+            cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(f"INSERT INTO {table} ({', '.join(keys + counts)}) {recount}")
+    return drift
+
+
+if __name__ == '__main__':
+    from migrations import migrate
+    migrate()
+    if '--verify' in sys.argv or '--rebuild' in sys.argv:
+        drift = rebuild_summaries() if '--rebuild' in sys.argv else verify_summaries()
+        for table, key, stored, actual in drift:
+            print(f"{table} {key}: stored {stored}, actual {actual}")
+        if '--rebuild' in sys.argv:
+            print(f"Rebuilt summary tables ({len(drift)} rows differed).")
+        elif drift:
+            sys.exit(1)
+        else:
+            print("Summary tables match the base tables.")
+    else:
+        counts = dashboard_counts()
+        for room_type, (rooms, free) in counts['room_types'].items():
+            print(f"{room_type}: {free} of {rooms} rooms free tonight")
+        for status, bookings in counts['statuses'].items():
+            print(f"{status}: {bookings} bookings")
+        print(f"Awaiting payment: {counts['pending_payments']} bookings")
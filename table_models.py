@@ -0,0 +1,284 @@
+from PyQt5.QtCore import QAbstractTableModel, QEvent, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionButton
+
+from listings import keyset_page, rows_by_key
+
+
+def _sqlite_order(value):
+    # Sort key that orders mixed values the way SQLite does: NULL, numbers, text, blobs
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, value) if isinstance(value, str) else (3, value)
+
+
+class SqlTableModel(QAbstractTableModel):
+    """Read-only table model that pages rows in from SQL as the view scrolls.
+
+    Only the rows the view has asked for are fetched (canFetchMore/fetchMore),
+    one keyset page at a time, so opening or scrolling a table with hundreds
+    of thousands of rows costs the same as a small one. Sorting re-runs the
+    query with an ORDER BY instead of sorting in Qt.
+
+    `columns` are the SQL expressions shown, `from_clause` what they are
+    selected from, `key` a unique column used to seek past the last row, and
+    `where`/`params` optional filter conditions.
+
+    apply_changes() patches individual rows into the loaded ones after a
+    write, so a live view updates without losing its selection or scroll
+    position.
+    """
+
+    BATCH_SIZE = 256
+
+    def __init__(self, columns, from_clause, headers, key, where=(), params=(), parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.from_clause = from_clause
+        self.headers = headers
+        self.key = key
+        self.where = list(where)
+        self.params = list(params)
+        self.sort_column = None
+        self.descending = False
+        self._rows = []
+        self._after = None
+        self._exhausted = False
+        self._rows = self._next_batch()
+        # Position of the key in each row, needed to match changed rows; None disables apply_changes()
+        self._key_column = columns.index(key) if key in columns else None
+
+    def _sort_expression(self):
+        if self.sort_column is None or self.columns[self.sort_column] == self.key:
+            return None
+        # NULLs would break the (sort, key) > (?, ?) seek, so page on a non-NULL value
+        return f"IFNULL({self.columns[self.sort_column]}, '')"
+
+    def _next_batch(self):
+        page = keyset_page(self.columns, self.from_clause, self.key, self._sort_expression(), self._after,
+                           self.BATCH_SIZE, self.descending, self.where, self.params)
+        self._after = page.after
+        self._exhausted = page.after is None
+        return page.rows
+
+    def refresh(self):
+        """Re-run the query from the first page, keeping the current sort order and filters."""
+        self.beginResetModel()
+        self._after = None
+        self._rows = self._next_batch()
+        self.endResetModel()
+
+    def set_filters(self, where, params):
+        self.where = list(where)
+        self.params = list(params)
+        self.refresh()
+
+    def _order_key(self, row):
+        # The (sort, key) position a row takes in the ORDER BY of _next_batch
+        key = _sqlite_order(row[self._key_column])
+        if self._sort_expression() is None:
+            return (key,)
+        value = row[self.sort_column]
+        return (_sqlite_order('' if value is None else value), key)
+
+    def _before(self, first, second):
+        return first > second if self.descending else first < second
+
+    def apply_changes(self, keys):
+        """Re-read the rows with these key values and patch them into the loaded rows.
+
+        Rows that changed in place are updated, rows that were deleted or no
+        longer match the filters are removed, and new rows are inserted where
+        the sort order puts them if that is inside the pages already loaded
+        (later ones arrive through fetchMore as usual).
+        """
+        if self._key_column is None:
+            self.refresh()
+            return
+        fresh = rows_by_key(self.columns, self.from_clause, self.key, keys, self.where, self.params)
+        order = [self._order_key(row) for row in self._rows]
+        positions = {row[self._key_column]: position for position, row in enumerate(self._rows)}
+        removed, inserted = [], []
+        for key in keys:
+            position, row = positions.get(key), fresh.get(key)
+            if position is not None and row is not None and self._order_key(row) == order[position]:
+                self._rows[position] = row
+                self.dataChanged.emit(self.index(position, 0), self.index(position, len(self.headers) - 1))
+                continue
+            if position is not None:
+                removed.append(position)
+            if row is not None:
+                inserted.append(row)
+
+        for position in sorted(removed, reverse=True):
+            self.beginRemoveRows(QModelIndex(), position, position)
+            del self._rows[position]
+            del order[position]
+            self.endRemoveRows()
+
+        # Rows that sort after the last loaded page are left for fetchMore, which seeks past self._after
+        limit = None
+        if not self._exhausted:
+            limit = (_sqlite_order(self._after[1]),) if self._sort_expression() is None else \
+                (_sqlite_order(self._after[0]), _sqlite_order(self._after[1]))
+        for row in inserted:
+            row_order = self._order_key(row)
+            if limit is not None and not self._before(row_order, limit):
+                continue
+            position = next((i for i, existing in enumerate(order) if self._before(row_order, existing)), len(order))
+            self.beginInsertRows(QModelIndex(), position, position)
+            self._rows.insert(position, row)
+            order.insert(position, row_order)
+            self.endInsertRows()
+
+    def key_at(self, row):
+        """Key value of the row shown at a position (None without a key column)."""
+        return None if self._key_column is None else self._rows[row][self._key_column]
+
+    def find(self, key):
+        """Position of the loaded row with this key value, or None."""
+        if self._key_column is not None:
+            for position, row in enumerate(self._rows):
+                if row[self._key_column] == key:
+                    return position
+        return None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return str(self._rows[index.row()][index.column()])
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def row(self, row):
+        """The raw database row shown at a given position."""
+        return self._rows[row]
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        rows = self._next_batch()
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_column = column
+        self.descending = order == Qt.DescendingOrder
+        self.refresh()
+
+
+class RowsTableModel(QAbstractTableModel):
+    """Read-only table model over rows already in memory, such as the cached room catalog.
+
+    `formats` optionally gives a display function per column, so numeric
+    columns can be shown formatted and still sort as numbers.
+    """
+
+    def __init__(self, rows, headers, parent=None, formats=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.formats = formats or [str] * len(headers)
+        self._rows = list(rows)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.formats[index.column()](self._rows[index.row()][index.column()])
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def row(self, row):
+        return self._rows[row]
+
+    def key_at(self, row):
+        return self._rows[row][0]
+
+    def find(self, key):
+        return next((position for position, row in enumerate(self._rows) if row[0] == key), None)
+
+    def update_rows(self, rows):
+        """Swap in a new set of rows matched on their first column, keeping the current order.
+
+        Changed rows are updated in place, missing ones removed and new ones
+        appended, so the view keeps its selection and scroll position.
+        """
+        fresh = {row[0]: row for row in rows}
+        for position in reversed(range(len(self._rows))):
+            if self._rows[position][0] not in fresh:
+                self.beginRemoveRows(QModelIndex(), position, position)
+                del self._rows[position]
+                self.endRemoveRows()
+        for position, row in enumerate(self._rows):
+            new = fresh.pop(row[0])
+            if new != row:
+                self._rows[position] = new
+                self.dataChanged.emit(self.index(position, 0), self.index(position, len(self.headers) - 1))
+        if fresh:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(fresh) - 1)
+            self._rows.extend(fresh.values())
+            self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        # Sort as strings when a column mixes types (None next to numbers, for example)
+        try:
+            self._rows.sort(key=lambda row: row[column], reverse=order == Qt.DescendingOrder)
+        except TypeError:
+            self._rows.sort(key=lambda row: str(row[column]), reverse=order == Qt.DescendingOrder)
+        self.layoutChanged.emit()
+
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Paints a push button in every cell of a column and reports clicks by row.
+
+    Replaces one QPushButton widget per row, which costs a real widget each.
+    """
+
+    clicked = pyqtSignal(int)
+
+    def __init__(self, text, parent=None):
+        super().__init__(parent)
+        self.text = text
+
+    def paint(self, painter, option, index):
+        button = QStyleOptionButton()
+        button.rect = option.rect.adjusted(4, 2, -4, -2)
+        button.text = self.text
+        button.state = QStyle.State_Enabled
+        if option.state & QStyle.State_MouseOver:
+            button.state |= QStyle.State_MouseOver
+        widget = option.widget
+        style = widget.style() if widget is not None else QApplication.style()
+        style.drawControl(QStyle.CE_PushButton, button, painter, widget)
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and option.rect.contains(event.pos()):
+            self.clicked.emit(index.row())
+            return True
+        return super().editorEvent(event, model, option, index)
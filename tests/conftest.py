@@ -0,0 +1,28 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+os.environ.setdefault('HOTEL_BCRYPT_ROUNDS', '4')
+
+import repository  # noqa: E402
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    """A copy of the committed hotel_management.db (schema version 0), in use for the test."""
+    path = str(tmp_path / 'hotel_management.db')
+    shutil.copyfile(os.path.join(ROOT, 'hotel_management.db'), path)
+    repository.set_database_path(path)
+    yield path
+    repository.close_all_connections()
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
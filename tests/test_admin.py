@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+import database
+from admin import MAX_RESET_IDS, AdminApp
+
+
+def test_parse_booking_ids():
+    assert AdminApp.parse_booking_ids('12, 15, 14-16, 12') == [12, 15, 14, 16]
+    for text in ('', 'abc', '5-', '9-3', '0', '99999999999999999999', '1-99999999999999999999', '²'):
+        with pytest.raises(ValueError):
+            AdminApp.parse_booking_ids(text)
+
+
+def test_parse_booking_ids_caps_ranges_before_expanding_them():
+    assert len(AdminApp.parse_booking_ids(f'1-{MAX_RESET_IDS}')) == MAX_RESET_IDS
+    with pytest.raises(ValueError, match='At most'):
+        AdminApp.parse_booking_ids('1-100000000')
+    with pytest.raises(ValueError, match='At most'):
+        AdminApp.parse_booking_ids(f'1-{MAX_RESET_IDS}, {MAX_RESET_IDS + 1}')
+    # Overlapping ranges count each ID once
+    assert len(AdminApp.parse_booking_ids('1-6000, 1-6000, 5000-7000')) == 7000
+
+
+def test_failed_reset_is_reported_not_shown_as_missing(baseline_db, qapp, monkeypatch):
+    from migrations import migrate
+    migrate()
+
+    def locked(booking_ids):
+        raise sqlite3.OperationalError('database is locked')
+
+    window = AdminApp()
+    messages = []
+    monkeypatch.setattr(window, 'get_booking_ids', lambda: ('1-3', True))
+    monkeypatch.setattr(window, 'show_message', lambda title, message: messages.append(title))
+    monkeypatch.setattr('admin.cancel_bookings_batch', locked)
+    window.reset_booking()
+    assert messages == ['Database Error']
+    assert database.cancel_bookings_batch([999999]) == [None]
+
+
+def test_cancel_bookings_batch_lets_database_errors_through(baseline_db, monkeypatch):
+    def locked(attempt):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(database, 'run_with_retry', locked)
+    with pytest.raises(sqlite3.OperationalError):
+        database.cancel_bookings_batch([1, 2])
+
+
+def test_reports_run_on_the_background_pool_not_the_auth_pool(baseline_db, qapp, monkeypatch):
+    from PyQt5.QtCore import QThreadPool
+    from auth_worker import auth_pool
+    from background import background_pool
+    from migrations import migrate
+    migrate()
+    monkeypatch.setenv('HOTEL_SNAPSHOT_DIR', str(baseline_db) + '-snapshots')
+
+    assert background_pool() is not auth_pool()
+    started = []
+    monkeypatch.setattr(QThreadPool, 'start', lambda pool, worker: started.append(pool))
+    window = AdminApp()
+    window.view_reports()
+    assert started == [background_pool()]
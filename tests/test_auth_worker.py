@@ -0,0 +1,10 @@
+from auth_worker import register_client
+from migrations import migrate
+
+
+def test_duplicate_email_or_phone_is_a_sign_up_error_not_a_database_error(baseline_db):
+    migrate()
+    # The baseline database has johndoe@example.com with phone 1234567890
+    assert register_client('Jane Doe', 'jane@example.com', '1234567890', 'secret1') is None
+    assert register_client('Jane Doe', 'johndoe@example.com', '5550000001', 'secret1') is None
+    assert register_client('Jane Doe', 'jane@example.com', '5550000001', 'secret1') is not None
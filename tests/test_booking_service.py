@@ -0,0 +1,164 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from service_client import ServiceClient, ServiceError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def start_service(tmp_path):
+    """start_service(*args, **environment) runs booking_service.py on a fresh database and returns its port."""
+    processes = []
+
+    def start(*args, **environ):
+        env = dict(os.environ, HOTEL_DB_PATH=str(tmp_path / 'service.db'))
+        env.pop('HOTEL_ADMIN_KEY', None)
+        env.update(environ)
+        process = subprocess.Popen([sys.executable, 'booking_service.py', '--port', '0', *args], cwd=ROOT, env=env,
+                                   stdout=subprocess.PIPE, text=True)
+        processes.append(process)
+        for line in process.stdout:
+            if line.startswith('Booking service'):
+                return int(line.rsplit(':', 1)[1])
+        raise RuntimeError('booking service did not start')
+
+    yield start
+    for process in processes:
+        process.terminate()
+        process.wait()
+
+
+def raw_request(port, request):
+    with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        return json.loads(sock.makefile('rb').readline())
+
+
+@pytest.mark.parametrize('op, args', [
+    ('login', {'email': 'a@b.com', 'password': 123}),
+    ('login', {'email': ['a@b.com'], 'password': 'secret1'}),
+    ('logout', {'token': 42}),
+])
+def test_bad_argument_types_get_a_reply(start_service, op, args):
+    response = raw_request(start_service(), {'id': 1, 'op': op, 'args': args})
+    assert response['id'] == 1 and response['ok'] is False and 'must be' in response['error']
+
+
+def test_service_keeps_answering_after_a_bad_request(start_service):
+    port = start_service()
+    raw_request(port, {'id': 1, 'op': 'login', 'args': {'email': 'a@b.com', 'password': 123}})
+    client = ServiceClient(port=port, timeout=5)
+    assert client.ping()
+    with pytest.raises(ServiceError):
+        client.call('logout', token=None)
+
+
+def test_unexpected_error_gets_an_internal_error_reply(capsys):
+    import asyncio
+    from booking_service import BookingService
+
+    class Lines:
+        def __init__(self):
+            self.lines = []
+
+        def write(self, data):
+            self.lines.append(json.loads(data))
+
+        async def drain(self):
+            pass
+
+    async def broken():
+        raise AttributeError('boom')
+
+    service = BookingService()
+    service._operations['ping'] = broken
+    writer = Lines()
+    asyncio.run(service._respond(b'{"id": 7, "op": "ping"}\n', writer))
+    assert writer.lines == [{'id': 7, 'ok': False, 'error': 'internal error'}]
+    assert 'AttributeError: boom' in capsys.readouterr().err
+
+
+def test_cancel_bookings_needs_the_owner_or_the_admin_key(start_service):
+    port = start_service(HOTEL_ADMIN_KEY='desk-secret')
+    guest, other = ServiceClient(port=port, timeout=5, admin_key=''), ServiceClient(port=port, timeout=5, admin_key='')
+    guest_id = guest.sign_up('Guest One', 'one@example.com', '0123456789', 'secret1')
+    other_id = other.sign_up('Guest Two', 'two@example.com', '0123456780', 'secret2')
+    guest.login('one@example.com', 'secret1')
+    other.login('two@example.com', 'secret2')
+    booking_id = guest.book_room(guest_id, 3, '2030-01-01', '2030-01-03').booking_id
+
+    for args in ({}, {'client_id': guest_id}, {'token': 'forged'}, {'admin_key': 'guess'}):
+        response = raw_request(port, {'id': 1, 'op': 'cancel_bookings', 'args': {'booking_ids': [booking_id], **args}})
+        assert response['ok'] is False
+    with pytest.raises(ServiceError):
+        guest.cancel_bookings([booking_id])  # no client and no admin key
+    assert other.cancel_bookings([booking_id], other_id) == [None]
+    assert guest.view_bookings(guest_id)[0]
+
+    assert guest.cancel_bookings([booking_id], guest_id) == [3]
+    booking_id = guest.book_room(guest_id, 3, '2030-01-01', '2030-01-03').booking_id
+    assert ServiceClient(port=port, timeout=5, admin_key='desk-secret').cancel_bookings([booking_id]) == [3]
+
+
+def test_bare_client_id_needs_trust_client_ids(start_service):
+    port = start_service()
+    guest = ServiceClient(port=port, timeout=5)
+    guest_id = guest.sign_up('Guest One', 'one@example.com', '0123456789', 'secret1')
+    for op, args in (('view_bookings', {}), ('book_room', {'room_id': 3}), ('cancel_bookings', {'booking_ids': [1]})):
+        response = raw_request(port, {'id': 1, 'op': op, 'args': {**args, 'client_id': guest_id}})
+        assert response['ok'] is False and 'Log in first' in response['error']
+    guest.login('one@example.com', 'secret1')
+    assert guest.view_bookings(guest_id) == ([], None)
+
+    trusted = start_service('--trust-client-ids')
+    assert raw_request(trusted, {'id': 1, 'op': 'view_bookings', 'args': {'client_id': 1}})['ok'] is True
+    assert raw_request(trusted, {'id': 1, 'op': 'view_bookings', 'args': {'client_id': '1'}})['ok'] is False
+
+
+def test_numeric_string_client_id_is_not_taken_for_a_token(baseline_db):
+    import database
+    assert database._session_client('42') == 42
+    assert database._session_client('not-a-token') is None
+
+
+@pytest.mark.parametrize('booking_ids', [[1e30], ['x'], [0], [2 ** 63], [True], list(range(1, 1002))])
+def test_cancel_bookings_refuses_bad_ids_before_the_writer(start_service, booking_ids):
+    port = start_service('--trust-client-ids')
+    response = raw_request(port, {'id': 1, 'op': 'cancel_bookings', 'args': {'booking_ids': booking_ids,
+                                                                             'client_id': 1}})
+    assert response['ok'] is False
+    assert raw_request(port, {'id': 2, 'op': 'cancel_bookings',
+                              'args': {'booking_ids': [999999], 'client_id': 1}})['result'] == [None]
+
+
+@pytest.mark.parametrize('op', ['room_search', 'view_bookings'])
+def test_page_limit_must_be_an_integer_and_is_clamped(start_service, op):
+    port = start_service('--trust-client-ids')
+    args = {'client_id': 1} if op == 'view_bookings' else {}
+    for limit in ('10', 2.5, None):
+        assert raw_request(port, {'id': 1, 'op': op, 'args': {**args, 'limit': limit}})['ok'] is False
+    for limit in (0, -5):
+        assert raw_request(port, {'id': 1, 'op': op, 'args': {**args, 'limit': limit}})['ok'] is True
+
+
+@pytest.mark.parametrize('op', ['room_search', 'search_rooms', 'quote_rooms', 'book_room'])
+@pytest.mark.parametrize('dates', [
+    {'check_in': 'not-a-date'},
+    {'check_out': '2030-01-03'},
+    {'check_in': 20300101, 'check_out': 20300103},
+    {'check_in': '2030-01-03', 'check_out': '2030-01-01'},
+])
+def test_stay_needs_both_valid_dates_or_neither(start_service, op, dates):
+    port = start_service('--trust-client-ids')
+    args = {'room_ids': [1]} if op == 'quote_rooms' else {'room_id': 1, 'client_id': 1} if op == 'book_room' else {}
+    response = raw_request(port, {'id': 1, 'op': op, 'args': {**args, **dates}})
+    if op == 'book_room' and response['ok']:
+        assert response['result']['status'] == 'invalid_dates'
+    else:
+        assert response['ok'] is False
@@ -0,0 +1,26 @@
+import pytest
+
+from availability import BOOKED
+from booking_writer import BookingWriter
+from migrations import migrate
+
+
+def test_failing_operation_does_not_undo_the_rest_of_its_batch(baseline_db):
+    migrate()
+    with BookingWriter(max_batch_wait=0.5) as writer:
+        booked = writer.book_room(1, 3, '2030-01-01', '2030-01-03')
+        # Past the submit-time check, as if a bad ID got through: it must fail on its own
+        poisoned = writer._submit('reset', (2 ** 70, None), None)
+        assert booked.result(timeout=5).status == BOOKED
+        with pytest.raises(OverflowError):
+            poisoned.result(timeout=5)
+    assert writer.commits == 1
+
+
+@pytest.mark.parametrize('booking_id', [0, -1, 2 ** 63, 1.5, '7', True, None])
+def test_bad_ids_are_refused_when_submitted(baseline_db, booking_id):
+    with BookingWriter() as writer:
+        with pytest.raises(ValueError):
+            writer.reset_booking(booking_id)
+        with pytest.raises(ValueError):
+            writer.book_room(1, booking_id, '2030-01-01', '2030-01-03')
@@ -0,0 +1,34 @@
+import shutil
+from datetime import date, timedelta
+
+import availability
+from availability import free_room_ids, reserve_stay
+from migrations import migrate
+from repository import get_connection, using_database
+from room_catalog import catalog
+
+
+def test_caches_are_kept_per_database_file(baseline_db, tmp_path, monkeypatch):
+    migrate()
+    get_connection().execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    other = str(tmp_path / 'other.db')
+    shutil.copyfile(baseline_db, other)
+    tonight = date.today()
+    with using_database(other):
+        reserve_stay(1, 1, tonight, tonight + timedelta(days=1), tonight.isoformat())
+
+    loads = []
+    real_load = availability.AvailabilityIndex._load
+    monkeypatch.setattr(availability.AvailabilityIndex, '_load',
+                        lambda self, cursor, version: loads.append(version) or real_load(self, cursor, version))
+    catalog.invalidate()
+    availability.index.invalidate()
+    misses = catalog.misses
+    for _ in range(3):
+        assert 1 in free_room_ids()
+        assert catalog.get(1)
+        with using_database(other):
+            assert 1 not in free_room_ids()
+            assert catalog.get(1)
+    assert len(loads) == 2
+    assert catalog.misses - misses == 2
@@ -0,0 +1,12 @@
+import metrics
+from repository import get_connection
+
+
+def test_timer_counts_the_statements_an_operation_issues(baseline_db):
+    metrics.reset()
+    conn = get_connection()
+    with metrics.timer('test.statements'):
+        conn.execute('SELECT COUNT(*) FROM rooms').fetchone()
+        conn.execute('CREATE TEMP TABLE seen (n)')
+        conn.cursor().executemany('INSERT INTO seen VALUES (?)', [(1,), (2,)])
+    assert metrics.snapshot()['counters']['hotel_operation_statements_total']['test.statements'] == 3
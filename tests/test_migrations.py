@@ -0,0 +1,23 @@
+from migrations import HOT_QUERIES, LATEST_VERSION, explain, full_scans, migrate, schema_version
+
+
+def test_migrate_upgrades_the_baseline_once(baseline_db):
+    assert migrate() == list(range(1, LATEST_VERSION + 1))
+    assert schema_version() == LATEST_VERSION
+    assert migrate() == []
+
+
+def test_no_hot_query_falls_back_to_a_full_scan(baseline_db):
+    # The same check as migrations.py --check-plans
+    migrate()
+    assert full_scans() == []
+    # and the guard does catch one
+    unindexed = {'clients by name': ('SELECT client_id FROM clients WHERE name = ?', ('A',))}
+    [(name, detail)] = full_scans(unindexed)
+    assert name == 'clients by name' and detail.startswith('SCAN clients')
+
+
+def test_open_rooms_lookup_uses_a_room_search_index(baseline_db):
+    # idx_rooms_availability went with the old rooms table in migration 10; the room search indexes cover it
+    migrate()
+    assert explain(*HOT_QUERIES['open rooms'])[0].startswith('SEARCH rooms USING COVERING INDEX')
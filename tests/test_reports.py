@@ -0,0 +1,22 @@
+from datetime import date
+
+from availability import reserve_stay
+from migrations import migrate
+from reports import occupancy_report
+from repository import transaction
+
+
+def test_room_closed_after_booking_keeps_occupancy_at_most_full(baseline_db):
+    migrate()
+    with transaction() as cursor:
+        cursor.execute("SELECT room_id FROM rooms WHERE room_type = 'Standard' ORDER BY room_id")
+        rooms = [row[0] for row in cursor.fetchall()]
+    for room_id in rooms:
+        reserve_stay(1, room_id, '2030-01-01', '2030-02-01', '2029-12-01', amount=3100.0)
+    with transaction() as cursor:
+        cursor.execute('UPDATE rooms SET availability = 0 WHERE room_id = ?', (rooms[0],))
+
+    row = next(row for row in occupancy_report(date(2030, 1, 1), date(2030, 2, 1)) if row.group == 'Standard')
+    assert row.sold_nights == row.available_nights == 31 * len(rooms)
+    assert row.occupancy == 1.0
+    assert row.revpar == row.adr == 100.0
@@ -0,0 +1,32 @@
+from datetime import date, timedelta
+
+from availability import reserve_stay
+from migrations import migrate
+from summaries import dashboard_counts
+
+
+def test_dashboard_counts_rooms_free_tonight(baseline_db):
+    migrate()
+    before = dashboard_counts()['room_types']
+    total, free = before['Standard']
+    assert free == total
+
+    tonight = date.today()
+    reserve_stay(1, 1, tonight, tonight + timedelta(days=1), tonight.isoformat())
+    assert dashboard_counts()['room_types']['Standard'] == (total, free - 1)
+    # A stay that starts tomorrow leaves the room free tonight
+    reserve_stay(1, 2, tonight + timedelta(days=1), tonight + timedelta(days=2), tonight.isoformat())
+    assert dashboard_counts()['room_types']['Standard'] == (total, free - 1)
+
+
+def test_room_counters_follow_room_writes_without_open_rooms(baseline_db):
+    from repository import transaction
+    from summaries import verify_summaries
+    migrate()
+    with transaction() as cursor:
+        cursor.execute('SELECT name FROM pragma_table_info(?)', ('room_type_counts',))
+        assert [row[0] for row in cursor.fetchall()] == ['room_type', 'rooms']
+        cursor.execute('UPDATE rooms SET availability = 0 WHERE room_id = 1')
+        cursor.execute("UPDATE rooms SET room_type = 'Suite' WHERE room_id = 2")
+        cursor.execute("INSERT INTO rooms (room_type, price, bed_count, level) VALUES ('Standard', 90.0, 1, 1)")
+    assert verify_summaries() == []
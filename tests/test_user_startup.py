@@ -0,0 +1,19 @@
+from migrations import MIGRATIONS, schema_version
+from repository import get_connection
+
+
+def test_user_entry_path_upgrades_baseline_database(baseline_db, qapp, monkeypatch):
+    import user
+
+    user_app = user.open_user_app(['user.py'])
+    assert schema_version() == MIGRATIONS[-1][0]
+
+    messages = []
+    monkeypatch.setattr(user_app, 'show_message', lambda title, message: messages.append(title))
+    user_app.view_rooms()
+    assert messages == []
+    assert user_app.room_table.rowCount() > 0
+
+    user_app.client_id = get_connection().execute('SELECT MIN(client_id) FROM clients').fetchone()[0]
+    user_app.book_room(int(user_app.room_table.item(0, 0).text()))
+    assert messages == ['Booking Success']
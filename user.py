@@ -1,15 +1,40 @@
 import sys
 import sqlite3
-import bcrypt
 from datetime import datetime
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QLineEdit, QLabel, QPushButton, QMessageBox, QTableWidget, QTableWidgetItem, QSizePolicy, QHeaderView
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QLabel, QPushButton, QMessageBox, QTableWidget, QTableWidgetItem, QSizePolicy, QHeaderView,
+    QDateEdit, QComboBox
 )
-import re  # Import regex module for email and phone validation
+from PyQt5.QtCore import QDate
+
+import passwords
+from auth_worker import AuthWorker, auth_pool, check_login, register_client
+from availability import BOOKED, reserve_stay
+from metrics import timer
+from migrations import migrate
+from pricing import quote_rooms, quote_stay
+from properties import property_from_args
+from repository import get_connection
+from room_search import PRICE_BANDS, price_band_label, price_band_range, search_rooms
+from service_client import ServiceError, service_from_args
+from table_models import ButtonDelegate
+from validation import client_input_error
+
+# Most rooms one search shows; narrowing the filters shows the rest
+ROOM_RESULTS_LIMIT = 200
+
+# Sort choices offered, as (label, room_search.SORTS key)
+ROOM_SORTS = [('Price: low to high', 'price'), ('Price: high to low', 'price_desc'), ('Level', 'level')]
+
+# Largest 'N+ beds' choice in the beds filter
+MAX_BED_FILTER = 4
+
 
 class UserApp(QWidget):
-    def __init__(self):
+    def __init__(self, service=None):
         super().__init__()
+        # ServiceClient in client mode (requests go to booking_service), None to use the database file directly
+        self.service = service
         self.setWindowTitle('Hotel Management - User')
         self.setGeometry(100, 100, 600, 500)
 
@@ -73,6 +98,48 @@ class UserApp(QWidget):
         self.layout.addWidget(QLabel("Password"))
         self.layout.addWidget(self.password_input)
 
+        # Stay dates used when searching and booking rooms
+        self.check_in_input = QDateEdit(QDate.currentDate(), self)
+        self.check_out_input = QDateEdit(QDate.currentDate().addDays(1), self)
+        for date_input in (self.check_in_input, self.check_out_input):
+            date_input.setCalendarPopup(True)
+            date_input.setDisplayFormat('yyyy-MM-dd')
+        self.check_in_input.setMinimumDate(QDate.currentDate())
+        self.check_in_input.dateChanged.connect(self.update_check_out_minimum)
+        self.update_check_out_minimum(self.check_in_input.date())
+
+        dates_layout = QHBoxLayout()
+        dates_layout.addWidget(QLabel("Check-in"))
+        dates_layout.addWidget(self.check_in_input)
+        dates_layout.addWidget(QLabel("Check-out"))
+        dates_layout.addWidget(self.check_out_input)
+        self.layout.addLayout(dates_layout)
+
+        # Room search filters; the category and price lists show how many rooms each choice would leave
+        self.category_filter = QComboBox(self)
+        self.category_filter.addItem('Any category', None)
+        self.price_filter = QComboBox(self)
+        self.price_filter.addItem('Any price', None)
+        for bound in PRICE_BANDS:
+            self.price_filter.addItem(price_band_label(bound), bound)
+        self.beds_filter = QComboBox(self)
+        self.beds_filter.addItem('Any beds', None)
+        for beds in range(1, MAX_BED_FILTER + 1):
+            self.beds_filter.addItem(f'{beds}+ bed' + ('s' if beds > 1 else ''), beds)
+        self.level_filter = QLineEdit(self)
+        self.level_filter.setPlaceholderText('Any level')
+        self.sort_choice = QComboBox(self)
+        for label, sort in ROOM_SORTS:
+            self.sort_choice.addItem(label, sort)
+
+        filters_layout = QHBoxLayout()
+        for combo in (self.category_filter, self.price_filter, self.beds_filter, self.sort_choice):
+            combo.currentIndexChanged.connect(self.refresh_rooms)
+        self.level_filter.editingFinished.connect(self.refresh_rooms)
+        for widget in (self.category_filter, self.price_filter, self.beds_filter, self.level_filter, self.sort_choice):
+            filters_layout.addWidget(widget)
+        self.layout.addLayout(filters_layout)
+
         # Action buttons (Sign Up, Login, View Rooms)
         self.sign_up_button = QPushButton('Sign Up', self)
         self.sign_up_button.clicked.connect(self.sign_up_client)
@@ -86,23 +153,50 @@ class UserApp(QWidget):
         self.view_rooms_button.clicked.connect(self.view_rooms)
         self.layout.addWidget(self.view_rooms_button)
 
+        self.results_label = QLabel(self)
+        self.layout.addWidget(self.results_label)
+
         self.setLayout(self.layout)
 
         # Initialize room table widget (initially empty)
         self.room_table = None
         self.client_id = None  
 
+    def update_check_out_minimum(self, check_in):
+        """Keep check-out at least one night after check-in."""
+        self.check_out_input.setMinimumDate(check_in.addDays(1))
+
+    def selected_stay(self):
+        """Return the chosen (check_in, check_out) dates as ISO strings."""
+        return (self.check_in_input.date().toString('yyyy-MM-dd'),
+                self.check_out_input.date().toString('yyyy-MM-dd'))
+
     def connect_db(self):
-        """Connect to the database."""
-        return sqlite3.connect('hotel_management.db')
+        """Return the shared database connection."""
+        return get_connection()
 
     def hash_password(self, password):
         """Hash the password for secure storage."""
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        return passwords.hash_password(password)
 
     def verify_password(self, password, hashed_password):
         """Verify the provided password against the hashed password."""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password)
+        return passwords.verify_password(password, hashed_password)
+
+    def run_auth_task(self, function, args, on_finished):
+        """Run sign-up/login work on the auth thread pool so bcrypt never blocks the window."""
+        self.set_auth_busy(True)
+        worker = AuthWorker(function, *args)
+        worker.signals.finished.connect(on_finished)
+        worker.signals.failed.connect(lambda error: self.show_message('Database Error', error))
+        worker.signals.finished.connect(lambda result: self.set_auth_busy(False))
+        worker.signals.failed.connect(lambda error: self.set_auth_busy(False))
+        auth_pool().start(worker)
+
+    def set_auth_busy(self, busy):
+        """Disable the auth buttons while a sign-up or login is being checked."""
+        self.sign_up_button.setEnabled(not busy)
+        self.login_button.setEnabled(not busy)
 
     def sign_up_client(self):
         """Register a new client."""
@@ -114,26 +208,16 @@ class UserApp(QWidget):
         if not self.evaluate_user_input(name, email, phone, password):
             return
 
-        conn = self.connect_db()
-        cursor = conn.cursor()
+        register = self.service.sign_up if self.service else register_client
+        self.run_auth_task(register, (name, email, phone, password),
+                           lambda client_id: self.sign_up_finished(name, client_id))
 
-        try:
-            cursor.execute('''SELECT client_id FROM clients WHERE email = ?''', (email,))
-            existing_client = cursor.fetchone()
-
-            if existing_client:
-                self.show_message('Sign Up Error', 'Email is already registered. Please log in.')
-            else:
-                hashed_password = self.hash_password(password)
-                cursor.execute('''INSERT INTO clients (name, email, phone, password) VALUES (?, ?, ?, ?)''', 
-                               (name, email, phone, hashed_password))
-                conn.commit()
-                client_id = cursor.lastrowid
-                self.show_message('Sign Up Success', f'{name}, you have been successfully registered! Your Client ID is {client_id}.')
-        except sqlite3.Error as e:
-            self.show_message('Database Error', f'Error: {e}')
-        finally:
-            conn.close()
+    def sign_up_finished(self, name, client_id):
+        """Report the result of a sign-up that ran on the worker pool."""
+        if client_id is None:
+            self.show_message('Sign Up Error', 'Email or phone number is already registered. Please log in.')
+        else:
+            self.show_message('Sign Up Success', f'{name}, you have been successfully registered! Your Client ID is {client_id}.')
 
     def login_client(self):
         """Authenticate a client for login."""
@@ -144,60 +228,106 @@ class UserApp(QWidget):
             self.show_message('Input Error', 'Email and password are required for login.')
             return
 
-        conn = self.connect_db()
-        cursor = conn.cursor()
-
-        try:
-            cursor.execute('''SELECT client_id, name, password FROM clients WHERE email = ?''', (email,))
-            client = cursor.fetchone()
-
-            if client and self.verify_password(password, client[2]):
-                self.client_id = client[0]  # Store client ID after successful login
-                self.show_message('Login Success', f'Welcome back {client[1]}!')
-                self.view_rooms()  # Show rooms upon successful login
-            else:
-                self.show_message('Login Failed', 'Invalid email or password.')
-        except sqlite3.Error as e:
-            self.show_message('Database Error', f'Error: {e}')
-        finally:
-            conn.close()
+        self.run_auth_task(self.service.login if self.service else check_login, (email, password),
+                           self.login_finished)
+
+    def login_finished(self, client):
+        """Report the result of a login that ran on the worker pool."""
+        if client:
+            self.client_id = client[0]  # Store client ID after successful login
+            self.show_message('Login Success', f'Welcome back {client[1]}!')
+            self.view_rooms()  # Show rooms upon successful login
+        else:
+            self.show_message('Login Failed', 'Invalid email or password.')
+
+    def room_filter_values(self):
+        """Current search filters in the form room_search.search_rooms() takes, or None if the level is not a number."""
+        level = self.level_filter.text().strip()
+        if level and not level.lstrip('-').isdigit():
+            return None
+        min_price, max_price = (None, None) if self.price_filter.currentData() is None \
+            else price_band_range(self.price_filter.currentData())
+        return {
+            'category': self.category_filter.currentData(),
+            'min_price': min_price,
+            'max_price': max_price,
+            'min_beds': self.beds_filter.currentData(),
+            'level': int(level) if level else None,
+        }
+
+    def refresh_rooms(self):
+        """Re-run the search when a filter changes while rooms are shown."""
+        if self.room_table is not None:
+            self.view_rooms()
 
     def view_rooms(self):
-        """View available rooms."""
-        conn = self.connect_db()
-        cursor = conn.cursor()
-
+        """View rooms available for every night of the selected stay that match the filters."""
+        check_in, check_out = self.selected_stay()
+        filters = self.room_filter_values()
+        if filters is None:
+            self.show_message('Input Error', 'Enter the level as a whole number, or leave it empty.')
+            return
         try:
-            cursor.execute('''SELECT room_id, room_type, price, category, description, availability FROM rooms WHERE availability = 1''')
-            rooms = cursor.fetchall()
-
-            if rooms:
-                self.show_rooms_table(rooms)
-            else:
-                self.show_message('No Available Rooms', 'There are no available rooms.')
-        except sqlite3.Error as e:
+            # Filtered, sorted and counted in SQL on the room search indexes; the night index says what is free
+            with timer('user.view_rooms'):
+                search = self.service.room_search if self.service else search_rooms
+                found = search(check_in, check_out, self.sort_choice.currentData(), None, ROOM_RESULTS_LIMIT,
+                               True, **filters)
+                # What the whole stay costs in each room, from one vectorized quote (pricing.py)
+                quote = self.service.quote_rooms if self.service else quote_rooms
+                prices = quote([room[0] for room in found.rows], check_in, check_out)
+            self.show_facets(found.facets, filters['category'])
+            self.show_rooms_table(found.rows, prices)
+
+            # With filters set the results line already says nothing matched
+            if not found.rows and not any(value is not None for value in filters.values()):
+                self.show_message('No Available Rooms', f'There are no rooms available from {check_in} to {check_out}.')
+        except (sqlite3.Error, ServiceError) as e:
             self.show_message('Database Error', f'Error: {e}')
-        finally:
-            conn.close()
-
-    def show_rooms_table(self, rooms):
-        """Show available rooms in a table format with a 'Book' button."""
+        except ValueError as e:
+            self.show_message('Input Error', f'Invalid stay dates: {e}')
+
+    def show_facets(self, facets, category):
+        """Put the room counts of the last search into the category and price lists, keeping the selections."""
+        total = facets['category'].get(category, 0) if category is not None else sum(facets['category'].values())
+        shown = min(total, ROOM_RESULTS_LIMIT)
+        self.results_label.setText(f'{total} rooms match' + (f'; showing the first {shown}' if shown < total else ''))
+
+        self.category_filter.blockSignals(True)
+        self.category_filter.clear()
+        self.category_filter.addItem('Any category', None)
+        # Keep the chosen category listed even when nothing in it is free for these dates
+        for name in sorted(set(facets['category']) | ({category} if category is not None else set()), key=str):
+            self.category_filter.addItem(f"{name} ({facets['category'].get(name, 0)})", name)
+        self.category_filter.setCurrentIndex(max(self.category_filter.findData(category), 0))
+        self.category_filter.blockSignals(False)
+
+        for index in range(1, self.price_filter.count()):
+            bound = self.price_filter.itemData(index)
+            self.price_filter.setItemText(index, f"{price_band_label(bound)} ({facets['price'].get(bound, 0)})")
+
+    def show_rooms_table(self, rooms, prices):
+        """Show available rooms, with the price of the stay in each (`prices` by room ID), and a 'Book' button."""
         if self.room_table:
             self.room_table.setParent(None)  # Remove existing table
 
         self.room_table = QTableWidget()
         self.room_table.setRowCount(len(rooms))
-        self.room_table.setColumnCount(7)
-        self.room_table.setHorizontalHeaderLabels(['Room ID', 'Type', 'Price', 'Category', 'Description', 'Availability', 'Action'])
+        self.room_table.setColumnCount(9)
+        self.room_table.setHorizontalHeaderLabels(['Room ID', 'Type', 'Price', 'Beds', 'Level', 'Category', 'Description',
+                                                   'Stay Total', 'Action'])
 
         for row, room in enumerate(rooms):
             for col, value in enumerate(room):
                 self.room_table.setItem(row, col, QTableWidgetItem(str(value)))
+            total = prices.get(room[0])
+            self.room_table.setItem(row, 7, QTableWidgetItem('' if total is None else f'${total:,.2f}'))
 
-            # Add a 'Book' button for each room
-            book_button = QPushButton('Book')
-            book_button.clicked.connect(lambda checked, room_id=room[0]: self.book_room(room_id))
-            self.room_table.setCellWidget(row, 6, book_button)
+        # One delegate paints a 'Book' button in every row instead of a widget per row
+        self.room_table.setMouseTracking(True)
+        book_delegate = ButtonDelegate('Book', self.room_table)
+        book_delegate.clicked.connect(lambda row, rooms=rooms: self.book_room(rooms[row][0]))
+        self.room_table.setItemDelegateForColumn(8, book_delegate)
 
         # Ensure all columns have equal width
         header = self.room_table.horizontalHeader()
@@ -211,34 +341,30 @@ class UserApp(QWidget):
             self.show_message('Login Required', 'You need to log in to book a room.')
             return
 
-        conn = self.connect_db()
-        cursor = conn.cursor()
+        check_in, check_out = self.selected_stay()
 
         try:
-            cursor.execute('''SELECT availability FROM rooms WHERE room_id = ?''', (room_id,))
-            room = cursor.fetchone()
-
-            if room and room[0] == 1:  # Room is available
-                # Get the current date and time for booking_date
-                booking_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-                # Book the room (update availability)
-                cursor.execute('''UPDATE rooms SET availability = 0 WHERE room_id = ?''', (room_id,))
-
-                # Create a booking record with booking_date
-                cursor.execute('''INSERT INTO bookings (client_id, room_id, booking_date, status, payment_status) 
-                                VALUES (?, ?, ?, ?, ?)''', 
-                            (self.client_id, room_id, booking_date, 'Booked', 'Pending'))
-
-                conn.commit()
-                self.show_message('Booking Success', f'Room {room_id} has been successfully booked on {booking_date}!')
+            # Get the current date and time for booking_date
+            booking_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+            # One conditional write: fails if another guest booked any of the nights first
+            with timer('user.book_room'):
+                if self.service:
+                    result = self.service.book_room(self.client_id, room_id, check_in, check_out)
+                else:
+                    # Priced again now: the occupancy surcharge may have changed since the table was shown
+                    result = reserve_stay(self.client_id, room_id, check_in, check_out, booking_date,
+                                          amount=quote_stay(room_id, check_in, check_out))
+
+            if result.status == BOOKED:
+                price = f' for ${result.amount:,.2f}' if result.amount is not None else ''
+                self.show_message('Booking Success', f'Room {room_id} has been successfully booked from {check_in} to {check_out}{price}!')
+                self.view_rooms()
             else:
-                self.show_message('Booking Failed', 'This room is no longer available.')
+                self.show_message('Booking Failed', 'This room is no longer available for those dates.')
 
-        except sqlite3.Error as e:
+        except (sqlite3.Error, ServiceError) as e:
             self.show_message('Database Error', f'Error: {e}')
-        finally:
-            conn.close()
 
     def show_message(self, title, message):
         """Show a message box with a title and message."""
@@ -246,32 +372,21 @@ class UserApp(QWidget):
 
     def evaluate_user_input(self, name, email, phone, password):
         """Validate user input."""
-        if not name or not email or not phone or not password:
-            self.show_message('Input Error', 'All fields are required.')
+        error = client_input_error(name, email, phone, password)
+        if error:
+            self.show_message('Input Error', error)
             return False
-
-        # Email validation
-        email_regex = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_regex, email):
-            self.show_message('Input Error', 'Please enter a valid email address.')
-            return False
-
-        # Phone number validation
-        phone_regex = r'^\d{10}$'  # Assuming phone numbers must be 10 digits
-        if not re.match(phone_regex, phone):
-            self.show_message('Input Error', 'Phone number must be 10 digits long.')
-            return False
-
-        # Password validation (e.g., minimum length of 6 characters)
-        if len(password) < 6:
-            self.show_message('Input Error', 'Password must be at least 6 characters long.')
-            return False
-
         return True
 
+def open_user_app(argv):
+    """The user window for a command line, with its database brought up to the current schema."""
+    property_from_args(argv)  # --property CODE to open one property's database
+    migrate()
+    return UserApp(service_from_args(argv))  # --connect HOST:PORT for client mode
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
-    user_app = UserApp()
+    user_app = open_user_app(sys.argv)
     user_app.show()
     sys.exit(app.exec_())
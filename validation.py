@@ -0,0 +1,36 @@
+import re
+
+
+# Sign-up rules shared by the user window, the booking service and the bulk client import
+EMAIL_REGEX = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+PHONE_REGEX = r'^\d{10}$'  # Assuming phone numbers must be 10 digits
+MIN_PASSWORD_LENGTH = 6
+
+
+def client_input_error(name, email, phone, password):
+    """Return the reason sign-up details are invalid, or None when they are acceptable."""
+    if not name or not email or not phone or not password:
+        return 'All fields are required.'
+
+    # Email validation
+    if not re.match(EMAIL_REGEX, email):
+        return 'Please enter a valid email address.'
+
+    # Phone number validation
+    if not re.match(PHONE_REGEX, phone):
+        return 'Phone number must be 10 digits long.'
+
+    # Password validation (e.g., minimum length of 6 characters)
+    if len(password) < MIN_PASSWORD_LENGTH:
+        return f'Password must be at least {MIN_PASSWORD_LENGTH} characters long.'
+
+    return None
+
+
+# Largest value an SQLite INTEGER can hold; a larger Python int overflows when bound
+MAX_ROW_ID = 2 ** 63 - 1
+
+
+def is_row_id(value):
+    """True for an int that can be a row ID (1 to MAX_ROW_ID); bools and floats are not IDs."""
+    return isinstance(value, int) and not isinstance(value, bool) and 1 <= value <= MAX_ROW_ID